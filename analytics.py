@@ -0,0 +1,198 @@
+"""Статистика проверки работ по переходам статусов из архива.
+
+Вычисления векторные (NumPy) над колонками переходов: время проверки
+(reviewing -> approved/rejected) по подписчикам и в целом, доля отказов и
+распределение по часам суток. NumPy - необязательная зависимость:
+
+    pip install numpy
+    python archive.py --dir archive turnaround
+"""
+from tenants import STATUS_CODES, status_code
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+QUANTILES = (0.5, 0.9, 0.99)
+REVIEWING = STATUS_CODES['reviewing']
+APPROVED = STATUS_CODES['approved']
+REJECTED = STATUS_CODES['rejected']
+
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError('Для аналитики установите NumPy: pip install numpy')
+
+
+class TransitionColumns:
+    """Переходы статусов колонками: подписчик, работа, время, код статуса.
+
+    tenant и homework - номера в списках tenant_keys и homework_keys.
+    """
+
+    def __init__(self, tenant, homework, moment, status, tenant_keys,
+                 homework_keys=()):
+        self.tenant = tenant
+        self.homework = homework
+        self.moment = moment
+        self.status = status
+        self.tenant_keys = list(tenant_keys)
+        self.homework_keys = list(homework_keys)
+
+    def __len__(self):
+        return len(self.moment)
+
+
+def load_transitions(archive):
+    """Собираем колонки переходов из архива.
+
+    Время перехода - date_updated работы, а если его нет - время записи
+    в архив.
+    """
+    require_numpy()
+    tenants = {}
+    homeworks = {}
+    tenant_column = []
+    homework_column = []
+    status_column = []
+    recorded = []
+    updated = []
+    for record in archive.scan('transition'):
+        data = record['data']
+        tenant_column.append(tenants.setdefault(record['tenant'],
+                                                len(tenants)))
+        homework_column.append(homeworks.setdefault(
+            (record['tenant'], data['homework']), len(homeworks)
+        ))
+        status_column.append(status_code(data['status']))
+        recorded.append(record['ts'])
+        date_updated = data.get('date_updated')
+        updated.append(date_updated[:19] if date_updated else 'NaT')
+    moment = np.array(recorded, dtype=np.float64)
+    parsed = np.array(updated, dtype='datetime64[s]')
+    known = ~np.isnat(parsed)
+    moment[known] = parsed[known].astype(np.int64)
+    return TransitionColumns(
+        np.array(tenant_column, dtype=np.int32),
+        np.array(homework_column, dtype=np.int64),
+        moment,
+        np.array(status_column, dtype=np.int8),
+        tenants,
+        homeworks
+    )
+
+
+def review_cycles(columns):
+    """Завершённые проверки: подписчик, длительность, начало, итог.
+
+    Проверка - переход reviewing, за которым у той же работы следует
+    approved или rejected.
+    """
+    # Архив пишется по времени, поэтому устойчивая сортировка по времени
+    # почти линейна; номер работы уникален для пары (подписчик, работа).
+    order = np.argsort(columns.moment, kind='stable')
+    order = order[np.argsort(columns.homework[order], kind='stable')]
+    tenant = columns.tenant[order]
+    homework = columns.homework[order]
+    moment = columns.moment[order]
+    status = columns.status[order]
+    cycle = ((homework[1:] == homework[:-1])
+             & (status[:-1] == REVIEWING)
+             & ((status[1:] == APPROVED) | (status[1:] == REJECTED)))
+    return (tenant[1:][cycle],
+            moment[1:][cycle] - moment[:-1][cycle],
+            moment[:-1][cycle],
+            status[1:][cycle] == REJECTED)
+
+
+def hour_histogram(moments, tz_offset=0):
+    """Число событий по часам суток (24 значения)."""
+    hours = ((moments + tz_offset * 3600) // 3600 % 24).astype(np.int64)
+    return np.bincount(hours, minlength=24)
+
+
+def group_quantiles(groups, values, quantiles=QUANTILES):
+    """Квантили values внутри каждой группы без цикла по группам.
+
+    Возвращает номера групп, число значений и таблицу квантилей
+    (строка - группа, столбец - квантиль).
+    """
+    order = np.argsort(values)
+    order = order[np.argsort(groups[order], kind='stable')]
+    groups = groups[order]
+    values = values[order]
+    keys, starts, counts = np.unique(groups, return_index=True,
+                                     return_counts=True)
+    offsets = np.floor(np.outer(counts - 1, quantiles)).astype(np.int64)
+    return keys, counts, values[starts[:, None] + offsets]
+
+
+def turnaround_report(columns, tz_offset=0, quantiles=QUANTILES):
+    """Сводка по времени проверки, доле отказов и часам суток."""
+    require_numpy()
+    tenant, duration, started, rejected = review_cycles(columns)
+    finished = started + duration
+    report = {
+        'transitions': len(columns),
+        'reviews': int(len(duration)),
+        'quantiles': list(quantiles),
+        'turnaround': [],
+        'mean': float(duration.mean()) if len(duration) else None,
+        'rejection_rate': (float(rejected.mean()) if len(rejected)
+                           else None),
+        'review_hours': hour_histogram(started, tz_offset).tolist(),
+        'verdict_hours': hour_histogram(finished, tz_offset).tolist(),
+        'tenants': [],
+    }
+    if not len(duration):
+        return report
+    report['turnaround'] = group_quantiles(
+        np.zeros(len(duration), dtype=np.int32), duration, quantiles
+    )[2][0].tolist()
+    keys, counts, table = group_quantiles(tenant, duration, quantiles)
+    rejections = np.bincount(tenant, weights=rejected,
+                             minlength=len(columns.tenant_keys))[keys]
+    for key, count, row, rejects in zip(keys.tolist(), counts.tolist(),
+                                        table.tolist(), rejections.tolist()):
+        report['tenants'].append({
+            'tenant': columns.tenant_keys[key],
+            'reviews': count,
+            'turnaround': row,
+            'rejection_rate': rejects / count,
+        })
+    report['tenants'].sort(key=lambda item: item['reviews'], reverse=True)
+    return report
+
+
+def format_hours(hours):
+    return ' '.join(f'{hour:02d}:{count}' for hour, count in enumerate(hours)
+                    if count)
+
+
+def format_report(report, top=20):
+    """Текст сводки для консоли; длительности - в часах."""
+    names = '/'.join(f'p{quantile * 100:g}' for quantile in
+                     report['quantiles'])
+    lines = [f'Переходов: {report["transitions"]}, '
+             f'проверок: {report["reviews"]}']
+    if not report['reviews']:
+        return '\n'.join(lines)
+    lines.append('Время проверки {}, ч: {}; среднее {:.1f}'.format(
+        names,
+        ' / '.join(f'{value / 3600:.1f}' for value in report['turnaround']),
+        report['mean'] / 3600
+    ))
+    lines.append(f'Доля отказов: {report["rejection_rate"]:.1%}')
+    lines.append(f'Взяты на проверку по часам: '
+                 f'{format_hours(report["review_hours"])}')
+    lines.append(f'Вердикты по часам: '
+                 f'{format_hours(report["verdict_hours"])}')
+    lines.append(f'Подписчики (первые {top} по числу проверок):')
+    for item in report['tenants'][:top]:
+        lines.append('  {}: проверок {}, {} ч {}, отказов {:.0%}'.format(
+            item['tenant'], item['reviews'], names,
+            ' / '.join(f'{value / 3600:.1f}' for value in item['turnaround']),
+            item['rejection_rate']
+        ))
+    return '\n'.join(lines)
@@ -0,0 +1,434 @@
+"""Архив ответов API и переходов статусов.
+
+Записи дописываются в сжатые сегменты, к каждому закрытому сегменту
+прилагается индекс по подписчику и времени. Просмотр истории подписчика:
+
+    python archive.py --dir archive history --tenant '<chat_id>:<хэш токена>'
+    python archive.py --dir archive turnaround
+"""
+import argparse
+import asyncio
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import zlib
+from datetime import datetime, timezone
+
+from clock import get_clock
+from response_decoder import loads
+
+RESPONSE = 'response'
+TRANSITION = 'transition'
+SEGMENT_BYTES = 16 * 1024 * 1024
+BLOCK_RECORDS = 256
+FLUSH_INTERVAL = 10
+BLOCK_HEADER = struct.Struct('<I')
+# Хэш подписчика, время, смещение и длина блока, номер записи в блоке.
+INDEX_ENTRY = struct.Struct('<QdQIH')
+# Номер сегмента и необязательный номер пишущего процесса.
+SEGMENT_NAME = re.compile(r'^(\d{6})(?:\.(\w+))?\.seg$')
+
+
+def tenant_hash(tenant_key):
+    """64-битный хэш ключа подписчика для индекса."""
+    digest = hashlib.blake2b(tenant_key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class Segment:
+    """Закрытый сегмент архива с индексом, открытым через mmap."""
+
+    def __init__(self, path, index_path):
+        self.path = path
+        self.index_path = index_path
+        self.count = os.path.getsize(index_path) // INDEX_ENTRY.size
+        self._index = None
+        if self.count:
+            with open(index_path, 'rb') as file:
+                self._index = mmap.mmap(file.fileno(), 0,
+                                        access=mmap.ACCESS_READ)
+
+    def entry(self, position):
+        return INDEX_ENTRY.unpack_from(self._index,
+                                       position * INDEX_ENTRY.size)
+
+    def bisect(self, key):
+        """Первая позиция индекса, где (хэш, время) не меньше key."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.entry(middle)[:2] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find(self, hashed, since, until):
+        """Записи индекса подписчика hashed за [since, until]."""
+        position = self.bisect((hashed, since))
+        while position < self.count:
+            entry = self.entry(position)
+            if entry[0] != hashed or entry[1] > until:
+                break
+            yield entry
+            position += 1
+
+    def close(self):
+        if self._index is not None:
+            self._index.close()
+
+
+class ScannedSegment:
+    """Сегмент без файла индекса: индекс собран в памяти при чтении."""
+
+    def __init__(self, path, entries):
+        self.path = path
+        self.entries = sorted(entries)
+
+    def find(self, hashed, since, until):
+        start = bisect.bisect_left(self.entries, (hashed, since))
+        for entry in self.entries[start:]:
+            if entry[0] != hashed or entry[1] > until:
+                break
+            yield entry
+
+    def close(self):
+        pass
+
+
+class ResponseArchive:
+    """Дописываемый архив в каталоге directory.
+
+    Записи копятся блоками по block_records штук, каждый блок сжимается
+    zlib и дописывается в текущий сегмент. Когда сегмент вырастает больше
+    segment_bytes (и при закрытии архива), рядом с ним пишется индекс
+    из записей фиксированной длины, отсортированный по подписчику и
+    времени, - поиск по нему двоичный и читает только нужные блоки.
+    С readonly=True архив только читается, в том числе пока в него
+    пишет работающий бот. Несколько процессов пишут в один каталог под
+    разными writer, каждый в свои сегменты; читаются сегменты всех.
+    """
+
+    def __init__(self, directory, segment_bytes=SEGMENT_BYTES,
+                 block_records=BLOCK_RECORDS, clock=None, readonly=False,
+                 writer=None):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.block_records = block_records
+        self.clock = clock or (lambda: get_clock().time())
+        self.readonly = readonly
+        self.writer = None if writer is None else str(writer)
+        self._lock = threading.Lock()
+        if not readonly:
+            os.makedirs(directory, exist_ok=True)
+        self.segments = []
+        own = []
+        for name in sorted(os.listdir(directory)):
+            match = SEGMENT_NAME.match(name)
+            if match is None:
+                continue
+            number, writer = int(match.group(1)), match.group(2)
+            path = os.path.join(self.directory, name)
+            index_path = path[:-len('seg')] + 'idx'
+            if writer == self.writer and not readonly:
+                own.append(number)
+                if not os.path.exists(index_path):
+                    self._write_index(number, self._scan(path))
+            if os.path.exists(index_path):
+                self.segments.append(Segment(path, index_path))
+            else:
+                self.segments.append(ScannedSegment(path, self._scan(path)))
+        self._number = max(own) + 1 if own else 1
+        self._file = None
+        self._entries = []
+        self._block = []
+        if not readonly:
+            self._open_segment()
+
+    def _path(self, number, suffix):
+        tag = '' if self.writer is None else f'.{self.writer}'
+        return os.path.join(self.directory, f'{number:06d}{tag}.{suffix}')
+
+    def _open_segment(self):
+        self._file = open(self._path(self._number, 'seg'), 'ab')
+        self._entries = []
+        self._block = []
+
+    def _scan(self, path):
+        """Индекс сегмента, оставшегося без него после сбоя."""
+        entries = []
+        for offset, length, lines in iter_blocks(path):
+            for position, line in enumerate(lines):
+                record = loads(line)
+                entries.append((tenant_hash(record['tenant']), record['ts'],
+                                offset, length, position))
+        return entries
+
+    def _write_index(self, number, entries):
+        entries.sort()
+        path = self._path(number, 'idx')
+        with open(path + '.tmp', 'wb') as file:
+            for entry in entries:
+                file.write(INDEX_ENTRY.pack(*entry))
+        os.replace(path + '.tmp', path)
+
+    def append(self, tenant_key, kind, data, ts=None):
+        """Дописываем запись kind (RESPONSE или TRANSITION) подписчика."""
+        record = {
+            'ts': self.clock() if ts is None else ts,
+            'tenant': tenant_key,
+            'kind': kind,
+            'data': data,
+        }
+        with self._lock:
+            self._block.append(record)
+            if len(self._block) >= self.block_records:
+                self._flush_block()
+                if self._file.tell() >= self.segment_bytes:
+                    self._seal()
+
+    def _flush_block(self):
+        if not self._block:
+            return
+        payload = zlib.compress(b'\n'.join(
+            json.dumps(record, ensure_ascii=False).encode()
+            for record in self._block
+        ))
+        offset = self._file.tell()
+        self._file.write(BLOCK_HEADER.pack(len(payload)) + payload)
+        self._file.flush()
+        length = BLOCK_HEADER.size + len(payload)
+        for position, record in enumerate(self._block):
+            self._entries.append((tenant_hash(record['tenant']),
+                                  record['ts'], offset, length, position))
+        self._block = []
+
+    def _seal(self):
+        self._file.close()
+        self._write_index(self._number, self._entries)
+        self.segments.append(Segment(self._path(self._number, 'seg'),
+                                     self._path(self._number, 'idx')))
+        self._number += 1
+        self._open_segment()
+
+    def flush(self):
+        """Сжимаем и записываем накопленный блок."""
+        with self._lock:
+            self._flush_block()
+
+    async def run(self, interval=FLUSH_INTERVAL):
+        """Служба опроса: раз в interval секунд записываем неполный блок.
+
+        Без неё записи лежат в памяти, пока блок не заполнится, и
+        пропадают при аварийной остановке процесса.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            await loop.run_in_executor(None, self.flush)
+
+    def query(self, tenant_key, since=float('-inf'), until=float('inf')):
+        """Записи подписчика за [since, until] в порядке времени."""
+        hashed = tenant_hash(tenant_key)
+        segments, entries, active_path, block = self._snapshot()
+        active = sorted(entry for entry in entries
+                        if entry[0] == hashed and since <= entry[1] <= until)
+        pending = [record for record in block
+                   if record['tenant'] == tenant_key
+                   and since <= record['ts'] <= until]
+        records = []
+        for segment in segments:
+            records.extend(self._read(segment.path,
+                                      segment.find(hashed, since, until)))
+        if active:
+            records.extend(self._read(active_path, active))
+        records = [record for record in records
+                   if record['tenant'] == tenant_key] + pending
+        # Сегменты разных процессов пересекаются по времени.
+        records.sort(key=lambda record: record['ts'])
+        return records
+
+    def tail(self, tenant_key, limit, kind=None):
+        """Последние limit записей подписчика (или его записей kind).
+
+        Блоки распаковываются от новых записей к старым, пока их не
+        наберётся limit, - вся история подписчика не читается.
+        """
+        hashed = tenant_hash(tenant_key)
+        segments, entries, active_path, block = self._snapshot()
+        paths = [segment.path for segment in segments] + [active_path]
+        candidates = [(entry, number) for number, segment
+                      in enumerate(segments)
+                      for entry in segment.find(hashed, float('-inf'),
+                                                float('inf'))]
+        candidates.extend((entry, len(segments)) for entry in entries
+                          if entry[0] == hashed)
+        # От новых к старым, при равном времени - в обратном порядке записи.
+        candidates.sort(key=lambda candidate: (
+            candidate[0][1], candidate[1], candidate[0][2], candidate[0][4]
+        ), reverse=True)
+        pending = [record for record in block
+                   if record['tenant'] == tenant_key
+                   and kind in (None, record['kind'])]
+        pending_ts = sorted(record['ts'] for record in pending)
+        records = []
+        blocks = {}
+        for entry, number in candidates:
+            # Ещё не записанные в сегмент записи новее entry тоже в счёт.
+            newer = len(pending_ts) - bisect.bisect_left(pending_ts, entry[1])
+            if len(records) + newer >= limit:
+                break
+            lines = self._block_lines(blocks, paths[number], entry)
+            record = loads(lines[entry[4]])
+            if (record['tenant'] == tenant_key
+                    and kind in (None, record['kind'])):
+                records.append(record)
+        records.reverse()
+        records.extend(pending)
+        records.sort(key=lambda record: record['ts'])
+        return records[-limit:] if limit else []
+
+    def _snapshot(self):
+        """Копия состояния архива для чтения без блокировки.
+
+        Под блокировкой только копируются списки, распаковка блоков идёт
+        вне её и не задерживает append.
+        """
+        with self._lock:
+            return (list(self.segments), list(self._entries),
+                    self._path(self._number, 'seg'), list(self._block))
+
+    def scan(self, kind=None):
+        """Все записи архива (или только записи kind) в порядке записи.
+
+        Распаковывается весь архив - это чтение для аналитики, а не поиск.
+        """
+        with self._lock:
+            self._flush_block()
+            paths = [segment.path for segment in self.segments]
+            if self._file is not None:
+                paths.append(self._path(self._number, 'seg'))
+        # Записи пишет json.dumps с разделителями по умолчанию, поэтому
+        # чужие виды записей отсеиваются до разбора JSON.
+        marker = None if kind is None else f'"kind": "{kind}"'.encode()
+        for path in paths:
+            for _, _, lines in iter_blocks(path):
+                for line in lines:
+                    if marker is None or marker in line:
+                        yield loads(line)
+
+    def _read(self, path, entries):
+        """Читаем записи, распаковывая только блоки из entries."""
+        blocks = {}
+        return [loads(self._block_lines(blocks, path, entry)[entry[4]])
+                for entry in entries]
+
+    @staticmethod
+    def _block_lines(blocks, path, entry):
+        """Строки блока записи entry; распакованные блоки копятся в blocks."""
+        offset, length = entry[2], entry[3]
+        lines = blocks.get((path, offset))
+        if lines is None:
+            with open(path, 'rb') as file:
+                file.seek(offset + BLOCK_HEADER.size)
+                lines = blocks[path, offset] = zlib.decompress(
+                    file.read(length - BLOCK_HEADER.size)
+                ).splitlines()
+        return lines
+
+    def close(self):
+        """Записываем остаток, индекс текущего сегмента и закрываем файлы."""
+        with self._lock:
+            if self._file is not None:
+                self._flush_block()
+                if self._entries:
+                    self._seal()
+                self._file.close()
+                os.remove(self._path(self._number, 'seg'))
+                self._file = None
+            for segment in self.segments:
+                segment.close()
+
+
+def iter_blocks(path):
+    """Блоки сегмента: (смещение, длина, строки записей).
+
+    Недописанный последний блок (сбой во время записи) пропускается.
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+    offset = 0
+    while offset + BLOCK_HEADER.size <= len(data):
+        (length,) = BLOCK_HEADER.unpack_from(data, offset)
+        start = offset + BLOCK_HEADER.size
+        if start + length > len(data):
+            break
+        block = zlib.decompress(data[start:start + length])
+        yield offset, BLOCK_HEADER.size + length, block.splitlines()
+        offset = start + length
+
+
+def format_record(record):
+    moment = datetime.fromtimestamp(record['ts'], timezone.utc)
+    return (f'{moment:%Y-%m-%d %H:%M:%S} {record["kind"]:<10} '
+            f'{json.dumps(record["data"], ensure_ascii=False)}')
+
+
+def show_history(args):
+    archive = ResponseArchive(args.dir, readonly=True)
+    try:
+        for record in archive.query(args.tenant, args.since, args.until):
+            if args.kind is None or record['kind'] == args.kind:
+                print(format_record(record))
+    finally:
+        archive.close()
+
+
+def show_turnaround(args):
+    import analytics
+
+    archive = ResponseArchive(args.dir, readonly=True)
+    try:
+        columns = analytics.load_transitions(archive)
+    finally:
+        archive.close()
+    report = analytics.turnaround_report(columns, tz_offset=args.tz_offset)
+    print(analytics.format_report(report, top=args.top))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='История и статистика архива ответов API'
+    )
+    parser.add_argument('--dir', default='archive')
+    commands = parser.add_subparsers(dest='command', required=True)
+    history = commands.add_parser(
+        'history', help='ответы API и статусы подписчика'
+    )
+    history.add_argument('--tenant', required=True,
+                         help='ключ подписчика: chat_id:хэш токена')
+    history.add_argument('--since', type=float, default=float('-inf'),
+                         help='unix-время начала')
+    history.add_argument('--until', type=float, default=float('inf'),
+                         help='unix-время конца')
+    history.add_argument('--kind', choices=(RESPONSE, TRANSITION))
+    history.set_defaults(handler=show_history)
+    turnaround = commands.add_parser(
+        'turnaround', help='время проверки, доля отказов, часы (NumPy)'
+    )
+    turnaround.add_argument('--tz-offset', type=float, default=3,
+                            help='сдвиг часового пояса для гистограмм, ч')
+    turnaround.add_argument('--top', type=int, default=20,
+                            help='сколько подписчиков показать')
+    turnaround.set_defaults(handler=show_turnaround)
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
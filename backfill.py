@@ -0,0 +1,103 @@
+"""Первичная загрузка истории подписчиков без уведомлений.
+
+Для каждого подписчика без сохранённого состояния запрашивается история
+работ с from_date=--since, последние статусы и current_date записываются
+в хранилище (и архив), но в Telegram ничего не отправляется. Подписчики
+загружаются параллельно, не больше --concurrency одновременно:
+
+    python backfill.py --since 0 --concurrency 100
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+
+import archive
+import homework
+from engine import PollingEngine
+from storage import CheckpointStore
+
+logger = logging.getLogger(__name__)
+
+
+def backfill_tenant(tenant, since=0, store=None, history=None):
+    """Загружаем историю подписчика с момента since.
+
+    Возвращает число работ, статусы которых записаны, или None при сбое.
+    """
+    try:
+        response, homeworks = homework.fetch_homeworks(since)
+        if history is not None:
+            history.append(tenant.key, archive.RESPONSE, response)
+        changed = homework.diff_homeworks(homeworks, tenant.statuses)
+        for item in changed:
+            homework.remember_transition(tenant, item, store, history)
+        tenant.current_timestamp = response['current_date']
+        if store is not None:
+            store.save_checkpoint(tenant.key, tenant.current_timestamp)
+    except Exception as error:
+        logger.error('Не удалось загрузить историю %s: %s', tenant, error)
+        return None
+    return len(changed)
+
+
+def run_backfill(tenants, since=0, concurrency=100, store=None,
+                 history=None, executor=None):
+    """Загружаем историю подписчиков параллельно, возвращаем сводку."""
+    engine = PollingEngine(
+        lambda tenant: backfill_tenant(tenant, since, store, history),
+        tenants,
+        retry_time=homework.RETRY_TIME,
+        concurrency=concurrency,
+        executor=executor
+    )
+    started = time.perf_counter()
+    results = asyncio.run(engine.poll_round())
+    failed = sum(1 for result in results if result is None)
+    return {
+        'tenants': len(results),
+        'failed': failed,
+        'homeworks': sum(result for result in results if result),
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Загрузка истории подписчиков без уведомлений'
+    )
+    parser.add_argument('--since', type=int, default=0,
+                        help='from_date первого запроса (unix-время)')
+    parser.add_argument('--concurrency', type=int,
+                        default=homework.POLL_CONCURRENCY)
+    parser.add_argument('--force', action='store_true',
+                        help='загрузить и уже сохранённых подписчиков')
+    args = parser.parse_args()
+    if not homework.TENANTS_FILE and not homework.PRACTICUM_TOKEN:
+        sys.exit('Укажите TENANTS_FILE или PRACTICUM_TOKEN')
+    logging.basicConfig(level=homework.LOG_LEVEL)
+    store = CheckpointStore(homework.STATE_DB)
+    history = (archive.ResponseArchive(homework.ARCHIVE_DIR)
+               if homework.ARCHIVE_DIR else None)
+    try:
+        tenants = homework.get_tenants(0)
+        pending = []
+        for tenant in tenants:
+            if args.force or store.load_checkpoint(tenant.key) is None:
+                store.restore(tenant)
+                pending.append(tenant)
+        logger.info('Загружаем историю подписчиков: %s из %s',
+                    len(pending), len(tenants))
+        summary = run_backfill(pending, args.since, args.concurrency,
+                               store, history)
+        logger.info('История загружена: %s', summary)
+    finally:
+        store.close()
+        if history is not None:
+            history.close()
+        homework.api_session.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Бенчмарк аналитики времени проверки на синтетических переходах.
+
+Замеряется turnaround_report на колонках из миллионов переходов и
+чтение переходов из архива (load_transitions):
+
+    python benchmarks/bench_analytics.py --transitions 1000000 5000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import numpy as np  # noqa: E402
+
+import analytics  # noqa: E402
+from archive import TRANSITION, ResponseArchive  # noqa: E402
+
+START = 1650000000
+
+
+def make_columns(count, tenants=10000, seed=0):
+    """Работы по два перехода: reviewing и вердикт через 1-48 ч."""
+    rng = np.random.default_rng(seed)
+    reviews = count // 2
+    homework = np.repeat(np.arange(reviews, dtype=np.int64), 2)
+    tenant = (homework % tenants).astype(np.int32)
+    started = START + rng.uniform(0, 90 * 86400, reviews)
+    moment = np.empty(reviews * 2)
+    moment[0::2] = started
+    moment[1::2] = started + rng.uniform(3600, 48 * 3600, reviews)
+    status = np.empty(reviews * 2, dtype=np.int8)
+    status[0::2] = analytics.REVIEWING
+    status[1::2] = np.where(rng.random(reviews) < 0.3, analytics.REJECTED,
+                            analytics.APPROVED)
+    # В архиве переходы идут в порядке времени.
+    order = np.argsort(moment)
+    keys = [f'{index}:key' for index in range(tenants)]
+    return analytics.TransitionColumns(tenant[order], homework[order],
+                                       moment[order], status[order], keys)
+
+
+def bench_archive(count):
+    """Секунды на запись и на чтение count переходов из архива."""
+    with tempfile.TemporaryDirectory() as directory:
+        archive = ResponseArchive(directory)
+        start = time.perf_counter()
+        for index in range(count):
+            archive.append(f'{index % 1000}:key', TRANSITION, {
+                'homework': str(index // 2),
+                'homework_name': f'hw{index // 2}',
+                'status': 'reviewing' if index % 2 == 0 else 'approved',
+                'date_updated': '2022-04-10T12:00:00Z',
+            }, ts=START + index)
+        archive.close()
+        written = time.perf_counter()
+        reader = ResponseArchive(directory, readonly=True)
+        columns = analytics.load_transitions(reader)
+        reader.close()
+        return written - start, time.perf_counter() - written, len(columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--transitions', type=int, nargs='+',
+                        default=[1000000, 5000000])
+    parser.add_argument('--archive-transitions', type=int, default=200000)
+    args = parser.parse_args()
+    for count in args.transitions:
+        columns = make_columns(count)
+        start = time.perf_counter()
+        report = analytics.turnaround_report(columns)
+        elapsed = time.perf_counter() - start
+        print(f'{count:>9} переходов: отчёт за {elapsed:.2f} с, '
+              f'проверок {report["reviews"]}, '
+              f'отказов {report["rejection_rate"]:.1%}')
+    if args.archive_transitions:
+        write, read, loaded = bench_archive(args.archive_transitions)
+        print(f'Архив, {loaded} переходов: запись {write:.2f} с, '
+              f'чтение в колонки {read:.2f} с')
+
+
+if __name__ == '__main__':
+    main()
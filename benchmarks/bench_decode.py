@@ -0,0 +1,99 @@
+"""Бенчмарк разбора ответа Практикума при разной длине истории работ.
+
+Для каждого размера истории замеряются время разбора, пик памяти во
+время разбора и память, которая остаётся занятой результатом: прежний
+response.json() против decode_response (потоковое чтение, orjson при
+наличии, только нужные поля) и ResponseCache.decode для тела, которое
+уже встречалось (отпечаток вместо разбора).
+
+    python benchmarks/bench_decode.py --homeworks 10 1000 10000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import response_decoder  # noqa: E402
+
+REPEATS = 20
+
+
+class BodyResponse:
+    """Ответ с готовым телом и интерфейсом requests.Response."""
+
+    def __init__(self, body):
+        self.body = body
+        self.headers = {'Content-Length': str(len(body))}
+
+    def json(self):
+        return json.loads(self.body)
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+def make_body(count):
+    homeworks = [{
+        'id': index,
+        'status': 'approved',
+        'homework_name': f'student__project_{index}.zip',
+        'reviewer_comment': 'Отличная работа! ' * 20,
+        'date_updated': '2022-04-10T12:00:00Z',
+        'lesson_name': f'Спринт {index % 20}',
+    } for index in range(count)]
+    return json.dumps({'homeworks': homeworks,
+                       'current_date': 1650000000}).encode()
+
+
+def measure(decode, body):
+    """Среднее время, пик и остаточная память одного разбора."""
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        decode(BodyResponse(body))
+    elapsed = (time.perf_counter() - start) / REPEATS
+    tracemalloc.start()
+    result = decode(BodyResponse(body))
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--homeworks', type=int, nargs='+',
+                        default=[10, 1000, 10000])
+    args = parser.parse_args()
+    limit = 1 << 30
+    cache = response_decoder.ResponseCache()
+    decoders = (
+        ('json()', lambda response: response.json()),
+        ('decode', lambda response: response_decoder.decode_response(
+            response, limit)),
+        ('cached', lambda response: cache.decode(response,
+                                                 max_bytes=limit)),
+    )
+    backend = 'orjson' if response_decoder.orjson else 'json'
+    print(f'Бэкенд decode_response: {backend}')
+    print(f'{"работ":>7} {"тело, КБ":>9} {"способ":>7} {"мс":>8} '
+          f'{"пик, КБ":>9} {"остаётся, КБ":>13}')
+    for count in args.homeworks:
+        body = make_body(count)
+        for name, decode in decoders:
+            elapsed, peak, retained = measure(decode, body)
+            print(f'{count:>7} {len(body) // 1024:>9} {name:>7} '
+                  f'{elapsed * 1000:>8.2f} {peak // 1024:>9} '
+                  f'{retained // 1024:>13}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""Бенчмарк цикла опроса на локальных заглушках Практикума и Telegram.
+
+Через настоящие get_api_answer, check_response, parse_status и
+send_message прогоняются 1, 100 и 10 000 подписчиков; выводятся опросы
+в секунду, p50/p99 длительности опроса и память на подписчика.
+Результаты сохраняются в benchmarks/results для сравнения:
+
+    python benchmarks/bench_polling.py --tenants 1 100 10000
+    python benchmarks/bench_polling.py --compare benchmarks/results/<файл>
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from telegram import Bot  # noqa: E402
+from telegram.utils.request import Request  # noqa: E402
+
+import homework  # noqa: E402
+from engine import PollingEngine  # noqa: E402
+from http_session import PracticumSession  # noqa: E402
+from stub_servers import (PracticumStubHandler, TelegramStubHandler,  # noqa
+                          start_server)
+from tenants import Tenant  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+
+
+def percentile(values, fraction):
+    """Перцентиль по отсортированной выборке."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(len(ordered) * fraction), len(ordered) - 1)
+    return ordered[index]
+
+
+def make_tenants(count):
+    now = int(time.time())
+    return [Tenant(f'token-{index}', index, now) for index in range(count)]
+
+
+def make_bot(telegram_url, concurrency):
+    return Bot('123456:benchmark', base_url=f'{telegram_url}/bot',
+               request=Request(con_pool_size=concurrency))
+
+
+def poll_rounds(bot, tenants, concurrency, rounds, latencies=None):
+    """Опрашиваем подписчиков rounds раз через PollingEngine."""
+    def poll(tenant):
+        start = time.perf_counter()
+        result = homework.poll_tenant(bot, tenant)
+        if latencies is not None:
+            latencies.append(time.perf_counter() - start)
+        return result
+
+    engine = PollingEngine(poll, tenants, retry_time=0,
+                           concurrency=concurrency)
+    for _ in range(rounds):
+        asyncio.run(engine.poll_round())
+
+
+def memory_per_tenant(bot, count, concurrency):
+    """Прирост памяти на подписчика после одного цикла опроса."""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tenants = make_tenants(count)
+    poll_rounds(bot, tenants, concurrency, 1)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return used / count
+
+
+def bench(count, args, practicum, telegram):
+    homework.api_session = PracticumSession(pool_size=args.concurrency,
+                                            retries=0)
+    bot = make_bot(telegram.url, args.concurrency)
+    tenants = make_tenants(count)
+    latencies = []
+    messages_before = telegram.RequestHandlerClass.messages_count
+    start = time.perf_counter()
+    poll_rounds(bot, tenants, args.concurrency, args.rounds, latencies)
+    elapsed = time.perf_counter() - start
+    messages = telegram.RequestHandlerClass.messages_count - messages_before
+    result = {
+        'tenants': count,
+        'polls': len(latencies),
+        'seconds': round(elapsed, 3),
+        'polls_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'messages': messages,
+        'connections': homework.api_session.stats(),
+    }
+    if not args.skip_memory:
+        result['memory_per_tenant_bytes'] = round(
+            memory_per_tenant(bot, min(count, args.memory_tenants),
+                              args.concurrency)
+        )
+    homework.api_session.close()
+    return result
+
+
+def compare(current, previous_path):
+    """Печатаем изменение показателей относительно сохранённого запуска."""
+    with open(previous_path, encoding='utf-8') as file:
+        previous = {
+            item['tenants']: item for item in json.load(file)['results']
+        }
+    for item in current:
+        before = previous.get(item['tenants'])
+        if before is None:
+            continue
+        for key in ('polls_per_sec', 'p50_ms', 'p99_ms',
+                    'memory_per_tenant_bytes'):
+            if key in item and key in before and before[key]:
+                change = (item[key] - before[key]) / before[key] * 100
+                print(f'{item["tenants"]:>6} {key:<24} '
+                      f'{before[key]:>10} -> {item[key]:>10} '
+                      f'({change:+.1f}%)')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--tenants', type=int, nargs='+',
+                        default=[1, 100, 10000])
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='задержка ответа заглушек, секунды')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--homeworks', type=int, default=1,
+                        help='число работ в ответе Практикума')
+    parser.add_argument('--change-every', type=int, default=0,
+                        help='менять статусы каждые N запросов (0 - никогда)')
+    parser.add_argument('--memory-tenants', type=int, default=10000)
+    parser.add_argument('--skip-memory', action='store_true')
+    parser.add_argument('--compare', help='файл прошлого запуска')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.disable(logging.CRITICAL)
+    options = {'latency': args.latency, 'error_rate': args.error_rate}
+    practicum = start_server(PracticumStubHandler,
+                             homeworks_count=args.homeworks,
+                             change_every=args.change_every, **options)
+    telegram = start_server(TelegramStubHandler, **options)
+    homework.ENDPOINT = (f'{practicum.url}/api/user_api/'
+                         'homework_statuses/')
+    results = []
+    try:
+        for count in args.tenants:
+            result = bench(count, args, practicum, telegram)
+            print(json.dumps(result, ensure_ascii=False))
+            results.append(result)
+    finally:
+        practicum.shutdown()
+        telegram.shutdown()
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(
+        RESULTS_DIR, time.strftime('bench_polling-%Y%m%d-%H%M%S.json')
+    )
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'params': vars(args), 'results': results}, file,
+                  ensure_ascii=False, indent=2)
+    print(f'Результаты сохранены: {path}')
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Память на состояние одного подписчика, замер через tracemalloc.
+
+Сравниваются компактный Tenant (__slots__, коды статусов, отпечаток
+ошибки) и прежнее состояние из словаря со строками. Токены и chat_id
+создаются заранее - это входные данные, общие для обоих вариантов.
+По умолчанию у подписчика одна работа, как в прежнем main()
+(previous_homework, previous_status):
+
+    python benchmarks/bench_tenant_memory.py --tenants 10000 --homeworks 1
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from tenants import Tenant  # noqa: E402
+
+STATUSES = ('approved', 'reviewing', 'rejected')
+ERROR = 'Эндпоинт недоступен. Код ответа API: 503'
+
+
+def fill_compact(tokens, chat_ids, homeworks):
+    tenants = []
+    for token, chat_id in zip(tokens, chat_ids):
+        tenant = Tenant(token, chat_id, 1650000000 + chat_id)
+        for number in range(homeworks):
+            tenant.set_status(f'hw-{number}', STATUSES[number % 3])
+        tenant.remember_error(f'{ERROR} ({chat_id})')
+        tenants.append(tenant)
+    return tenants
+
+
+def fill_legacy(tokens, chat_ids, homeworks):
+    tenants = []
+    for token, chat_id in zip(tokens, chat_ids):
+        tenants.append({
+            'practicum_token': token,
+            'chat_id': chat_id,
+            'current_timestamp': 1650000000 + chat_id,
+            'statuses': {f'hw-{number}': STATUSES[number % 3]
+                         for number in range(homeworks)},
+            'previous_error': f'{ERROR} ({chat_id})',
+        })
+    return tenants
+
+
+def measure(fill, tokens, chat_ids, homeworks):
+    """Байт на подписчика, выделенных при заполнении состояния."""
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tenants = fill(tokens, chat_ids, homeworks)
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    # Список самих подписчиков - не их состояние.
+    allocated -= sys.getsizeof(tenants)
+    return allocated / len(tokens)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, default=10000)
+    parser.add_argument('--homeworks', type=int, default=1)
+    args = parser.parse_args()
+    tokens = [f'y0_AgAAAAA{index:030d}' for index in range(args.tenants)]
+    chat_ids = list(range(100000000, 100000000 + args.tenants))
+    for name, fill in (('dict', fill_legacy), ('compact', fill_compact)):
+        per_tenant = measure(fill, tokens, chat_ids, args.homeworks)
+        print(f'{name:>8}: {per_tenant:.0f} байт на подписчика')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Бенчмарк колеса таймеров против кучи heapq.
+
+Для 10 000, 100 000 и 1 000 000 таймеров замеряются добавление, отмена
+десятой части таймеров и установившийся режим: за каждый тик срабатывают
+просроченные таймеры и тут же ставятся заново, как опросы подписчиков.
+
+    python benchmarks/bench_timing_wheel.py --timers 10000 100000 1000000
+"""
+import argparse
+import heapq
+import os
+import random
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from timing_wheel import HierarchicalTimingWheel  # noqa: E402
+
+INTERVAL = 600
+TICKS = 600
+
+
+class HeapTimers:
+    """Таймеры на heapq с ленивой отменой, как в цикле событий asyncio."""
+
+    def __init__(self):
+        self.heap = []
+        self.sequence = 0
+
+    def schedule(self, moment, item):
+        self.sequence += 1
+        entry = [moment, self.sequence, item, False]
+        heapq.heappush(self.heap, entry)
+        return entry
+
+    def cancel(self, entry):
+        entry[3] = True
+
+    def advance(self, moment):
+        expired = []
+        while self.heap and self.heap[0][0] <= moment:
+            entry = heapq.heappop(self.heap)
+            if not entry[3]:
+                expired.append(entry[2])
+        return expired
+
+
+def run(timers, count, seed=1):
+    """Замеры для одной реализации; возвращает словарь секунд."""
+    rng = random.Random(seed)
+    deadlines = [rng.uniform(1, INTERVAL) for _ in range(count)]
+    start = time.perf_counter()
+    handles = [timers.schedule(deadline, index)
+               for index, deadline in enumerate(deadlines)]
+    inserted = time.perf_counter()
+    for handle in handles[::10]:
+        timers.cancel(handle)
+    cancelled = time.perf_counter()
+    fired = 0
+    for now in range(1, TICKS + 1):
+        for item in timers.advance(now):
+            fired += 1
+            timers.schedule(now + INTERVAL, item)
+    finished = time.perf_counter()
+    return {
+        'insert': inserted - start,
+        'cancel': cancelled - inserted,
+        'steady': finished - cancelled,
+        'fired': fired,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--timers', type=int, nargs='+',
+                        default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+    print(f'{"таймеров":>10} {"реализация":>10} {"добавление":>11} '
+          f'{"отмена":>8} {"тики":>8} {"мкс/срабат.":>12}')
+    for count in args.timers:
+        for name, timers in (('heapq', HeapTimers()),
+                             ('wheel', HierarchicalTimingWheel())):
+            result = run(timers, count)
+            per_fire = result['steady'] / max(result['fired'], 1) * 1e6
+            print(f'{count:>10} {name:>10} {result["insert"]:>11.3f} '
+                  f'{result["cancel"]:>8.3f} {result["steady"]:>8.3f} '
+                  f'{per_fire:>12.2f}')
+
+
+if __name__ == '__main__':
+    main()
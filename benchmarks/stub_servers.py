@@ -0,0 +1,196 @@
+"""Локальные заглушки API Практикума, Bot API Telegram, вебхука и SMTP."""
+import json
+import random
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STATUSES = ('reviewing', 'approved', 'rejected')
+
+
+def make_homeworks(count, version=0):
+    """Список работ; статус меняется с каждой версией ответа."""
+    return [
+        {
+            'id': index,
+            'homework_name': f'homework_{index}.zip',
+            'status': STATUSES[(index + version) % len(STATUSES)],
+            'reviewer_comment': 'Комментарий ревьюера',
+            'date_updated': '2022-10-11T10:00:00Z',
+            'lesson_name': f'Спринт {index}',
+        }
+        for index in range(count)
+    ]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Общая часть заглушек: keep-alive, задержка и ошибки."""
+
+    protocol_version = 'HTTP/1.1'
+    latency = 0.0
+    error_rate = 0.0
+
+    def send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def simulate(self):
+        """Задержка ответа; True, если нужно ответить ошибкой."""
+        if self.latency:
+            time.sleep(self.latency)
+        return random.random() < self.error_rate
+
+    def log_message(self, *args):
+        pass
+
+
+class PracticumStubHandler(StubHandler):
+    """Заглушка /api/user_api/homework_statuses/.
+
+    change_every - через сколько запросов меняются статусы работ.
+    """
+
+    homeworks_count = 1
+    change_every = 0
+    requests_count = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.requests_count += 1
+            count = cls.requests_count
+        if self.simulate():
+            self.send_json(500, {'code': 'UnknownError'})
+            return
+        version = count // cls.change_every if cls.change_every else 0
+        self.send_json(200, {
+            'homeworks': make_homeworks(cls.homeworks_count, version),
+            'current_date': int(time.time()),
+        })
+
+
+class TelegramStubHandler(StubHandler):
+    """Заглушка метода sendMessage Bot API."""
+
+    messages_count = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        cls = type(self)
+        with cls.lock:
+            cls.messages_count += 1
+            message_id = cls.messages_count
+        if self.simulate():
+            self.send_json(502, {'ok': False, 'error_code': 502,
+                                 'description': 'Bad Gateway'})
+            return
+        self.send_json(200, {'ok': True, 'result': {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': 1, 'type': 'private'},
+            'text': '',
+        }})
+
+
+class WebhookStubHandler(StubHandler):
+    """Заглушка вебхука: запоминает JSON принятых уведомлений."""
+
+    messages = None
+    lock = threading.Lock()
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length))
+        if self.simulate():
+            self.send_json(502, {'ok': False})
+            return
+        cls = type(self)
+        with cls.lock:
+            cls.messages.append(payload)
+        self.send_json(200, {'ok': True})
+
+
+class SmtpStubHandler(socketserver.StreamRequestHandler):
+    """Заглушка SMTP-сервера: принимает письма без проверок.
+
+    Поддерживает только команды, которые отправляет smtplib без
+    STARTTLS и авторизации.
+    """
+
+    latency = 0.0
+    messages = None
+    lock = threading.Lock()
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def read_data(self):
+        lines = []
+        for line in self.rfile:
+            if line == b'.\r\n':
+                break
+            lines.append(line)
+        return b''.join(lines)
+
+    def handle(self):
+        self.reply('220 stub ESMTP')
+        for line in self.rfile:
+            verb = line[:4].decode().upper()
+            if verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            if verb != 'DATA':
+                self.reply('250 OK')
+                continue
+            self.reply('354 End data with <CR><LF>.<CR><LF>')
+            message = self.read_data()
+            if self.latency:
+                time.sleep(self.latency)
+            cls = type(self)
+            with cls.lock:
+                cls.messages.append(message)
+            self.reply('250 OK')
+
+
+class StubTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start_smtp_server(**options):
+    """Запускаем заглушку SMTP на свободном порту в фоновом потоке.
+
+    Принятые письма (байты) копятся в server.messages.
+    """
+    options.setdefault('lock', threading.Lock())
+    options.setdefault('messages', [])
+    handler = type('SmtpStubHandler', (SmtpStubHandler,), options)
+    server = StubTCPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.messages = handler.messages
+    return server
+
+
+def start_server(handler, **options):
+    """Запускаем заглушку на свободном порту в фоновом потоке.
+
+    options переопределяют атрибуты класса обработчика (latency,
+    error_rate, homeworks_count, ...) только для этого сервера.
+    """
+    options.setdefault('lock', threading.Lock())
+    handler = type(handler.__name__, (handler,), options)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f'http://127.0.0.1:{server.server_port}'
+    return server
@@ -0,0 +1,136 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def parse_retry_after(value, now):
+    """Секунды ожидания из заголовка Retry-After (число или HTTP-дата)."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - now, 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """Общий для процесса предохранитель запросов к сервису.
+
+    После failure_threshold ошибок подряд (или ответа с Retry-After)
+    предохранитель размыкается и запросы не выполняются recovery_time
+    секунд. Затем пропускается один пробный запрос: успех замыкает цепь,
+    ошибка снова размыкает её. Если исход пробного запроса не записан за
+    probe_timeout секунд (по умолчанию recovery_time), предохранитель
+    снова считается разомкнутым и пропускает следующий пробный запрос.
+    """
+
+    def __init__(self, failure_threshold=5, recovery_time=60,
+                 clock=time.time, probe_timeout=None):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.probe_timeout = (recovery_time if probe_timeout is None
+                              else probe_timeout)
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.open_until = 0.0
+        self.probe_until = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Можно ли сейчас выполнить запрос."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = self.clock()
+            if self.state == HALF_OPEN and now >= self.probe_until:
+                # Пробный запрос завершился, не записав исход.
+                self.state = OPEN
+            if self.state == OPEN and now >= self.open_until:
+                self.state = HALF_OPEN
+                self.probe_until = now + self.probe_timeout
+                return True
+            return False
+
+    def record_success(self):
+        """Запрос выполнен успешно."""
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self, retry_after=None):
+        """Запрос завершился ошибкой; retry_after - пауза от сервиса."""
+        with self._lock:
+            self.failures += 1
+            if (retry_after is None and self.state == CLOSED
+                    and self.failures < self.failure_threshold):
+                return
+            pause = self.recovery_time if retry_after is None else retry_after
+            self.state = OPEN
+            self.open_until = max(self.open_until, self.clock() + pause)
+
+    def retry_in(self):
+        """Через сколько секунд будет пробный запрос."""
+        return max(self.open_until - self.clock(), 0.0)
+
+
+class AdaptiveLimiter:
+    """Предел одновременных запросов по схеме AIMD.
+
+    Каждый успешный запрос увеличивает предел на 1 / limit (примерно на
+    единицу за "поколение" запросов), перегрузка сервиса уменьшает его
+    вдвое. Вызов блокируется, пока число запросов не меньше предела.
+    """
+
+    def __init__(self, initial=10, minimum=1, maximum=100):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.inflight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout=None):
+        """Занимаем место; False, если его не дали за timeout секунд."""
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self.inflight >= int(self.limit):
+                if end is None:
+                    self._condition.wait()
+                    continue
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            self.inflight += 1
+            return True
+
+    def release(self):
+        with self._condition:
+            self.inflight -= 1
+            self._condition.notify()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def on_success(self):
+        """Сервис ответил нормально: понемногу увеличиваем предел."""
+        with self._condition:
+            self.limit = min(self.limit + 1 / self.limit, self.maximum)
+            self._condition.notify()
+
+    def on_overload(self):
+        """Сервис перегружен: уменьшаем предел вдвое."""
+        with self._condition:
+            self.limit = max(self.limit / 2, self.minimum)
@@ -0,0 +1,104 @@
+import asyncio
+import contextvars
+import selectors
+import time
+
+
+class SystemClock:
+    """Часы реального времени."""
+
+    def time(self):
+        """Текущее время (timestamp)."""
+        return time.time()
+
+    def monotonic(self):
+        """Монотонное время для измерения интервалов."""
+        return time.monotonic()
+
+    def new_event_loop(self):
+        """Цикл событий, работающий в этом времени."""
+        return asyncio.new_event_loop()
+
+
+class VirtualClock:
+    """Виртуальные часы: время идёт только при ожидании в цикле событий.
+
+    Цикл из new_event_loop не ждёт таймеров, а переводит часы сразу на
+    момент ближайшего из них, поэтому месяц опроса проходит за секунды.
+    """
+
+    def __init__(self, start=0.0):
+        self.start = float(start)
+        self.elapsed = 0.0
+
+    def time(self):
+        """Текущее виртуальное время (timestamp)."""
+        return self.start + self.elapsed
+
+    def monotonic(self):
+        """Секунды с момента запуска часов."""
+        return self.elapsed
+
+    def advance(self, seconds):
+        """Переводим часы вперёд."""
+        self.elapsed += max(seconds, 0)
+
+    def new_event_loop(self):
+        """Цикл событий, работающий в виртуальном времени."""
+        return VirtualTimeEventLoop(self)
+
+
+class VirtualTimeSelector(selectors.DefaultSelector):
+    """Селектор, который вместо ожидания переводит виртуальные часы."""
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if events or timeout is None:
+            return events or super().select(timeout)
+        self.clock.advance(timeout)
+        return events
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):
+    """Цикл событий asyncio с таймерами в виртуальном времени."""
+
+    def __init__(self, clock):
+        super().__init__(VirtualTimeSelector(clock))
+        self.clock = clock
+        self._clock_resolution = 1e-6
+
+    def time(self):
+        return self.clock.monotonic()
+
+
+current_clock = contextvars.ContextVar('current_clock', default=SystemClock())
+
+
+def get_clock():
+    """Часы текущего контекста: реальные или виртуальные."""
+    return current_clock.get()
+
+
+def run(coroutine, clock=None):
+    """Аналог asyncio.run с циклом событий выбранных часов."""
+    clock = clock or get_clock()
+    loop = clock.new_event_loop()
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(coroutine)
+    finally:
+        try:
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(
+                asyncio.gather(*tasks, return_exceptions=True)
+            )
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
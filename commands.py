@@ -0,0 +1,193 @@
+import asyncio
+import functools
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from telegram import TelegramError
+
+import archive
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+HISTORY_LIMIT = 10
+MAX_HISTORY_LIMIT = 50
+UPDATES_TIMEOUT = 30
+ERROR_BACKOFF = 5
+
+commands_total = registry.counter(
+    'homework_bot_commands_total', 'Обработанные команды пользователей.'
+)
+
+
+class StatusCache:
+    """Последние ответы API по подписчикам с временем жизни ttl секунд.
+
+    Работы из ответов накапливаются по homework_key, пока запись жива:
+    ответы API приходят с from_date и содержат только изменения. Когда
+    записей больше max_size, вытесняется давно не обновлявшаяся.
+    """
+
+    def __init__(self, ttl=3600, max_size=10000, clock=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def update(self, tenant_key, homeworks, key, now=None):
+        """Запоминаем работы из ответа API, проверенного check_response.
+
+        key(homework) - ключ работы, по нему новые статусы заменяют старые.
+        """
+        if now is None:
+            now = self.clock()
+        with self._lock:
+            entry = self._entries.pop(tenant_key, None)
+            known = {}
+            if entry is not None and now - entry[0] < self.ttl:
+                known = entry[1]
+            # Ответ API упорядочен от новых к старым.
+            for homework in reversed(homeworks):
+                known[key(homework)] = homework
+            self._entries[tenant_key] = (now, known)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get(self, tenant_key, now=None):
+        """(время проверки, работы) подписчика или None, если устарело."""
+        if now is None:
+            now = self.clock()
+        with self._lock:
+            entry = self._entries.get(tenant_key)
+            if entry is None:
+                return None
+            if now - entry[0] >= self.ttl:
+                del self._entries[tenant_key]
+                return None
+            return entry[0], list(entry[1].values())
+
+
+def format_moment(moment):
+    return f'{datetime.fromtimestamp(moment, timezone.utc):%d.%m %H:%M} UTC'
+
+
+class CommandHandler:
+    """Команды /status и /history в чатах подписчиков.
+
+    Обновления читаются длинным опросом getUpdates, ответы строятся
+    только по кэшу cache и архиву history, без запросов к API Практикума.
+    reply(chat_id, text) - отправка ответа (например, через очередь),
+    verdicts - тексты статусов. Сообщения из чужих чатов не обрабатываются.
+    """
+
+    def __init__(self, bot, tenants, cache, reply, verdicts, history=None,
+                 timeout=UPDATES_TIMEOUT):
+        self.bot = bot
+        self.cache = cache
+        self.reply = reply
+        self.verdicts = verdicts
+        self.history = history
+        self.timeout = timeout
+        self.offset = None
+        self.chats = {}
+        for tenant in tenants:
+            self.chats.setdefault(str(tenant.chat_id), []).append(tenant)
+
+    def handle(self, update):
+        """Текст ответа на обновление или None, если отвечать не нужно."""
+        message = update.effective_message
+        if message is None or not message.text:
+            return None
+        tenants = self.chats.get(str(message.chat_id))
+        if not tenants:
+            return None
+        words = message.text.split()
+        command = words[0].split('@')[0].lower()
+        if command == '/status':
+            commands_total.inc(command='status')
+            return '\n\n'.join(self.status(tenant) for tenant in tenants)
+        if command == '/history':
+            commands_total.inc(command='history')
+            limit = HISTORY_LIMIT
+            if len(words) > 1 and words[1].isdigit():
+                limit = min(int(words[1]), MAX_HISTORY_LIMIT)
+            return '\n\n'.join(self.transitions(tenant, limit)
+                               for tenant in tenants)
+        return None
+
+    def verdict(self, homework):
+        status = homework.get('status')
+        return (f'{homework.get("homework_name")}: '
+                f'{self.verdicts.get(status, status)}')
+
+    def status(self, tenant):
+        """Последние статусы работ подписчика по кэшу."""
+        entry = self.cache.get(tenant.key)
+        if entry is None:
+            return ('Свежих данных нет, статус придёт после '
+                    'следующей проверки.')
+        checked, homeworks = entry
+        lines = [f'Проверено {format_moment(checked)}.']
+        if not homeworks:
+            lines.append('С запуска бота статусы работ не менялись.')
+        lines.extend(self.verdict(homework) for homework in
+                     reversed(homeworks))
+        return '\n'.join(lines)
+
+    def transitions(self, tenant, limit):
+        """Последние limit смен статуса из архива, без архива - из кэша."""
+        if self.history is None:
+            entry = self.cache.get(tenant.key)
+            if entry is None:
+                return 'История недоступна.'
+            homeworks = entry[1][-limit:]
+        else:
+            homeworks = [record['data'] for record in
+                         self.history.tail(tenant.key, limit,
+                                           archive.TRANSITION)]
+        if not homeworks:
+            return 'Смен статуса ещё не было.'
+        return '\n'.join(
+            f'{homework.get("date_updated") or "-"} {self.verdict(homework)}'
+            for homework in reversed(homeworks)
+        )
+
+    def handle_updates(self, updates):
+        """Отвечаем на пачку обновлений и сдвигаем offset.
+
+        Ошибка ответа на одно обновление логируется и не мешает остальным:
+        offset уже сдвинут, и обновление не будет прочитано повторно.
+        """
+        for update in updates:
+            self.offset = update.update_id + 1
+            try:
+                text = self.handle(update)
+                if text:
+                    self.reply(update.effective_message.chat_id, text)
+            except Exception as error:
+                logger.exception('Сбой обработки обновления %s: %s',
+                                 update.update_id, error)
+
+    async def run(self):
+        """Длинный опрос getUpdates в пуле потоков."""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                updates = await loop.run_in_executor(None, functools.partial(
+                    self.bot.get_updates, offset=self.offset,
+                    timeout=self.timeout, allowed_updates=['message']
+                ))
+                await loop.run_in_executor(None, self.handle_updates,
+                                           updates)
+            except TelegramError as tg_error:
+                logger.warning('Не удалось получить команды: %s', tg_error)
+                await asyncio.sleep(ERROR_BACKOFF)
+            except Exception as error:
+                logger.exception('Сбой чтения команд: %s', error)
+                await asyncio.sleep(ERROR_BACKOFF)
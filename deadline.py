@@ -0,0 +1,76 @@
+import contextvars
+
+from clock import get_clock
+from exceptions import DeadlineExceededError
+from metrics import registry
+
+current_deadline = contextvars.ContextVar('current_deadline', default=None)
+
+deadline_exceeded = registry.counter(
+    'homework_bot_deadline_exceeded_total',
+    'Работа, прерванная по истечении срока, по этапам опроса.'
+)
+
+
+class Deadline:
+    """Момент, к которому должна завершиться работа.
+
+    Время берётся из монотонных часов clock.get_clock(), поэтому сроки
+    работают и в виртуальном времени симуляции.
+    """
+
+    def __init__(self, timeout, monotonic=None):
+        self.monotonic = monotonic or get_clock().monotonic
+        self.expires_at = self.monotonic() + timeout
+
+    def remaining(self):
+        """Сколько секунд осталось (отрицательно, если срок прошёл)."""
+        return self.expires_at - self.monotonic()
+
+    def stage(self, timeout):
+        """Срок этапа: не дольше timeout и не позже общего срока."""
+        child = Deadline(timeout, self.monotonic)
+        child.expires_at = min(child.expires_at, self.expires_at)
+        return child
+
+    def check(self, stage):
+        """DeadlineExceededError, если срок уже прошёл."""
+        if self.remaining() <= 0:
+            self.fail(stage)
+
+    def fail(self, stage):
+        """Прерываем этап stage: DeadlineExceededError."""
+        deadline_exceeded.inc(stage=stage)
+        raise DeadlineExceededError(
+            f'Истёк срок на этапе {stage}, '
+            f'опоздание {max(-self.remaining(), 0):.1f} с.'
+        )
+
+    def clip(self, timeout):
+        """Таймаут одной операции, урезанный до оставшегося срока."""
+        return max(min(timeout, self.remaining()), 0.001)
+
+
+def get_deadline():
+    """Срок текущего опроса или None."""
+    return current_deadline.get()
+
+
+def check_deadline(stage):
+    """Проверяем срок текущего опроса перед этапом stage."""
+    deadline = current_deadline.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+def stage_deadline(stage, timeout):
+    """Срок этапа stage в пределах срока текущего опроса.
+
+    Вне опроса (например, в потоке отправки) срок этапа отсчитывается
+    от текущего момента.
+    """
+    deadline = current_deadline.get()
+    if deadline is None:
+        return Deadline(timeout)
+    deadline.check(stage)
+    return deadline.stage(timeout)
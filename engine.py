@@ -0,0 +1,397 @@
+import asyncio
+import contextvars
+import functools
+import itertools
+import logging
+import math
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+
+from clock import get_clock
+from deadline import Deadline, current_deadline
+from log_config import current_request
+from metrics import registry
+from scheduler import PollStats
+from tenants import current_tenant
+from timing_wheel import HierarchicalTimingWheel
+
+logger = logging.getLogger(__name__)
+
+LAG_CHECK_INTERVAL = 1
+
+loop_lag = registry.gauge(
+    'homework_bot_loop_lag_seconds',
+    'Задержка цикла событий относительно запланированного пробуждения.'
+)
+polls_total = registry.counter(
+    'homework_bot_polls_total', 'Выполненные опросы подписчиков.'
+)
+POLL_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 45, 60)
+poll_seconds = registry.histogram(
+    'homework_bot_poll_seconds',
+    'Длительность цикла опроса подписчика, включая ожидание пула.',
+    buckets=POLL_BUCKETS
+)
+
+
+class InlineExecutor(Executor):
+    """Исполнитель, выполняющий задачу сразу в текущем потоке.
+
+    PollingEngine с таким исполнителем вызывает poll_tenant прямо в цикле
+    событий, без пула потоков (симуляция, заглушки без сетевых задержек).
+    """
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as error:
+            future.set_exception(error)
+        return future
+
+
+class PollingEngine:
+    """Асинхронный опрос API Практикума для множества подписчиков.
+
+    poll_tenant - синхронная функция одного цикла опроса подписчика,
+    она выполняется в пуле потоков с ограничением concurrency и
+    возвращает список работ, о которых отправлены уведомления.
+    Интервал между опросами задаёт policy (по умолчанию - retry_time),
+    общее число запросов ограничивает budget. background - корутинные
+    функции служб (например, очереди отправки), работающих рядом с опросом.
+    clock - часы для статистики, executor - пул для poll_tenant,
+    lag_interval - период замера задержки цикла событий (0 - не замерять).
+    Подписчики с одинаковым group_key(tenant) опрашиваются вместе одним
+    циклом; перед каждым циклом для группы вызывается prepare_group(group).
+    Сроки следующих опросов хранит иерархическое колесо таймеров с шагом
+    tick секунд. deadline - срок одного цикла опроса в секундах: он
+    отсчитывается с момента постановки в пул и доступен этапам цикла
+    через deadline.current_deadline (None - без срока).
+    """
+
+    def __init__(self, poll_tenant, tenants, retry_time, concurrency=100,
+                 policy=None, budget=None, report_interval=None,
+                 background=(), clock=None, executor=None,
+                 lag_interval=LAG_CHECK_INTERVAL, group_key=None,
+                 prepare_group=None, tick=1.0, deadline=None):
+        self.poll_tenant = poll_tenant
+        self.tenants = list(tenants)
+        self.retry_time = retry_time
+        self.concurrency = concurrency
+        self.policy = policy
+        self.budget = budget
+        self.report_interval = report_interval or retry_time
+        self.background = list(background)
+        self.clock = clock or get_clock()
+        self.stats = PollStats(clock=self.clock.time)
+        self.executor = executor
+        self.lag_interval = lag_interval
+        self.group_key = group_key
+        self.prepare_group = prepare_group
+        self.tick = tick
+        self.deadline = deadline
+        self.wheel = None
+        self._time = None
+        self._semaphore = None
+        self._executor = None
+        self._request_ids = itertools.count(1)
+        self._loop = None
+        self._task = None
+        self.quiet_polls = 0
+
+    def poll_values(self, tenant):
+        """Переменные контекста одного цикла опроса подписчика."""
+        values = [(current_tenant, tenant),
+                  (current_request, next(self._request_ids))]
+        if self.deadline is not None:
+            values.append((current_deadline,
+                           Deadline(self.deadline, self.clock.monotonic)))
+        return values
+
+    async def poll(self, tenant):
+        """Один цикл опроса подписчика в его контексте."""
+        async with self._semaphore:
+            values = self.poll_values(tenant)
+            if isinstance(self._executor, InlineExecutor):
+                return self.poll_inline(tenant, values)
+            context = contextvars.copy_context()
+            for variable, value in values:
+                context.run(variable.set, value)
+            started = self.clock.monotonic()
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self._executor,
+                    functools.partial(context.run, self.poll_tenant, tenant)
+                )
+            finally:
+                poll_seconds.observe(self.clock.monotonic() - started)
+
+    def poll_inline(self, tenant, values):
+        """poll_tenant прямо в цикле событий, в контексте текущей задачи.
+
+        Переменные values ставятся на время вызова и снимаются после него:
+        копия контекста на каждый опрос не нужна.
+        """
+        tokens = [(variable, variable.set(value))
+                  for variable, value in values]
+        started = self.clock.monotonic()
+        try:
+            return self.poll_tenant(tenant)
+        finally:
+            poll_seconds.observe(self.clock.monotonic() - started)
+            for variable, token in reversed(tokens):
+                variable.reset(token)
+
+    async def poll_safely(self, tenant):
+        """Опрос подписчика; сбой не прерывает опрос остальных."""
+        try:
+            return await self.poll(tenant) or []
+        except Exception as error:
+            logger.error('Сбой опроса %s: %s', tenant, error)
+            return []
+
+    async def poll_group(self, group):
+        """Один цикл опроса группы подписчиков одного токена.
+
+        Подписчики группы опрашиваются одновременно и делят запрос к API,
+        следующий цикл ставится в колесо таймеров по самому частому из
+        их интервалов.
+        """
+        try:
+            if self.budget is not None:
+                await self.budget.acquire()
+            if self.prepare_group is not None:
+                self.prepare_group(group)
+            if len(group) == 1:
+                results = [await self.poll_safely(group[0])]
+            else:
+                results = await asyncio.gather(
+                    *(self.poll_safely(tenant) for tenant in group)
+                )
+            self.finish_group(group, results)
+        finally:
+            self._slots.release()
+
+    def finish_group(self, group, results):
+        """Учитываем опросы группы и ставим её следующий цикл."""
+        delays = []
+        for tenant, notified in zip(group, results):
+            self.stats.record(notified)
+            polls_total.inc()
+            delays.append(self.next_delay(tenant, notified))
+        self.schedule(group, min(delays))
+
+    def poll_group_now(self, group):
+        """poll_group без цикла событий: подписчики группы по очереди."""
+        if self.prepare_group is not None:
+            self.prepare_group(group)
+        results = []
+        for tenant in group:
+            try:
+                notified = self.poll_inline(tenant, self.poll_values(tenant))
+            except Exception as error:
+                logger.error('Сбой опроса %s: %s', tenant, error)
+                notified = None
+            results.append(notified or [])
+        self.finish_group(group, results)
+
+    def schedule(self, group, delay):
+        """Ставим следующий опрос группы через delay секунд."""
+        moment = self._time() + delay
+        self.wheel.schedule(moment, group)
+        if self._wakeup is not None and moment < self._wake_at:
+            if not self._wakeup.done():
+                self._wakeup.set_result(None)
+
+    async def drive(self):
+        """Продвигаем колесо таймеров и отдаём сработавшие группы в опрос.
+
+        Число одновременно опрашиваемых групп ограничено concurrency;
+        между срабатываниями цикл спит до ближайшей непустой ячейки колеса.
+        """
+        loop = asyncio.get_running_loop()
+        inline = isinstance(self._executor, InlineExecutor)
+        while True:
+            for group in self.wheel.advance(loop.time()):
+                await self._slots.acquire()
+                if inline:
+                    # Опрос и так выполняется в цикле событий: отдельная
+                    # задача на группу только добавила бы итераций цикла.
+                    await self.poll_group(group)
+                    continue
+                task = loop.create_task(self.poll_group(group))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            self._wake_at = self.wheel.next_expiry()
+            self._wakeup = loop.create_future()
+            handle = None
+            if self._wake_at is not None:
+                handle = loop.call_at(self._wake_at, self._wake)
+            else:
+                self._wake_at = float('inf')
+            await self._wakeup
+            if handle is not None:
+                handle.cancel()
+
+    def _wake(self):
+        if self._wakeup is not None and not self._wakeup.done():
+            self._wakeup.set_result(None)
+
+    def groups(self):
+        """Подписчики, сгруппированные по group_key."""
+        if self.group_key is None:
+            return [[tenant] for tenant in self.tenants]
+        groups = {}
+        for tenant in self.tenants:
+            groups.setdefault(self.group_key(tenant), []).append(tenant)
+        return list(groups.values())
+
+    def next_delay(self, tenant, notified):
+        """Пауза до следующего опроса подписчика."""
+        if self.policy is None:
+            return self.retry_time
+        return self.policy.next_delay(tenant, bool(notified))
+
+    async def report(self):
+        """Периодически пишем в журнал число запросов и задержки."""
+        while True:
+            await asyncio.sleep(self.report_interval)
+            logger.info('Статистика опроса: %s', self.stats.summary())
+
+    async def watch_loop_lag(self):
+        """Измеряем, насколько цикл событий опаздывает с пробуждением."""
+        loop = asyncio.get_running_loop()
+        while self.lag_interval:
+            start = loop.time()
+            await asyncio.sleep(self.lag_interval)
+            loop_lag.set(max(loop.time() - start - self.lag_interval, 0))
+
+    def _start_wheel(self, time):
+        self._time = time
+        self.wheel = HierarchicalTimingWheel(tick=self.tick, start=time())
+        self._wakeup = None
+        self._wake_at = float('inf')
+
+    def _start(self):
+        self._start_wheel(asyncio.get_running_loop().time)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._tasks = set()
+        self._executor = self.executor or ThreadPoolExecutor(
+            max_workers=self.concurrency
+        )
+
+    async def poll_round(self):
+        """Однократно опрашиваем всех подписчиков.
+
+        Возвращает списки отправленных уведомлений в порядке подписчиков.
+        """
+        self._start()
+        try:
+            return await asyncio.gather(
+                *(self.poll(tenant) for tenant in self.tenants)
+            )
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def schedule_start(self):
+        """Ставим первые опросы всех групп.
+
+        Старт подписчиков равномерно распределён по интервалу retry_time,
+        чтобы не отправлять все запросы одновременно.
+        """
+        groups = self.groups()
+        step = self.retry_time / max(len(groups), 1)
+        logger.info('Запускаем опрос подписчиков: %s, токенов: %s',
+                    len(self.tenants), len(groups))
+        for index, group in enumerate(groups):
+            self.schedule(group, index * step)
+
+    async def run(self):
+        """Запускаем опрос всех подписчиков."""
+        self._start()
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        self.schedule_start()
+        try:
+            services = [service() for service in self.background]
+            await asyncio.gather(self.report(), self.watch_loop_lag(),
+                                 self.drive(), *services)
+        finally:
+            self._executor.shutdown(wait=False)
+
+    def stop(self):
+        """Отменяем run; можно вызывать из обработчика сигнала.
+
+        run завершается CancelledError, блоки finally вызывающего кода
+        успевают закрыть хранилища.
+        """
+        if self._task is not None and not self._task.done():
+            self._loop.call_soon_threadsafe(self._task.cancel)
+
+    def idle_delays(self, tenant):
+        """Паузы до следующих опросов подписчика, пока статусы не меняются."""
+        if self.policy is None:
+            return itertools.repeat(self.retry_time)
+        return self.policy.idle_delays(tenant)
+
+    def skip_quiet(self, group, until, end):
+        """Опросы группы до момента until без вызова poll_tenant.
+
+        До until ответ API группе заведомо не меняется, поэтому опросы
+        только учитываются, а паузы между ними, как обычно, считает
+        policy. Сроки округляются до тика, как при срабатывании колеса.
+        Первый опрос не раньше until (или после end) ставится в колесо.
+        """
+        if len(group) == 1:
+            delays = self.idle_delays(group[0])
+        else:
+            delays = map(min, zip(*map(self.idle_delays, group)))
+        tick = self.tick
+        current = self.wheel.to_tick(self._time())
+        # Номер первого тика, опрос на котором уже не пропускается.
+        limit = int(end // tick) + 1
+        if until < limit * tick:
+            limit = math.ceil(until / tick)
+        polls = 0
+        for delay in delays:
+            polls += 1
+            current += math.ceil(delay / tick) or 1
+            if current >= limit:
+                break
+        self.quiet_polls += polls
+        self.stats.record_quiet(polls * len(group))
+        polls_total.inc(polls * len(group))
+        self.wheel.schedule(current * tick, group)
+
+    def simulate(self, duration, quiet_time=None):
+        """Опрос в виртуальном времени без цикла событий.
+
+        Для симуляции: clock - clock.VirtualClock, poll_tenant выполняется
+        сразу (как с InlineExecutor). Сработавшие группы колеса опрашиваются
+        подряд, затем часы переводятся прямо на ближайший срок колеса:
+        итерации цикла событий на каждый опрос не нужны. quiet_time(group) -
+        сколько секунд ответ API группе заведомо не изменится (0 -
+        неизвестно); такие опросы учитываются через skip_quiet, а число
+        пропущенных запросов копится в quiet_polls. Службы background,
+        отчёт и замер задержки цикла не запускаются, budget не
+        поддерживается. Через duration секунд виртуального времени опрос
+        заканчивается.
+        """
+        if self.budget is not None:
+            raise ValueError('simulate не поддерживает budget')
+        self._start_wheel(self.clock.monotonic)
+        self.schedule_start()
+        end = self._time() + duration
+        while True:
+            for group in self.wheel.advance(self._time()):
+                quiet = quiet_time(group) if quiet_time is not None else 0
+                if quiet > 0:
+                    self.skip_quiet(group, self._time() + quiet, end)
+                else:
+                    self.poll_group_now(group)
+            moment = self.wheel.next_expiry()
+            if moment is None or moment > end:
+                break
+            self.clock.advance(moment - self._time())
+        self.clock.advance(end - self._time())
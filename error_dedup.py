@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import re
+import threading
+from collections import OrderedDict
+
+from metrics import registry
+from tenants import error_fingerprint
+
+logger = logging.getLogger(__name__)
+
+suppressed_errors = registry.counter(
+    'homework_bot_errors_suppressed_total',
+    'Повторные сбои, о которых не отправлено уведомление.'
+)
+
+FLUSH_INTERVAL = 60
+
+VOLATILE_PATTERNS = (
+    (re.compile(r'Параметры запроса: [^\n]*'), 'Параметры запроса: ...'),
+    (re.compile(r'(Статус ответа: )(\d)\d\d'), r'\1\2xx'),
+    (re.compile(r'0x[0-9a-fA-F]+'), '0x#'),
+    (re.compile(r'\d+'), '#'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def normalize_error(error):
+    """Устойчивое описание сбоя: класс исключения и текст без деталей.
+
+    Из текста убираются параметры запроса, адреса и числа, код ответа
+    сводится к классу (5xx), поэтому сбои одной природы совпадают.
+    """
+    text = str(error)
+    for pattern, replacement in VOLATILE_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return f'{type(error).__name__}: {text.strip()}'
+
+
+def error_signature(error):
+    """Отпечаток нормализованного сбоя."""
+    return error_fingerprint(normalize_error(error))
+
+
+class ErrorWindow:
+    """Кэш отпечатков сбоев с окном window секунд и пределом max_size.
+
+    О каждом сбое сообщается один раз за окно, повторы внутри окна
+    только подсчитываются. Сводку о повторах за истёкшие окна выдаёт
+    flush (её периодически вызывает run), а если окно ещё не сброшено -
+    admit со следующим таким же сбоем. Когда ключей больше max_size,
+    вытесняется давно не встречавшийся.
+    """
+
+    def __init__(self, window=600, max_size=10000, clock=None):
+        self.window = window
+        self.max_size = max_size
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def admit(self, key, now=None, detail=None):
+        """Решаем, сообщать ли о сбое key.
+
+        Возвращает (notify, suppressed): notify - нужно ли уведомление,
+        suppressed - сколько повторов было скрыто в прошлом окне.
+        detail - описание сбоя для сводки flush.
+        """
+        if now is None:
+            now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.window:
+                entry[1] += 1
+                self._entries.move_to_end(key)
+                suppressed_errors.inc()
+                return False, 0
+            suppressed = entry[1] if entry is not None else 0
+            self._entries[key] = [now, 0, detail]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            return True, suppressed
+
+    def flush(self, now=None):
+        """Убираем истёкшие окна и возвращаем сводки по ним.
+
+        Сводка - (key, suppressed, detail) для окон, в которых были
+        скрытые повторы.
+        """
+        if now is None:
+            now = self.clock()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items()
+                       if now - entry[0] >= self.window]
+            summaries = []
+            for key in expired:
+                _, suppressed, detail = self._entries.pop(key)
+                if suppressed:
+                    summaries.append((key, suppressed, detail))
+        return summaries
+
+    async def run(self, report, interval=FLUSH_INTERVAL):
+        """Раз в interval секунд передаём сводки flush в report.
+
+        report(key, suppressed, detail) вызывается для каждой сводки,
+        его сбой не останавливает службу.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            for summary in self.flush():
+                try:
+                    report(*summary)
+                except Exception as error:
+                    logger.error('Сводка о сбое %s не отправлена: %s',
+                                 summary[0], error)
+
+    def summary(self, suppressed):
+        """Приписка к уведомлению о скрытых повторах."""
+        if not suppressed:
+            return ''
+        return (f'\nЕщё {suppressed} таких сбоев за '
+                f'{self.window / 60:.0f} мин.')
@@ -36,3 +36,28 @@ class MandatoryTokenError(Exception):
 class TelegramSendMessageError(Exception):
     """Обязательные переменные окружения не были введены."""
     pass
+
+
+class CircuitOpenError(Exception):
+    """Запросы к сервису временно приостановлены после серии ошибок."""
+    pass
+
+
+class ResponseTooLargeError(Exception):
+    """Тело ответа API превышает допустимый размер."""
+    pass
+
+
+class DeadlineExceededError(Exception):
+    """Истёк срок, отведённый на опрос или его этап."""
+    pass
+
+
+class NotifierError(Exception):
+    """Уведомление не доставлено вебхуком или почтой."""
+    pass
+
+
+class NotifierTimeoutError(NotifierError):
+    """Доставка уведомления не уложилась в свой таймаут."""
+    pass
@@ -1,16 +1,41 @@
+import asyncio
+import functools
 import logging
 import os
-import time
+import signal
 import sys
 
 import requests
 
 from dotenv import load_dotenv
 
-from telegram import Bot, TelegramError
+from telegram import Bot
+from telegram.utils.request import Request
 from http import HTTPStatus
 
+import archive
+import clock
 import exceptions
+from circuit_breaker import AdaptiveLimiter, CircuitBreaker, parse_retry_after
+from commands import CommandHandler, StatusCache
+from deadline import check_deadline, stage_deadline
+from engine import PollingEngine
+from error_dedup import ErrorWindow, error_signature
+from http_session import PracticumSession
+from journal import NotificationJournal
+from log_config import setup_logging
+from metrics import registry, start_metrics_server, timed
+from notifiers import (NotifierPool, SmtpNotifier, TelegramNotifier,
+                       WebhookNotifier)
+from outbox import TelegramOutbox, current_outbox
+from response_decoder import MAX_RESPONSE_BYTES, ResponseCache, excerpt
+from scheduler import AdaptivePollPolicy, RequestBudget
+from sharding import shard_tenants
+from singleflight import SingleFlight
+from storage import CheckpointStore
+from supervisor import Supervisor
+from tenants import (Tenant, align_checkpoints, get_current_tenant,
+                     load_tenants)
 
 load_dotenv()
 
@@ -18,29 +43,100 @@ load_dotenv()
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
-
-logging.basicConfig(
-    level=logging.DEBUG,
-    filename='main.log',
-    filemode='w',
-    format='%(asctime)s - %(levelname)s - %(message)s - %(name)s'
-)
+TENANTS_FILE = os.getenv('TENANTS_FILE')
+POLL_CONCURRENCY = int(os.getenv('POLL_CONCURRENCY', 100))
+WORKERS = int(os.getenv('WORKERS', 1))
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', POLL_CONCURRENCY))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 5))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 30))
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', 2))
+POLL_DEADLINE = float(os.getenv('POLL_DEADLINE', 45))
+FETCH_TIMEOUT = float(os.getenv('FETCH_TIMEOUT', 40))
+SEND_TIMEOUT = float(os.getenv('SEND_TIMEOUT', 15))
+TELEGRAM_CONNECT_TIMEOUT = float(os.getenv('TELEGRAM_CONNECT_TIMEOUT', 5))
+TELEGRAM_READ_TIMEOUT = float(os.getenv('TELEGRAM_READ_TIMEOUT', 10))
+TELEGRAM_POOL_SIZE = int(os.getenv('TELEGRAM_POOL_SIZE', 8))
+BREAKER_THRESHOLD = int(os.getenv('BREAKER_THRESHOLD', 5))
+BREAKER_RECOVERY_TIME = float(os.getenv('BREAKER_RECOVERY_TIME', 60))
+STATE_DB = os.getenv('STATE_DB', 'state.sqlite3')
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'archive')
+ARCHIVE_FLUSH_INTERVAL = float(os.getenv('ARCHIVE_FLUSH_INTERVAL', 10))
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+LOG_FILE = os.getenv('LOG_FILE', 'main.log')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler(stream=sys.stdout)
-formatter = logging.Formatter(
-    '%(asctime)s - %(levelname)s - %(message)s'
-)
-handler.setFormatter(formatter)
-logger.addHandler(handler)
 
 
 RETRY_TIME = 10 * 60
+REVIEWING_RETRY_TIME = int(os.getenv('REVIEWING_RETRY_TIME', 60))
+MAX_RETRY_TIME = int(os.getenv('MAX_RETRY_TIME', 15 * 60))
+POLL_BUDGET = float(os.getenv('POLL_BUDGET', 0))
+TELEGRAM_RATE = float(os.getenv('TELEGRAM_RATE', 30))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+TELEGRAM_MERGE_WINDOW = float(os.getenv('TELEGRAM_MERGE_WINDOW', 2))
+RESPONSE_MAX_BYTES = int(os.getenv('RESPONSE_MAX_BYTES', MAX_RESPONSE_BYTES))
+ERROR_WINDOW = float(os.getenv('ERROR_WINDOW', 10 * 60))
+ERROR_CACHE_SIZE = int(os.getenv('ERROR_CACHE_SIZE', 10000))
+ERROR_FLUSH_INTERVAL = float(os.getenv('ERROR_FLUSH_INTERVAL', 60))
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 10000))
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+NOTIFY_EMAIL = os.getenv('NOTIFY_EMAIL')
+NOTIFY_TIMEOUT = float(os.getenv('NOTIFY_TIMEOUT', 10))
+NOTIFY_WORKERS = int(os.getenv('NOTIFY_WORKERS', 16))
+SMTP_HOST = os.getenv('SMTP_HOST')
+SMTP_PORT = int(os.getenv('SMTP_PORT', 25))
+SMTP_USER = os.getenv('SMTP_USER')
+SMTP_PASSWORD = os.getenv('SMTP_PASSWORD')
+SMTP_SENDER = os.getenv('SMTP_SENDER', 'homework-bot@localhost')
+SMTP_STARTTLS = int(os.getenv('SMTP_STARTTLS', 0))
+TELEGRAM_COMMANDS = int(os.getenv('TELEGRAM_COMMANDS', 1))
+STATUS_CACHE_TTL = float(os.getenv('STATUS_CACHE_TTL', 2 * MAX_RETRY_TIME))
+STATUS_CACHE_SIZE = int(os.getenv('STATUS_CACHE_SIZE', 10000))
 
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
+api_session = PracticumSession(
+    pool_size=HTTP_POOL_SIZE,
+    connect_timeout=HTTP_CONNECT_TIMEOUT,
+    read_timeout=HTTP_READ_TIMEOUT,
+    retries=HTTP_RETRIES
+)
+
+api_flight = SingleFlight()
+response_cache = ResponseCache(max_size=RESPONSE_CACHE_SIZE)
+notifier_pool = NotifierPool(workers=NOTIFY_WORKERS)
+api_breaker = CircuitBreaker(
+    failure_threshold=BREAKER_THRESHOLD,
+    recovery_time=BREAKER_RECOVERY_TIME,
+    clock=lambda: clock.get_clock().time()
+)
+error_window = ErrorWindow(
+    window=ERROR_WINDOW,
+    max_size=ERROR_CACHE_SIZE,
+    clock=lambda: clock.get_clock().time()
+)
+status_cache = StatusCache(
+    ttl=STATUS_CACHE_TTL,
+    max_size=STATUS_CACHE_SIZE,
+    clock=lambda: clock.get_clock().time()
+)
+api_limiter = AdaptiveLimiter(
+    initial=max(POLL_CONCURRENCY // 10, 1),
+    maximum=POLL_CONCURRENCY
+)
+registry.gauge('homework_bot_api_circuit_open',
+               'Запросы к API приостановлены предохранителем (1/0).',
+               lambda: int(api_breaker.state != 'closed'))
+registry.gauge('homework_bot_api_concurrency_limit',
+               'Текущий предел одновременных запросов к API.',
+               lambda: api_limiter.limit)
+OVERLOAD_STATUSES = (HTTPStatus.TOO_MANY_REQUESTS,
+                     HTTPStatus.SERVICE_UNAVAILABLE)
+
 HOMEWORK_STATUSES = {
     'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
     'reviewing': 'Работа взята на проверку ревьюером.',
@@ -50,58 +146,169 @@ HOMEWORK_STATUSES = {
 
 
 def send_message(bot, message):
-    """Отправка сообщения в телеграм."""
+    """Отправка сообщения в телеграм.
+
+    Если запущена очередь исходящих сообщений, сообщение ставится в неё.
+    Это сообщения о сбоях: они уходят только в чат подписчика, а не в
+    остальные способы доставки.
+    """
+    notify(bot, message)
+
+
+def notify(bot, message, key=None):
+    """Отправка сообщения подписчику через очередь или напрямую.
+
+    key - (работа, статус) уведомления для журнала доставки.
+    """
+    tenant = get_current_tenant()
+    chat_id = TELEGRAM_CHAT_ID if tenant is None else tenant.chat_id
+    outbox = current_outbox.get()
+    if outbox is not None:
+        logger.info('Ставим сообщение в очередь отправки')
+        outbox.submit(chat_id, message, key)
+        return
+    deliver_message(bot, chat_id, message)
+
+
+def fan_out(tenant, message, key=None):
+    """Рассылка по остальным способам доставки подписчика (tenant.sinks).
+
+    Доставки идут одновременно в пуле notifier_pool, их не дожидаемся.
+    Вызывается после того, как уведомление отправлено в Telegram (или
+    поставлено в очередь) и запомнено, поэтому повторный опрос после
+    сбоя Telegram не дублирует его в остальных способах.
+    """
+    if tenant is None or not tenant.sinks:
+        return
+    event = {'chat_id': tenant.chat_id}
+    if key is not None:
+        event.update(homework=key[0], status=key[1])
+    notifier_pool.fan_out(tenant.sinks, message, event)
+
+
+@timed('send_message')
+def deliver_message(bot, chat_id, message):
+    """Синхронная отправка сообщения в чат телеграма."""
     logger.info('Начинаем отправлять сообщение')
-    try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
-    except TelegramError as tg_error:
-        error_msg = f'Ошибка отправления сообщения {tg_error}'
-        raise exceptions.TelegramSendMessageError(error_msg)
+    deadline = stage_deadline('send_message', SEND_TIMEOUT)
+    TelegramNotifier(
+        bot, chat_id, timeout=deadline.clip(TELEGRAM_READ_TIMEOUT)
+    ).deliver(message)
+    logger.info('Успешно отправили сообщение %s', message)
+
+
+def record_outcome(response):
+    """Учитываем код ответа API в предохранителе и пределе запросов."""
+    if response.status_code in OVERLOAD_STATUSES:
+        api_breaker.record_failure(parse_retry_after(
+            response.headers.get('Retry-After'), clock.get_clock().time()
+        ))
+        api_limiter.on_overload()
+    elif (response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR
+          or response.status_code == HTTPStatus.REQUEST_TIMEOUT):
+        api_breaker.record_failure()
     else:
-        logger.info(f'Успешно отправили сообщение {message}')
+        api_breaker.record_success()
+        api_limiter.on_success()
+
+
+def request_summary(requests_params):
+    """Параметры запроса для сообщений об ошибках - без заголовков.
 
+    В заголовках токен Практикума, в тексты ошибок он попадать не должен.
+    """
+    return {name: value for name, value in requests_params.items()
+            if name != 'headers'}
 
+
+def request_api(requests_params, deadline):
+    """Запрос, пропущенный предохранителем; любой сбой в нём - неудача."""
+    try:
+        return api_session.get(stream=True, deadline=deadline,
+                               **requests_params)
+    except requests.RequestException as error:
+        api_breaker.record_failure()
+        api_limiter.on_overload()
+        error_msg = (f'Ошибка {error}.\n'
+                     'Параметры запроса: '
+                     f'{request_summary(requests_params)}.\n')
+        raise exceptions.RequestExceptionError(error_msg)
+    except BaseException:
+        api_breaker.record_failure()
+        raise
+
+
+@timed('get_api_answer')
 def get_api_answer(current_timestamp):
     """Запрос к сервису."""
     logger.info('Делаем запрос к сервису')
-    timestamp = current_timestamp or int(time.time())
+    timestamp = current_timestamp or int(clock.get_clock().time())
     params = {'from_date': timestamp}
+    tenant = get_current_tenant()
+    token = PRACTICUM_TOKEN if tenant is None else tenant.practicum_token
     requests_params = {
         'url': ENDPOINT,
-        'headers': HEADERS,
+        'headers': dict(HEADERS if tenant is None else tenant.headers,
+                        **response_cache.conditional_headers(token)),
         'params': params
     }
 
+    deadline = stage_deadline('get_api_answer', FETCH_TIMEOUT)
+    # Место в пределе занимаем до предохранителя: пропущенный им пробный
+    # запрос не должен завершиться без записанного исхода.
+    if not api_limiter.acquire(timeout=deadline.remaining()):
+        deadline.fail('api_limiter')
     try:
-        response = requests.get(**requests_params)
-        if response.status_code != HTTPStatus.OK:
-            error_msg = (f'Эндпоинт {ENDPOINT} недоступен.\n'
-                         f'Статус ответа: {response.status_code}.\n'
-                         f'Параметры запроса: {requests_params}.\n')
-
-            raise exceptions.TheAnswerIsNot200Error(error_msg)
-        response = response.json()
-        return response
-    except Exception as error:
+        if not api_breaker.allow():
+            error_msg = (f'Запросы к {ENDPOINT} приостановлены, повтор '
+                         f'через {api_breaker.retry_in():.0f} с.')
+            raise exceptions.CircuitOpenError(error_msg)
+        response = request_api(requests_params, deadline)
+    finally:
+        api_limiter.release()
+    record_outcome(response)
+    if response.status_code == HTTPStatus.NOT_MODIFIED:
+        response.close()
+        return response_cache.not_modified(token, timestamp)
+    if response.status_code != HTTPStatus.OK:
+        response.close()
+        error_msg = (f'Эндпоинт {ENDPOINT} недоступен.\n'
+                     f'Статус ответа: {response.status_code}.\n'
+                     'Параметры запроса: '
+                     f'{request_summary(requests_params)}.\n')
+        raise exceptions.TheAnswerIsNot200Error(error_msg)
+    try:
+        return response_cache.decode(response, token, RESPONSE_MAX_BYTES,
+                                     deadline)
+    except requests.RequestException as error:
+        api_breaker.record_failure()
+        error_msg = (f'Ошибка {error}.\n'
+                     'Параметры запроса: '
+                     f'{request_summary(requests_params)}.\n')
+        raise exceptions.RequestExceptionError(error_msg)
+    except ValueError as error:
         error_msg = (f'Ошибка {error}.\n'
                      f'Статус ответа: {response.status_code}.\n'
-                     f'Параметры запроса: {requests_params}.\n')
+                     'Параметры запроса: '
+                     f'{request_summary(requests_params)}.\n')
         raise exceptions.RequestExceptionError(error_msg)
 
 
+@timed('check_response')
 def check_response(response):
     """Функция проверки корректности ответа ЯП."""
     logger.info('Проверка данных')
+    check_deadline('check_response')
     if not isinstance(response, dict):
         error_msg = f'response должен быть словарём, сейчас - {type(response)}'
         raise TypeError(error_msg)
     if 'current_date' not in response:
         error_msg = ('Ключ current_date отсутствует.\n'
-                     f'Ответ: {response}.\n')
+                     f'Ответ: {excerpt(response)}.\n')
         raise KeyError(error_msg)
     if 'homeworks' not in response:
         error_msg = ('Ключ homeworks отсутствует.\n'
-                     f'Ответ: {response}.\n')
+                     f'Ответ: {excerpt(response)}.\n')
         raise KeyError(error_msg)
     homeworks = response['homeworks']
 
@@ -113,23 +320,66 @@ def check_response(response):
     return homeworks
 
 
+@timed('parse_status')
 def parse_status(homework):
     """Получаем статус домашней работы."""
     logger.info('Получаем статус')
+    check_deadline('parse_status')
     homework_name = homework.get('homework_name')
     homework_status = homework.get('status')
     if homework_name is None:
         error_msg = ('В словаре отсутсвует имя домашней работы.\n'
-                     f'Словарь - {homework}')
+                     f'Словарь - {excerpt(homework)}')
         raise KeyError(error_msg)
     if homework_status not in HOMEWORK_STATUSES:
-        error_msg = (f'Неизвестный статус домашней работы - {homework_status}')
+        error_msg = ('Неизвестный статус домашней работы - '
+                     f'{excerpt(homework_status)}')
         raise KeyError(error_msg)
 
     verdict = HOMEWORK_STATUSES[homework_status]
     return f'Изменился статус проверки работы "{homework_name}". {verdict}'
 
 
+def fetch_homeworks(current_timestamp):
+    """Запрос к сервису и проверка ответа, общие для одного токена.
+
+    Одновременные вызовы с тем же токеном и from_date делят один запрос.
+    Возвращает ответ API и список домашних работ.
+    """
+    tenant = get_current_tenant()
+    token = PRACTICUM_TOKEN if tenant is None else tenant.practicum_token
+
+    def fetch():
+        response = get_api_answer(current_timestamp)
+        return response, check_response(response)
+
+    return api_flight.do((token, current_timestamp), fetch)
+
+
+def homework_key(homework):
+    """Ключ домашней работы: id, а при его отсутствии - название."""
+    return str(homework.get('id', homework.get('homework_name')))
+
+
+def diff_homeworks(homeworks, statuses):
+    """Домашние работы, статус которых изменился, от старых к новым.
+
+    statuses - словарь последних известных статусов по homework_key,
+    список homeworks просматривается за один проход.
+    """
+    seen = set()
+    changed = []
+    for homework in homeworks:
+        key = homework_key(homework)
+        if key in seen:
+            continue
+        seen.add(key)
+        if statuses.get(key) != homework.get('status'):
+            changed.append(homework)
+    changed.reverse()
+    return changed
+
+
 def check_tokens():
     """Проверяем обязательные токены."""
     logger.info('Проверка токенов')
@@ -137,58 +387,291 @@ def check_tokens():
     flag = True
     if PRACTICUM_TOKEN is None:
         flag = False
-        logger.critical(f'{no_token_msg} PRACTICUM_TOKEN')
+        logger.critical('%s PRACTICUM_TOKEN', no_token_msg)
     if TELEGRAM_TOKEN is None:
         flag = False
-        logger.critical(f'{no_token_msg} TELEGRAM_TOKEN')
+        logger.critical('%s TELEGRAM_TOKEN', no_token_msg)
     if TELEGRAM_CHAT_ID is None:
         flag = False
-        logger.critical(f'{no_token_msg} TELEGRAM_CHAT_ID')
+        logger.critical('%s TELEGRAM_CHAT_ID', no_token_msg)
     return flag
 
 
-def main():
-    """Основная логика работы бота."""
-    if not check_tokens():
+def remember_status(tenant, key, status, store=None):
+    """Запоминаем последний статус работы в состоянии и хранилище."""
+    tenant.set_status(key, status)
+    if store is not None:
+        store.save_status(tenant.key, key, status)
+
+
+def remember_transition(tenant, homework, store=None, history=None):
+    """Запоминаем отправленный статус работы в состоянии и архиве."""
+    key = homework_key(homework)
+    status = homework.get('status')
+    remember_status(tenant, key, status, store)
+    if history is not None:
+        history.append(tenant.key, archive.TRANSITION, {
+            'homework': key,
+            'homework_name': homework.get('homework_name'),
+            'status': status,
+            'date_updated': homework.get('date_updated'),
+        })
+
+
+def report_error(bot, tenant, error):
+    """Сообщаем подписчику о сбое, если о нём не сообщали в этом окне."""
+    signature = error_signature(error)
+    tenant.error_hash = signature
+    notify_error, suppressed = error_window.admit(
+        (tenant.chat_id, signature), detail=excerpt(str(error))
+    )
+    if notify_error:
+        send_message(bot, error_message(error, suppressed))
+
+
+def error_message(error, suppressed=0):
+    """Текст уведомления о сбое со сводкой скрытых повторов."""
+    return (f'Сбой в работе программы: {error}'
+            f'{error_window.summary(suppressed)}')
+
+
+def notify_changes(bot, tenant, homeworks, store=None, history=None):
+    """Уведомляем о сменах статуса, возвращаем список этих работ."""
+    notified = []
+    if not homeworks and not tenant.statuses:
+        homeworks = [{'homework_name': 'There is no homework yet',
+                      'status': 'missing'
+                      }]
+    for homework in diff_homeworks(homeworks, tenant.statuses):
+        key = homework_key(homework)
+        status = homework.get('status')
+        try:
+            message = parse_status(homework)
+        except KeyError as error:
+            # Статус запоминаем, чтобы работа не всплывала при каждом
+            # опросе, и не мешаем уведомить об остальных работах.
+            logger.error('Работа %s пропущена: %s', key, error)
+            remember_status(tenant, key, status, store)
+            continue
+        notify(bot, message, (key, status))
+        remember_transition(tenant, homework, store, history)
+        fan_out(tenant, message, (key, status))
+        notified.append(homework)
+    return notified
+
+
+def poll_tenant(bot, tenant, store=None, history=None):
+    """Один цикл опроса API и уведомления подписчика.
+
+    Ответ API и отправленные переходы статусов дописываются в архив
+    history, если он передан. Возвращает список работ, о которых
+    отправлены уведомления.
+    """
+    notified = []
+    try:
+        response, homeworks = fetch_homeworks(tenant.current_timestamp)
+        if history is not None:
+            history.append(tenant.key, archive.RESPONSE, response)
+        status_cache.update(tenant.key, homeworks, homework_key)
+        # Тот же объект списка - ответ не изменился с прошлой обработки.
+        if homeworks is not tenant.last_homeworks:
+            notified = notify_changes(bot, tenant, homeworks, store, history)
+        tenant.current_timestamp = response['current_date']
+        if store is not None:
+            store.save_checkpoint(tenant.key, tenant.current_timestamp)
+        tenant.last_homeworks = homeworks
+    except (exceptions.CircuitOpenError,
+            exceptions.DeadlineExceededError) as error:
+        logger.warning('Опрос пропущен: %s', error)
+    except exceptions.TelegramSendMessageError as tg_error:
+        logger.error('Сообщнеие не отправлено: %s', tg_error)
+        tenant.remember_error(tg_error)
+    except Exception as error:
+        logger.error('Сбой в работе программы: %s', error)
+        report_error(bot, tenant, error)
+    return notified
+
+
+def build_sinks(record):
+    """Способы доставки из записи подписчика: webhook (URL) и email."""
+    sinks = []
+    if record.get('webhook'):
+        sinks.append(WebhookNotifier(record['webhook'],
+                                     timeout=NOTIFY_TIMEOUT))
+    if record.get('email') and SMTP_HOST:
+        sinks.append(SmtpNotifier(
+            SMTP_HOST, SMTP_PORT, SMTP_SENDER, record['email'],
+            username=SMTP_USER, password=SMTP_PASSWORD,
+            starttls=bool(SMTP_STARTTLS), timeout=NOTIFY_TIMEOUT
+        ))
+    elif record.get('email'):
+        logger.warning('Адрес %s пропущен: не задан SMTP_HOST',
+                       record['email'])
+    return sinks
+
+
+def get_tenants(current_timestamp):
+    """Подписчики из TENANTS_FILE или единственный подписчик из .env."""
+    if TENANTS_FILE:
+        return load_tenants(TENANTS_FILE, current_timestamp, build_sinks)
+    tenant = Tenant(PRACTICUM_TOKEN, TELEGRAM_CHAT_ID, current_timestamp)
+    tenant.sinks = tuple(build_sinks({'webhook': WEBHOOK_URL,
+                                      'email': NOTIFY_EMAIL}))
+    return [tenant]
+
+
+def require_tokens():
+    """Завершаем программу, если не заданы обязательные переменные."""
+    if TENANTS_FILE and TELEGRAM_TOKEN is None:
+        sys.exit('Отсутсвует обязательная переменная окружения '
+                 'TELEGRAM_TOKEN')
+    if not TENANTS_FILE and not check_tokens():
         sys.exit('Отсутсвуют обязательные переменные окружения.\n'
                  'Проверь .env на начилие: '
                  'PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID')
-    bot = Bot(token=TELEGRAM_TOKEN)
-    #current_timestamp = int(time.time())
-    current_timestamp = 1665471713
-    previous_homework = ''
-    previous_status = ''
-    previous_error = ''
-    while True:
-        try:
-            response = get_api_answer(current_timestamp)
-            homework = check_response(response)
-            if len(homework) != 0:
-                homework = homework[0]
-            else:
-                homework = {'homework_name': 'There is no homework yet',
-                            'status': 'missing'
-                            }
-            hw_name = homework.get('homework_name')
-            hw_status = homework.get('status')
-            if previous_homework != hw_name and previous_status != hw_status:
-                message = parse_status(homework)
-                send_message(bot, message)
-                previous_homework = homework.get('homework_name')
-                previous_status = homework.get('status')
-            #current_timestamp = int(time.time())
-            current_timestamp = 1665471713
-        except exceptions.TelegramSendMessageError as tg_error:
-            logger.error(f'Сообщнеие не отправлено: {tg_error}')
-            previous_error = str(tg_error)
-        except Exception as error:
-            logger.error(f'Сбой в работе программы: {error}')
-            message = f'Сбой в работе программы: {error}'
-            if str(error) != previous_error:
-                send_message(bot, message)
-                previous_error = str(error)
-        finally:
-            time.sleep(RETRY_TIME)
+
+
+def worker_path(path, shard):
+    """Путь к файлу процесса shard: main.log -> main.1.log."""
+    root, extension = os.path.splitext(path)
+    return f'{root}.{shard}{extension}'
+
+
+def run_bot(shard=0, shards=1):
+    """Запуск опроса подписчиков процесса shard из shards.
+
+    Лимиты Telegram и бюджет запросов к API делятся между процессами.
+    """
+    require_tokens()
+    # Команды читает один процесс: getUpdates не допускает нескольких
+    # читателей, а кэш статусов у каждого процесса свой.
+    commands = TELEGRAM_COMMANDS and shards == 1
+    bot = Bot(token=TELEGRAM_TOKEN, request=Request(
+        con_pool_size=TELEGRAM_POOL_SIZE + int(commands),
+        connect_timeout=TELEGRAM_CONNECT_TIMEOUT,
+        read_timeout=TELEGRAM_READ_TIMEOUT
+    ))
+    journal = NotificationJournal(STATE_DB, shard=shard)
+    outbox = TelegramOutbox(
+        lambda chat_id, message: deliver_message(bot, chat_id, message),
+        workers=TELEGRAM_POOL_SIZE,
+        rate=TELEGRAM_RATE / shards,
+        chat_rate=TELEGRAM_CHAT_RATE,
+        merge_window=TELEGRAM_MERGE_WINDOW,
+        journal=journal
+    )
+    current_outbox.set(outbox)
+    registry.gauge('homework_bot_outbox_depth',
+                   'Сообщения в очереди отправки.', outbox.depth)
+    registry.gauge('homework_bot_journal_pending',
+                   'Недоставленные уведомления в журнале.',
+                   lambda: len(journal))
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT + shard)
+    store = CheckpointStore(STATE_DB)
+    history = None
+    if ARCHIVE_DIR:
+        history = archive.ResponseArchive(
+            ARCHIVE_DIR, writer=shard if shards > 1 else None
+        )
+    tenants = shard_tenants(get_tenants(int(clock.get_clock().time())),
+                            shard, shards)
+    for tenant in tenants:
+        store.restore(tenant)
+    background = [outbox.run, functools.partial(
+        error_window.run,
+        lambda key, suppressed, detail: outbox.submit(
+            key[0], error_message(detail, suppressed)
+        ),
+        ERROR_FLUSH_INTERVAL
+    )]
+    if history is not None:
+        background.append(functools.partial(history.run,
+                                            ARCHIVE_FLUSH_INTERVAL))
+    if commands:
+        background.append(CommandHandler(
+            bot, tenants, status_cache, outbox.submit, HOMEWORK_STATUSES,
+            history=history
+        ).run)
+    engine = PollingEngine(
+        lambda tenant: poll_tenant(bot, tenant, store, history),
+        tenants,
+        retry_time=RETRY_TIME,
+        concurrency=POLL_CONCURRENCY,
+        policy=AdaptivePollPolicy(
+            base_interval=RETRY_TIME,
+            reviewing_interval=REVIEWING_RETRY_TIME,
+            max_interval=MAX_RETRY_TIME
+        ),
+        budget=(RequestBudget(POLL_BUDGET / shards,
+                              clock=clock.get_clock().monotonic)
+                if POLL_BUDGET else None),
+        background=background,
+        group_key=lambda tenant: tenant.practicum_token,
+        prepare_group=align_checkpoints,
+        deadline=POLL_DEADLINE
+    )
+    # Supervisor.terminate и перезапуск на Heroku присылают SIGTERM:
+    # останавливаемся штатно, чтобы закрыть архив и хранилища.
+    signal.signal(signal.SIGTERM, lambda *args: engine.stop())
+    try:
+        clock.run(engine.run())
+    except asyncio.CancelledError:
+        logger.info('Опрос остановлен по сигналу')
+    finally:
+        logger.info('Статистика опроса: %s', engine.stats.summary())
+        logger.info('Соединения с API: %s', api_session.stats())
+        api_session.close()
+        store.close()
+        journal.close()
+        notifier_pool.close()
+        if history is not None:
+            history.close()
+
+
+def run_worker(shard, shards):
+    """Процесс-исполнитель: опрос своей части подписчиков."""
+    log_listener = setup_logging(
+        worker_path(LOG_FILE, shard),
+        level=LOG_LEVEL,
+        max_bytes=LOG_MAX_BYTES,
+        backup_count=LOG_BACKUP_COUNT
+    )
+    try:
+        run_bot(shard, shards)
+    finally:
+        log_listener.stop()
+
+
+def run_supervisor():
+    """Запуск WORKERS процессов с перезапуском упавших."""
+    journal = NotificationJournal(STATE_DB)
+    journal.reassign(WORKERS, get_tenants(0))
+    journal.close()
+    supervisor = Supervisor(run_worker, WORKERS)
+    signal.signal(signal.SIGTERM, lambda *args: supervisor.stop())
+    try:
+        supervisor.run()
+    except KeyboardInterrupt:
+        supervisor.stop()
+
+
+def main():
+    """Основная логика работы бота."""
+    log_listener = setup_logging(
+        LOG_FILE,
+        level=LOG_LEVEL,
+        max_bytes=LOG_MAX_BYTES,
+        backup_count=LOG_BACKUP_COUNT
+    )
+    try:
+        if WORKERS > 1:
+            require_tokens()
+            run_supervisor()
+        else:
+            run_bot()
+    finally:
+        log_listener.stop()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,86 @@
+import logging
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import brotli  # noqa: F401
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Сжатие br urllib3 распаковывает, только если установлен brotli.
+ACCEPT_ENCODING = 'gzip, deflate, br' if brotli else 'gzip, deflate'
+
+
+class PracticumSession:
+    """Общая HTTP-сессия с пулом keep-alive соединений.
+
+    Соединения переиспользуются всеми вызовами get_api_answer, запросы
+    повторяются при обрыве соединения и ограничены таймаутами. Ответы
+    запрашиваются сжатыми (gzip, deflate и br, если установлен brotli).
+    """
+
+    def __init__(self, pool_size=10, connect_timeout=5, read_timeout=30,
+                 retries=2, backoff_factor=0.3):
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        # Повторы делает get(): так каждая попытка получает таймауты от
+        # оставшегося срока, а не исходные.
+        self.adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=0
+        )
+        self.session = requests.Session()
+        self.session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+
+    def get(self, url, deadline=None, **kwargs):
+        """GET-запрос через пул соединений с повторами при обрыве.
+
+        Если передан deadline (deadline.Deadline), таймауты каждой
+        попытки урезаются до оставшегося срока, а повтор, который не
+        успевает, не делается.
+        """
+        timeout = kwargs.pop('timeout', self.timeout)
+        for attempt in range(self.retries + 1):
+            if deadline is not None:
+                timeout = (deadline.clip(self.timeout[0]),
+                           deadline.clip(self.timeout[1]))
+            try:
+                return self.session.get(url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                pause = self.backoff_factor * 2 ** attempt
+                if attempt == self.retries or (
+                        deadline is not None
+                        and deadline.remaining() <= pause):
+                    raise
+                logger.warning('Повтор запроса (попытка %s): %s',
+                               attempt + 2, error)
+                time.sleep(pause)
+
+    def stats(self):
+        """Счётчики новых и переиспользованных соединений."""
+        requests_count = 0
+        new_connections = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_count += pool.num_requests
+            new_connections += pool.num_connections
+        return {
+            'requests': requests_count,
+            'new_connections': new_connections,
+            'reused_connections': requests_count - new_connections,
+        }
+
+    def close(self):
+        """Закрываем все соединения пула."""
+        self.session.close()
@@ -0,0 +1,167 @@
+import sqlite3
+import threading
+import time
+
+from sharding import HashRing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending_notifications (
+    chat TEXT NOT NULL,
+    homework TEXT NOT NULL,
+    status TEXT NOT NULL,
+    message TEXT NOT NULL,
+    created REAL NOT NULL,
+    shard INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    dead INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (chat, homework, status)
+);
+"""
+# Столбцы, добавленные после первой версии схемы.
+MIGRATIONS = (
+    ('shard', 'INTEGER NOT NULL DEFAULT 0'),
+    ('attempts', 'INTEGER NOT NULL DEFAULT 0'),
+    ('last_error', 'TEXT'),
+    ('dead', 'INTEGER NOT NULL DEFAULT 0'),
+)
+MAX_ATTEMPTS = 5
+
+
+class NotificationJournal:
+    """Журнал неотправленных уведомлений в SQLite (режим WAL).
+
+    Уведомление записывается до отправки и удаляется после успешной
+    доставки, поэтому после сбоя Telegram или перезапуска бота оно будет
+    отправлено повторно (доставка "хотя бы один раз"). Ключ записи -
+    (чат, работа, статус), повторная запись того же ключа игнорируется.
+    Несколько процессов делят одну базу: каждый видит только записи
+    своего shard. Запись, которую не удалось доставить max_attempts раз
+    (бот заблокирован, чат удалён), становится недоставляемой: она
+    остаётся в базе с последней ошибкой, но больше не повторяется.
+    """
+
+    def __init__(self, path, shard=0, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.shard = shard
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(SCHEMA)
+        columns = [row[1] for row in self._connection.execute(
+            'PRAGMA table_info(pending_notifications)'
+        )]
+        for column, definition in MIGRATIONS:
+            if column not in columns:
+                self._connection.execute(
+                    'ALTER TABLE pending_notifications '
+                    f'ADD COLUMN {column} {definition}'
+                )
+
+    def add(self, chat_id, homework_key, status, message):
+        """Записываем уведомление перед отправкой."""
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR IGNORE INTO pending_notifications '
+                '(chat, homework, status, message, created, shard) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (str(chat_id), homework_key, status, message, time.time(),
+                 self.shard)
+            )
+
+    def ack(self, chat_id, keys):
+        """Удаляем доставленные уведомления чата одной транзакцией."""
+        with self._lock, self._connection:
+            self._connection.execute('BEGIN')
+            self._connection.executemany(
+                'DELETE FROM pending_notifications '
+                'WHERE chat = ? AND homework = ? AND status = ?',
+                [(str(chat_id), homework, status) for homework, status in keys]
+            )
+
+    def fail(self, chat_id, keys, error):
+        """Записываем неудачную доставку уведомлений чата.
+
+        Возвращаем число записей, ставших после неё недоставляемыми.
+        """
+        chat = str(chat_id)
+        with self._lock, self._connection:
+            self._connection.execute('BEGIN')
+            self._connection.executemany(
+                'UPDATE pending_notifications '
+                'SET attempts = attempts + 1, last_error = ? '
+                'WHERE chat = ? AND homework = ? AND status = ?',
+                [(str(error), chat, homework, status)
+                 for homework, status in keys]
+            )
+            return self._connection.executemany(
+                'UPDATE pending_notifications SET dead = 1 '
+                'WHERE chat = ? AND homework = ? AND status = ? '
+                'AND dead = 0 AND attempts >= ?',
+                [(chat, homework, status, self.max_attempts)
+                 for homework, status in keys]
+            ).rowcount
+
+    def pending(self, limit=1000):
+        """Самые старые неотправленные уведомления, кроме недоставляемых."""
+        with self._lock:
+            return self._connection.execute(
+                'SELECT chat, homework, status, message '
+                'FROM pending_notifications WHERE shard = ? AND dead = 0 '
+                'ORDER BY created LIMIT ?',
+                (self.shard, limit)
+            ).fetchall()
+
+    def dead_letters(self, limit=1000):
+        """Недоставляемые уведомления с числом попыток и последней ошибкой."""
+        with self._lock:
+            return self._connection.execute(
+                'SELECT chat, homework, status, message, attempts, '
+                'last_error FROM pending_notifications '
+                'WHERE shard = ? AND dead = 1 ORDER BY created LIMIT ?',
+                (self.shard, limit)
+            ).fetchall()
+
+    def reassign(self, shards, tenants=()):
+        """Передаём записи процессам, которым теперь принадлежат их чаты.
+
+        Вызывается до запуска процессов, когда их число изменилось. Чат
+        подписчика из tenants достаётся процессу, которому HashRing
+        отдаёт его токен, как в shard_tenants (чат с несколькими токенами
+        - по первому из них). Записи остальных чатов из процессов с
+        номером от shards передаются по остатку от деления.
+        """
+        shards = max(shards, 1)
+        ring = HashRing(range(shards))
+        routes = {}
+        for tenant in tenants:
+            routes.setdefault(str(tenant.chat_id),
+                              ring.node(tenant.practicum_token))
+        with self._lock, self._connection:
+            self._connection.execute('BEGIN')
+            self._connection.executemany(
+                'UPDATE pending_notifications SET shard = ? WHERE chat = ?',
+                [(shard, chat) for chat, shard in routes.items()]
+            )
+            self._connection.execute(
+                'UPDATE pending_notifications SET shard = shard % ? '
+                'WHERE shard >= ?',
+                (shards, shards)
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute(
+                'SELECT COUNT(*) FROM pending_notifications '
+                'WHERE shard = ? AND dead = 0',
+                (self.shard,)
+            ).fetchone()[0]
+
+    def close(self):
+        """Закрываем соединение с базой."""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,101 @@
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+from tenants import get_current_tenant
+
+current_request = contextvars.ContextVar('current_request', default=None)
+
+
+class ContextFilter(logging.Filter):
+    """Добавляем в запись подписчика и номер запроса из контекста."""
+
+    def filter(self, record):
+        tenant = get_current_tenant()
+        record.tenant = None if tenant is None else tenant.chat_id
+        record.request_id = current_request.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись журнала в виде одной строки JSON."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'tenant': getattr(record, 'tenant', None),
+            'request_id': getattr(record, 'request_id', None),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler, который не ждёт при переполнении очереди.
+
+    Текст сообщения собирается в потоке вызова (аргументы могут
+    измениться), а форматирование в JSON и запись на диск выполняет
+    фоновый QueueListener. Если очередь заполнена, запись отбрасывается.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info
+            )
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(filename='main.log', level=logging.INFO,
+                  max_bytes=10 * 1024 * 1024, backup_count=5,
+                  queue_size=10000):
+    """Настраиваем неблокирующее журналирование.
+
+    Записи уходят в очередь, фоновый поток пишет их в ротируемый файл
+    в формате JSON lines (файл дописывается между перезапусками) и
+    в stdout в текстовом виде. Возвращает запущенный QueueListener,
+    его нужно остановить при завершении программы.
+    """
+    file_handler = logging.handlers.RotatingFileHandler(
+        filename, maxBytes=max_bytes, backupCount=backup_count,
+        encoding='utf-8'
+    )
+    file_handler.setFormatter(JsonFormatter())
+    stream_handler = logging.StreamHandler(stream=sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(
+        '%(asctime)s - %(levelname)s - %(message)s'
+    ))
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    listener = logging.handlers.QueueListener(
+        log_queue, file_handler, stream_handler,
+        respect_handler_level=True
+    )
+    listener.start()
+    return listener
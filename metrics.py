@@ -0,0 +1,222 @@
+import bisect
+import functools
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def label_key(labels):
+    """Ключ серии по меткам; одну метку сортировать не нужно."""
+    if len(labels) < 2:
+        return tuple(labels.items())
+    return tuple(sorted(labels.items()))
+
+
+def escape_label(value):
+    """Значение метки в формате Prometheus.
+
+    Экранируются обратная косая черта, перевод строки и кавычка - именно
+    в таком порядке, иначе экранирование задвоится.
+    """
+    return (str(value).replace('\\', '\\\\').replace('\n', '\\n')
+            .replace('"', '\\"'))
+
+
+def format_labels(labels):
+    """Метки в формате Prometheus: {name="value",...}."""
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, escape_label(value))
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+class Counter:
+    """Монотонно растущий счётчик с метками."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(label_key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, key, value
+
+
+class Gauge:
+    """Текущее значение; function вычисляет его в момент чтения."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, function=None):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+        self._value = 0
+
+    def set(self, value):
+        self._value = value
+
+    def value(self):
+        return self.function() if self.function else self._value
+
+    def samples(self):
+        yield self.name, (), self.value()
+
+
+class Histogram:
+    """Гистограмма значений (задержек) с метками."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[key] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels):
+        series = self._series.get(label_key(labels))
+        return 0 if series is None else series[2]
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(series[0]), series[1], series[2])
+                     for key, series in self._series.items()]
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield (f'{self.name}_bucket', key + (('le', bound),),
+                       cumulative)
+            yield f'{self.name}_bucket', key + (('le', '+Inf'),), count
+            yield f'{self.name}_sum', key, total
+            yield f'{self.name}_count', key, count
+
+
+class MetricsRegistry:
+    """Набор метрик бота и их вывод в текстовом формате Prometheus."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation):
+        return self.register(Counter(name, documentation))
+
+    def gauge(self, name, documentation, function=None):
+        gauge = self.register(Gauge(name, documentation))
+        if function is not None:
+            gauge.function = function
+        return gauge
+
+    def histogram(self, name, documentation, buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, buckets))
+
+    def render(self):
+        """Все метрики в формате text/plain; version=0.0.4."""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+stage_latency = registry.histogram(
+    'homework_bot_stage_seconds',
+    'Длительность этапов опроса: запрос, проверка, разбор, отправка.'
+)
+stage_errors = registry.counter(
+    'homework_bot_exceptions_total',
+    'Исключения по этапу опроса и классу исключения.'
+)
+
+
+def timed(stage):
+    """Декоратор: длительность вызова и исключения этапа опроса."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception as error:
+                stage_errors.inc(stage=stage,
+                                 exception=type(error).__name__)
+                raise
+            finally:
+                stage_latency.observe(time.perf_counter() - start,
+                                      stage=stage)
+        return wrapper
+    return decorator
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Отдаём метрики реестра по адресу /metrics."""
+
+    registry = registry
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port, host='127.0.0.1', metrics_registry=registry):
+    """Запускаем HTTP-сервер метрик в фоновом потоке."""
+    handler = type('Handler', (MetricsHandler,),
+                   {'registry': metrics_registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,331 @@
+import abc
+import http.client
+import json
+import logging
+import smtplib
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from email.message import EmailMessage
+from urllib.parse import urlsplit
+
+from telegram import TelegramError
+
+import exceptions
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_TIMEOUT = 10
+MAX_PENDING = 100
+EMAIL_SUBJECT = 'Статус проверки домашней работы'
+
+notify_latency = registry.histogram(
+    'homework_bot_notify_seconds',
+    'Длительность доставки уведомления по способу доставки.'
+)
+notify_errors = registry.counter(
+    'homework_bot_notify_errors_total',
+    'Недоставленные уведомления по способу доставки.'
+)
+notify_dropped = registry.counter(
+    'homework_bot_notify_dropped_total',
+    'Уведомления, вытесненные из переполненной очереди получателя.'
+)
+
+
+class Notifier(abc.ABC):
+    """Способ доставки уведомлений подписчику.
+
+    Наследники задают backend (имя для метрик) и send(message, event),
+    event - словарь с chat_id, homework и status уведомления (или None).
+    Каждая операция ввода-вывода ограничена timeout секунд. Наследники с
+    abortable = True реализуют abort(): deliver вызывает его из таймера,
+    если доставка целиком длится дольше timeout.
+    """
+
+    backend = None
+    abortable = False
+
+    def __init__(self, timeout=NOTIFY_TIMEOUT):
+        self.timeout = timeout
+        self._expired = threading.Event()
+
+    @abc.abstractmethod
+    def send(self, message, event=None):
+        """Доставляем message; ошибка доставки - исключение."""
+
+    def abort(self):
+        """Прерываем текущую доставку, закрыв её соединение."""
+
+    def deliver(self, message, event=None):
+        """send с замером длительности, учётом ошибок и общим таймаутом.
+
+        NotifierTimeoutError - доставка прервана по истечении timeout.
+        """
+        start = time.perf_counter()
+        # Своё событие на каждую доставку: send проверяет его, чтобы не
+        # повторять прерванную по таймауту доставку мимо таймера.
+        expired = self._expired = threading.Event()
+        timer = None
+        if self.abortable:
+            timer = threading.Timer(
+                self.timeout, lambda: (expired.set(), self.abort())
+            )
+            timer.daemon = True
+            timer.start()
+        try:
+            self.send(message, event)
+        except Exception as error:
+            notify_errors.inc(backend=self.backend)
+            if expired.is_set():
+                error_msg = (f'Доставка {self!r} прервана: дольше '
+                             f'{self.timeout} с.')
+                raise exceptions.NotifierTimeoutError(error_msg) from error
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+            notify_latency.observe(time.perf_counter() - start,
+                                   backend=self.backend)
+
+    def __repr__(self):
+        return f'{type(self).__name__}()'
+
+
+class TelegramNotifier(Notifier):
+    """Сообщение в чат chat_id через Bot API."""
+
+    backend = 'telegram'
+
+    def __init__(self, bot, chat_id, timeout=NOTIFY_TIMEOUT):
+        super().__init__(timeout)
+        self.bot = bot
+        self.chat_id = chat_id
+
+    def send(self, message, event=None):
+        try:
+            self.bot.send_message(self.chat_id, message,
+                                  timeout=self.timeout)
+        except TelegramError as tg_error:
+            error_msg = f'Ошибка отправления сообщения {tg_error}'
+            raise exceptions.TelegramSendMessageError(error_msg)
+
+
+class WebhookNotifier(Notifier):
+    """POST-запрос с JSON {"text": ..., "chat_id": ..., ...} на url.
+
+    У каждого вебхука своё keep-alive соединение: доставки одному
+    получателю идут по очереди, а прерывание по таймауту закрывает
+    только его соединение.
+    """
+
+    backend = 'webhook'
+    abortable = True
+
+    def __init__(self, url, timeout=NOTIFY_TIMEOUT):
+        super().__init__(timeout)
+        self.url = url
+        parts = urlsplit(url)
+        self._connection_class = (http.client.HTTPSConnection
+                                  if parts.scheme == 'https'
+                                  else http.client.HTTPConnection)
+        self._address = (parts.hostname, parts.port)
+        self._path = parts.path or '/'
+        if parts.query:
+            self._path += '?' + parts.query
+        self._connection = None
+
+    def _post(self, body):
+        reused = self._connection is not None
+        if not reused:
+            self._connection = self._connection_class(
+                *self._address, timeout=self.timeout
+            )
+        try:
+            self._connection.request(
+                'POST', self._path, body,
+                {'Content-Type': 'application/json'}
+            )
+            response = self._connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            self._connection.close()
+            self._connection = None
+            if not reused or self._expired.is_set():
+                raise
+            # Сервер мог закрыть простаивавшее соединение - одна попытка
+            # с новым. После abort() по таймауту повторять нельзя.
+            return self._post(body)
+        return response.status
+
+    def send(self, message, event=None):
+        body = json.dumps(dict(event or {}, text=message),
+                          ensure_ascii=False).encode()
+        try:
+            status = self._post(body)
+        except (OSError, http.client.HTTPException) as error:
+            error_msg = f'Вебхук {self.url} не принял уведомление: {error}'
+            raise exceptions.NotifierError(error_msg)
+        if status >= 400:
+            error_msg = f'Вебхук {self.url} ответил {status}'
+            raise exceptions.NotifierError(error_msg)
+
+    def abort(self):
+        connection = self._connection
+        if connection is not None:
+            shutdown_socket(connection.sock)
+
+    def __repr__(self):
+        return f'WebhookNotifier({self.url!r})'
+
+
+class SmtpNotifier(Notifier):
+    """Письмо на recipient через SMTP-сервер host:port."""
+
+    backend = 'smtp'
+    abortable = True
+
+    def __init__(self, host, port, sender, recipient, username=None,
+                 password=None, starttls=False, timeout=NOTIFY_TIMEOUT):
+        super().__init__(timeout)
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipient = recipient
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self._smtp = None
+
+    def send(self, message, event=None):
+        email = EmailMessage()
+        email['Subject'] = EMAIL_SUBJECT
+        email['From'] = self.sender
+        email['To'] = self.recipient
+        email.set_content(message)
+        smtp = self._smtp = smtplib.SMTP(timeout=self.timeout)
+        try:
+            with smtp:
+                smtp.connect(self.host, self.port)
+                if self.starttls:
+                    smtp.starttls()
+                if self.username:
+                    smtp.login(self.username, self.password)
+                smtp.send_message(email)
+        except (smtplib.SMTPException, OSError) as error:
+            error_msg = f'Письмо на {self.recipient} не отправлено: {error}'
+            raise exceptions.NotifierError(error_msg)
+        finally:
+            self._smtp = None
+
+    def abort(self):
+        smtp = self._smtp
+        if smtp is not None:
+            shutdown_socket(getattr(smtp, 'sock', None))
+
+    def __repr__(self):
+        return f'SmtpNotifier({self.recipient!r})'
+
+
+def shutdown_socket(sock):
+    """Будим поток, ждущий на сокете sock, закрывая соединение."""
+    if sock is None:
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+class SinkQueue:
+    """Очередь уведомлений одного получателя.
+
+    busy - доставка уже идёт (они идут строго по одной), slow -
+    последняя доставка прервана по таймауту.
+    """
+
+    __slots__ = ('pending', 'busy', 'slow')
+
+    def __init__(self):
+        self.pending = deque()
+        self.busy = False
+        self.slow = False
+
+
+class NotifierPool:
+    """Одновременная рассылка уведомления по нескольким способам.
+
+    У каждого получателя своя очередь не длиннее max_pending (лишние
+    вытесняются старейшими) и не больше одной доставки одновременно,
+    доставки разных получателей выполняются параллельно в пуле из
+    workers потоков. Получатели, чья последняя доставка прервана по
+    таймауту, обслуживаются отдельным пулом из slow_workers потоков,
+    поэтому медленные не занимают потоки остальных.
+    """
+
+    def __init__(self, workers=16, slow_workers=4, max_pending=MAX_PENDING):
+        self.executor = ThreadPoolExecutor(max_workers=workers,
+                                           thread_name_prefix='notify')
+        self.slow_executor = ThreadPoolExecutor(
+            max_workers=slow_workers, thread_name_prefix='notify-slow'
+        )
+        self.max_pending = max_pending
+        self._queues = {}
+        self._lock = threading.Lock()
+
+    def fan_out(self, notifiers, message, event=None):
+        """Ставим доставку в очереди получателей; возвращаем futures."""
+        futures = []
+        for notifier in notifiers:
+            future = Future()
+            with self._lock:
+                queue = self._queues.get(notifier)
+                if queue is None:
+                    queue = self._queues[notifier] = SinkQueue()
+                if len(queue.pending) >= self.max_pending:
+                    self._drop(notifier, queue.pending.popleft()[2])
+                queue.pending.append((message, event, future))
+                start = not queue.busy
+                queue.busy = True
+            if start:
+                self._schedule(notifier, queue)
+            futures.append(future)
+        return futures
+
+    def _drop(self, notifier, future):
+        notify_dropped.inc(backend=notifier.backend)
+        logger.warning('Очередь %s переполнена, уведомление вытеснено',
+                       notifier)
+        future.set_exception(exceptions.NotifierError(
+            f'Уведомление для {notifier!r} вытеснено из очереди'
+        ))
+
+    def _schedule(self, notifier, queue):
+        executor = self.slow_executor if queue.slow else self.executor
+        executor.submit(self._deliver_next, notifier, queue)
+
+    def _deliver_next(self, notifier, queue):
+        """Доставляем одно уведомление и уступаем поток другим очередям."""
+        with self._lock:
+            message, event, future = queue.pending.popleft()
+        try:
+            notifier.deliver(message, event)
+        except Exception as error:
+            queue.slow = isinstance(error, exceptions.NotifierTimeoutError)
+            logger.error('Уведомление %s не доставлено: %s', notifier, error)
+            future.set_exception(error)
+        else:
+            queue.slow = False
+            future.set_result(None)
+        with self._lock:
+            queue.busy = bool(queue.pending)
+        if queue.busy:
+            self._schedule(notifier, queue)
+
+    def close(self):
+        """Дожидаемся начатых доставок и останавливаем пулы."""
+        self.executor.shutdown(wait=True)
+        self.slow_executor.shutdown(wait=True)
@@ -0,0 +1,207 @@
+import asyncio
+import contextvars
+import logging
+import threading
+
+import exceptions
+from metrics import registry
+from scheduler import RequestBudget
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_MAX_LENGTH = 4096
+MESSAGE_SEPARATOR = '\n\n'
+
+current_outbox = contextvars.ContextVar('current_outbox', default=None)
+
+dead_letters = registry.counter(
+    'homework_bot_notifications_dead_total',
+    'Уведомления, которые журнал перестал повторять после неудач.'
+)
+
+
+def merge_messages(messages, max_length=MESSAGE_MAX_LENGTH):
+    """Склеиваем сообщения в куски не длиннее лимита Telegram.
+
+    messages - пары (текст, ключ журнала или None), в каждом куске
+    возвращаются текст и ключи вошедших в него сообщений.
+    """
+    chunks = []
+    for message, key in messages:
+        keys = [] if key is None else [key]
+        if (chunks and len(chunks[-1][0]) + len(MESSAGE_SEPARATOR)
+                + len(message) <= max_length):
+            text, chunk_keys = chunks[-1]
+            chunks[-1] = (text + MESSAGE_SEPARATOR + message,
+                          chunk_keys + keys)
+        else:
+            chunks.append((message, keys))
+    return chunks
+
+
+class TelegramOutbox:
+    """Очередь исходящих сообщений в Telegram.
+
+    send(chat_id, text) - синхронная отправка, она выполняется в пуле
+    потоков. Сообщения одному чату за merge_window секунд склеиваются
+    в одно, отправка ограничена общим (rate) и почтовым (chat_rate)
+    лимитами, ошибки TelegramSendMessageError повторяются с паузой.
+    Если передан journal, уведомления с ключом (работа, статус)
+    записываются в него до отправки и удаляются после доставки, а
+    недоставленные раз в replay_interval секунд ставятся в очередь снова.
+    Каждая неудачная доставка учитывается в журнале, после
+    journal.max_attempts неудач запись больше не повторяется.
+    """
+
+    def __init__(self, send, rate=30, chat_rate=1, merge_window=1.0,
+                 workers=8, max_retries=5, backoff=1.0, journal=None,
+                 replay_interval=60):
+        self.send = send
+        self.journal = journal
+        self.replay_interval = replay_interval
+        self.inflight = set()
+        self.global_budget = RequestBudget(rate)
+        self.chat_rate = chat_rate
+        self.merge_window = merge_window
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.chat_budgets = {}
+        self.pending = {}
+        self.ready = None
+        self.loop = None
+        # Сообщения, поставленные до запуска run(), и защита от гонки
+        # submit с запуском.
+        self._early = []
+        self._start_lock = threading.Lock()
+
+    def submit(self, chat_id, text, key=None):
+        """Ставим сообщение в очередь, можно вызывать из любого потока.
+
+        key - (работа, статус) для журнала доставки. До запуска run()
+        сообщения копятся и ставятся в очередь при запуске.
+        """
+        if self.journal is not None and key is not None:
+            self.journal.add(chat_id, key[0], key[1], text)
+        with self._start_lock:
+            if self.loop is None:
+                self._early.append((chat_id, text, key))
+                return
+        self.loop.call_soon_threadsafe(self._enqueue, chat_id, text, key)
+
+    def _enqueue(self, chat_id, text, key=None):
+        chat_id = str(chat_id)
+        if key is not None:
+            journal_key = (chat_id,) + tuple(key)
+            if journal_key in self.inflight:
+                return
+            self.inflight.add(journal_key)
+        if chat_id in self.pending:
+            self.pending[chat_id].append((text, key))
+            return
+        self.pending[chat_id] = [(text, key)]
+        self.loop.call_later(
+            self.merge_window, self.ready.put_nowait, chat_id
+        )
+
+    def depth(self):
+        """Число сообщений, ожидающих отправки."""
+        return sum(len(messages) for messages in list(self.pending.values()))
+
+    def _chat_budget(self, chat_id):
+        budget = self.chat_budgets.get(chat_id)
+        if budget is None:
+            budget = RequestBudget(self.chat_rate, burst=1)
+            self.chat_budgets[chat_id] = budget
+        return budget
+
+    async def deliver(self, chat_id, text, keys=()):
+        """Отправляем сообщение, повторяя попытки при ошибках Telegram."""
+        error = None
+        for attempt in range(self.max_retries):
+            await self._chat_budget(chat_id).acquire()
+            await self.global_budget.acquire()
+            try:
+                await self.loop.run_in_executor(
+                    None, self.send, chat_id, text
+                )
+            except exceptions.TelegramSendMessageError as tg_error:
+                error = tg_error
+                logger.warning('Повторим отправку в чат %s (попытка %s): %s',
+                               chat_id, attempt + 1, tg_error)
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+            else:
+                # Ключи освобождаются только после подтверждения в
+                # журнале, иначе replay() успеет отправить их снова.
+                if self.journal is not None and keys:
+                    await self.loop.run_in_executor(
+                        None, self.journal.ack, chat_id, keys
+                    )
+                self._release(chat_id, keys)
+                return True
+        logger.error('Сообщение в чат %s не отправлено после %s попыток',
+                     chat_id, self.max_retries)
+        await self._fail(chat_id, keys, error)
+        self._release(chat_id, keys)
+        return False
+
+    async def _fail(self, chat_id, keys, error):
+        """Учитываем неудачную доставку в журнале."""
+        if self.journal is None or not keys:
+            return
+        try:
+            dead = await self.loop.run_in_executor(
+                None, self.journal.fail, chat_id, keys, error
+            )
+        except Exception as journal_error:
+            logger.error('Неудача доставки в чат %s не записана: %s',
+                         chat_id, journal_error)
+            return
+        if dead:
+            dead_letters.inc(dead)
+            logger.error('Уведомления в чат %s больше не повторяются '
+                         '(%s шт.): %s', chat_id, dead, error)
+
+    def _release(self, chat_id, keys):
+        for key in keys:
+            self.inflight.discard((chat_id,) + tuple(key))
+
+    async def worker(self):
+        """Забираем чаты из очереди и отправляем накопленные сообщения."""
+        while True:
+            chat_id = await self.ready.get()
+            messages = self.pending.pop(chat_id, [])
+            for text, keys in merge_messages(messages):
+                try:
+                    await self.deliver(chat_id, text, keys)
+                except Exception as error:
+                    # Запись журнала остаётся, её повторит replay().
+                    logger.error('Сбой отправки в чат %s: %s', chat_id,
+                                 error)
+                    await self._fail(chat_id, keys, error)
+                    self._release(chat_id, keys)
+
+    async def replay(self):
+        """Повторно ставим в очередь недоставленные уведомления журнала."""
+        while True:
+            entries = await self.loop.run_in_executor(
+                None, self.journal.pending
+            )
+            if entries:
+                logger.info('Повторная отправка уведомлений: %s', len(entries))
+            for chat_id, homework, status, message in entries:
+                self._enqueue(chat_id, message, (homework, status))
+            await asyncio.sleep(self.replay_interval)
+
+    async def run(self):
+        """Запускаем обработчики очереди в текущем цикле событий."""
+        self.ready = asyncio.Queue()
+        with self._start_lock:
+            self.loop = asyncio.get_running_loop()
+            early, self._early = self._early, []
+        for chat_id, text, key in early:
+            self._enqueue(chat_id, text, key)
+        services = [self.worker() for _ in range(self.workers)]
+        if self.journal is not None:
+            services.append(self.replay())
+        await asyncio.gather(*services)
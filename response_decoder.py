@@ -0,0 +1,228 @@
+import hashlib
+import json
+import re
+import reprlib
+import threading
+import time
+from collections import OrderedDict
+
+from exceptions import ResponseTooLargeError
+from metrics import registry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+MAX_RESPONSE_BYTES = 2 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+EXCERPT_LENGTH = 200
+EXCERPT_DEPTH = 3
+EXCERPT_ITEMS = 10
+RESPONSE_FIELDS = ('homeworks', 'current_date')
+HOMEWORK_FIELDS = ('id', 'homework_name', 'status', 'date_updated')
+CURRENT_DATE_KEY = b'"current_date"'
+CURRENT_DATE = re.compile(CURRENT_DATE_KEY + rb'\s*:\s*(-?\d+)')
+PARSED = 'parsed'
+UNCHANGED = 'unchanged'
+NOT_MODIFIED = 'not_modified'
+
+api_responses = registry.counter(
+    'homework_bot_api_responses_total',
+    'Ответы API по исходу: parsed - разобран, unchanged - тело не '
+    'изменилось, not_modified - ответ 304.'
+)
+api_bytes = registry.counter(
+    'homework_bot_api_bytes_total',
+    'Байты тел ответов API (Content-Length при сжатии) по исходу.'
+)
+api_decode_cpu = registry.counter(
+    'homework_bot_api_decode_cpu_seconds_total',
+    'Процессорное время чтения и разбора ответов API по исходу.'
+)
+
+
+def loads(body):
+    """Разбор JSON: orjson, если установлен, иначе стандартный json."""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def excerpt(value, limit=EXCERPT_LENGTH):
+    """Начало текстового представления value для сообщений об ошибках.
+
+    Строка обрезается до limit символов. Остальные значения выводит
+    reprlib.Repr с ограничениями на глубину, число элементов и длину
+    строк - ответ API не превращается в строку целиком.
+    """
+    if isinstance(value, str):
+        if len(value) <= limit:
+            return value
+        return f'{value[:limit]}... (ещё {len(value) - limit} симв.)'
+    limits = reprlib.Repr()
+    limits.maxlevel = EXCERPT_DEPTH
+    limits.maxdict = limits.maxlist = limits.maxtuple = EXCERPT_ITEMS
+    limits.maxset = limits.maxfrozenset = limits.maxdeque = EXCERPT_ITEMS
+    limits.maxstring = limits.maxlong = limits.maxother = limit
+    text = limits.repr(value)
+    if len(text) <= limit:
+        return text
+    return f'{text[:limit]}...'
+
+
+def read_body(response, max_bytes=MAX_RESPONSE_BYTES, chunk_size=CHUNK_SIZE,
+              deadline=None):
+    """Читаем тело ответа частями, не больше max_bytes байт.
+
+    Если передан deadline, его срок проверяется после каждой части.
+    """
+    length = response.headers.get('Content-Length')
+    if length is not None and length.isdigit() and int(length) > max_bytes:
+        response.close()
+        error_msg = (f'Размер ответа {length} байт больше допустимых '
+                     f'{max_bytes}.')
+        raise ResponseTooLargeError(error_msg)
+    body = bytearray()
+    for chunk in response.iter_content(chunk_size):
+        body += chunk
+        if deadline is not None and deadline.remaining() <= 0:
+            response.close()
+            deadline.check('read_body')
+        if len(body) > max_bytes:
+            response.close()
+            error_msg = (f'Ответ больше допустимых {max_bytes} байт, '
+                         f'начало: {excerpt(bytes(body[:EXCERPT_LENGTH]))}')
+            raise ResponseTooLargeError(error_msg)
+    return body
+
+
+def prune_response(data):
+    """Оставляем в ответе только поля, которые нужны боту.
+
+    Структуры неожиданного вида не трогаем - их разбирает check_response.
+    """
+    if not isinstance(data, dict):
+        return data
+    pruned = {field: data[field] for field in RESPONSE_FIELDS
+              if field in data}
+    homeworks = pruned.get('homeworks')
+    if isinstance(homeworks, list):
+        pruned['homeworks'] = [
+            {field: homework[field] for field in HOMEWORK_FIELDS
+             if field in homework}
+            if isinstance(homework, dict) else homework
+            for homework in homeworks
+        ]
+    return pruned
+
+
+def decode_response(response, max_bytes=MAX_RESPONSE_BYTES, deadline=None):
+    """Читаем, разбираем и сокращаем ответ API Практикума.
+
+    ValueError - тело не JSON, ResponseTooLargeError - тело больше
+    max_bytes, DeadlineExceededError - тело не прочитано до deadline.
+    """
+    return prune_response(loads(read_body(response, max_bytes,
+                                          deadline=deadline)))
+
+
+def body_digest(body):
+    """Отпечаток тела без значения current_date и само current_date.
+
+    current_date меняется в каждом ответе, остальное тело - только при
+    изменении работ. (None, None), если current_date в теле нет. Ключ
+    внутри строки JSON экранирован и с маркером не совпадает; SHA-256
+    выбран за аппаратное ускорение - он быстрее разбора тела.
+    """
+    match = CURRENT_DATE.match(body, max(body.rfind(CURRENT_DATE_KEY), 0))
+    if match is None:
+        return None, None
+    view = memoryview(body)
+    digest = hashlib.sha256(view[:match.start()])
+    digest.update(view[match.end():])
+    return digest.digest(), int(match.group(1))
+
+
+class ResponseCache:
+    """Разобранные ответы API по отпечатку тела и валидаторы HTTP.
+
+    Ответ с уже встречавшимся отпечатком не разбирается: возвращается
+    сохранённый словарь с новым current_date и тем же списком работ,
+    поэтому неизменность ответа проверяется сравнением списков по is.
+    Для ключа запроса (токена) запоминаются ETag, Last-Modified и
+    отпечаток последнего ответа - из них строятся условные заголовки,
+    а ответ 304 восстанавливается из кэша. Записей не больше max_size.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._bodies = OrderedDict()
+        self._validators = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._bodies)
+
+    def _remember(self, entries, key, value):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_size:
+            entries.popitem(last=False)
+
+    def conditional_headers(self, key):
+        """If-None-Match и If-Modified-Since для запроса с ключом key."""
+        with self._lock:
+            validators = self._validators.get(key)
+            if validators is None or validators[2] not in self._bodies:
+                return {}
+        etag, modified, _ = validators
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if modified:
+            headers['If-Modified-Since'] = modified
+        return headers
+
+    def not_modified(self, key, current_date):
+        """Ответ 304: последний ответ ключа key с current_date запроса."""
+        with self._lock:
+            validators = self._validators.get(key)
+            cached = (None if validators is None
+                      else self._bodies.get(validators[2]))
+        api_responses.inc(result=NOT_MODIFIED)
+        if cached is None:
+            return {'homeworks': [], 'current_date': current_date}
+        return dict(cached, current_date=current_date)
+
+    def decode(self, response, key=None, max_bytes=MAX_RESPONSE_BYTES,
+               deadline=None):
+        """Читаем ответ и разбираем его, если тело изменилось."""
+        started = time.thread_time()
+        body = read_body(response, max_bytes, deadline=deadline)
+        digest, current_date = body_digest(body)
+        with self._lock:
+            cached = None if digest is None else self._bodies.get(digest)
+            if cached is not None:
+                self._bodies.move_to_end(digest)
+        if cached is not None:
+            data = dict(cached, current_date=current_date)
+            result = UNCHANGED
+        else:
+            data = prune_response(loads(body))
+            result = PARSED
+        with self._lock:
+            if (digest is not None and cached is None
+                    and isinstance(data, dict)):
+                self._remember(self._bodies, digest, data)
+            etag = response.headers.get('ETag')
+            modified = response.headers.get('Last-Modified')
+            if key is not None and digest is not None and (etag or modified):
+                self._remember(self._validators, key,
+                               (etag, modified, digest))
+        length = response.headers.get('Content-Length')
+        api_bytes.inc(int(length) if length and length.isdigit()
+                      else len(body), result=result)
+        api_responses.inc(result=result)
+        api_decode_cpu.inc(time.thread_time() - started, result=result)
+        return data
@@ -0,0 +1,137 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+MAX_BACKOFF_EXPONENT = 16
+
+
+def parse_date_updated(homework):
+    """Время изменения статуса работы (timestamp) или None."""
+    date_updated = homework.get('date_updated')
+    if not date_updated:
+        return None
+    try:
+        moment = datetime.strptime(date_updated, DATE_FORMAT)
+    except (TypeError, ValueError):
+        return None
+    return moment.replace(tzinfo=timezone.utc).timestamp()
+
+
+class AdaptivePollPolicy:
+    """Интервал до следующего опроса подписчика.
+
+    Пока работа на ревью (reviewing), опрашиваем часто. В остальное время
+    (работы приняты, возвращены или их ещё нет) ждём новой отправки на
+    ревью: интервал растёт экспоненциально с каждым опросом без
+    изменений, но не больше max_interval. Потолок держим близко к
+    base_interval, иначе новая работа на ревью замечается с опозданием.
+    Ко всем интервалам добавляется случайный разброс jitter, чтобы
+    опросы не синхронизировались.
+    """
+
+    def __init__(self, base_interval, reviewing_interval, max_interval,
+                 jitter=0.1, rng=None):
+        self.base_interval = base_interval
+        self.reviewing_interval = reviewing_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+
+    def interval(self, tenant):
+        """Интервал без разброса по последним статусам подписчика."""
+        if 'reviewing' in tenant.statuses.values():
+            return self.reviewing_interval
+        exponent = min(tenant.idle_polls, MAX_BACKOFF_EXPONENT)
+        return min(self.base_interval * 2 ** exponent, self.max_interval)
+
+    def next_delay(self, tenant, changed):
+        """Обновляем серию опросов без изменений и считаем задержку."""
+        tenant.idle_polls = 0 if changed else tenant.idle_polls + 1
+        spread = self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+        return self.interval(tenant) * spread
+
+    def idle_delays(self, tenant):
+        """Паузы до следующих опросов, пока статусы не меняются.
+
+        То же, что вызовы next_delay(tenant, changed=False) подряд, но
+        интервал пересчитывается, только пока он растёт.
+        """
+        random_ = self.rng.random
+        low, high = 1 - self.jitter, 1 + self.jitter
+        interval = None
+        growing = True
+        while True:
+            tenant.idle_polls += 1
+            if growing:
+                previous, interval = interval, self.interval(tenant)
+                growing = interval != previous
+            # Как rng.uniform(low, high), без вызова функции на каждую паузу.
+            yield interval * (low + (high - low) * random_())
+
+
+class RequestBudget:
+    """Общий для всех подписчиков лимит запросов к API (token bucket)."""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst or max(rate, 1)
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(
+            self.burst, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    async def acquire(self):
+        """Ждём, пока бюджет позволит сделать запрос."""
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class PollStats:
+    """Число запросов и задержка уведомлений об изменении статуса."""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.polls = 0
+        self.notifications = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def record(self, notified):
+        """Учитываем один опрос и отправленные по нему уведомления."""
+        self.polls += 1
+        now = self.clock()
+        for homework in notified:
+            self.notifications += 1
+            updated = parse_date_updated(homework)
+            if updated is None:
+                continue
+            latency = max(now - updated, 0.0)
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+
+    def record_quiet(self, polls):
+        """Учитываем опросы, по которым уведомлений заведомо нет."""
+        self.polls += polls
+
+    def summary(self):
+        """Сводка для журнала."""
+        mean = (self.latency_total / self.notifications
+                if self.notifications else 0.0)
+        return {
+            'polls': self.polls,
+            'notifications': self.notifications,
+            'latency_mean': round(mean, 1),
+            'latency_max': round(self.latency_max, 1),
+        }
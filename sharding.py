@@ -0,0 +1,44 @@
+import bisect
+import hashlib
+
+
+def ring_hash(value):
+    """64-битный хэш строки для кольца."""
+    digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class HashRing:
+    """Консистентное хэширование ключей по узлам.
+
+    Каждый узел занимает replicas точек на кольце, ключ достаётся узлу
+    первой точки по часовой стрелке от хэша ключа. При добавлении или
+    удалении узла переезжают только ключи, попавшие на его точки.
+    """
+
+    def __init__(self, nodes, replicas=512):
+        self.nodes = list(nodes)
+        points = sorted(
+            (ring_hash(f'{node}#{replica}'), node)
+            for node in self.nodes for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node(self, key):
+        """Узел, которому принадлежит ключ."""
+        index = bisect.bisect(self._hashes, ring_hash(key))
+        return self._nodes[index % len(self._nodes)]
+
+
+def shard_tenants(tenants, shard, shards):
+    """Подписчики процесса shard из shards, по хэшу токена Практикума.
+
+    Подписчики с одним токеном всегда попадают в один процесс и делят
+    запрос к API.
+    """
+    if shards <= 1:
+        return list(tenants)
+    ring = HashRing(range(shards))
+    return [tenant for tenant in tenants
+            if ring.node(tenant.practicum_token) == shard]
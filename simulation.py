@@ -0,0 +1,236 @@
+"""Симуляция опроса в виртуальном времени.
+
+Настоящий цикл опроса (PollingEngine, poll_tenant, check_response,
+parse_status, send_message) получает ответы Практикума из сценария и
+работает на виртуальных часах (PollingEngine.simulate). Опросы между
+событиями сценария только учитываются, поэтому месяц опроса 10 000
+подписчиков проходит примерно за минуту. Отчёт: число запросов и задержка
+уведомлений.
+
+    python simulation.py --tenants 10000 --days 30
+"""
+import argparse
+import bisect
+import json
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from http import HTTPStatus
+
+import clock
+import homework
+from engine import InlineExecutor, PollingEngine
+from scheduler import AdaptivePollPolicy, DATE_FORMAT
+from tenants import Tenant
+
+DAY = 24 * 60 * 60
+HOUR = 60 * 60
+
+
+def format_date(timestamp):
+    """Timestamp в формате date_updated API Практикума."""
+    moment = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+    return moment.strftime(DATE_FORMAT)
+
+
+def generate_script(rng, start, duration, submit_every=5 * DAY):
+    """Случайная история проверок одного студента.
+
+    Возвращает отсортированный по времени список (время, id, статус):
+    работа попадает на ревью, затем принимается или возвращается, после
+    возврата студент отправляет её снова.
+    """
+    events = []
+    moment = start + rng.uniform(0, submit_every)
+    homework_id = 0
+    while moment < start + duration:
+        homework_id += 1
+        while True:
+            moment += rng.uniform(HOUR, DAY)
+            events.append((moment, homework_id, 'reviewing'))
+            moment += rng.uniform(10 * 60, 4 * HOUR)
+            if rng.random() < 0.7:
+                events.append((moment, homework_id, 'approved'))
+                break
+            events.append((moment, homework_id, 'rejected'))
+            moment += rng.uniform(HOUR, DAY)
+        moment += rng.expovariate(1 / submit_every)
+    return events
+
+
+class ScriptedPracticum:
+    """Ответы API Практикума по сценариям подписчиков.
+
+    Заменяет api_session: get() возвращает работы, статус которых
+    изменился после from_date и не позже текущего виртуального времени.
+    """
+
+    def __init__(self, scripts, clock_, error_rate=0.0, rng=None):
+        self.scripts = scripts
+        self.times = {token: [event[0] for event in events]
+                      for token, events in scripts.items()}
+        self.clock = clock_
+        self.error_rate = error_rate
+        self.rng = rng or random.Random()
+        self.requests_count = 0
+        self.answered = {}
+
+    def homeworks(self, token, from_date, now):
+        """Последние статусы работ, изменившихся в (from_date, now]."""
+        events = self.scripts.get(token, [])
+        times = self.times.get(token, [])
+        left = bisect.bisect_right(times, from_date)
+        right = bisect.bisect_right(times, now)
+        latest = {}
+        for moment, homework_id, status in events[left:right]:
+            latest[homework_id] = {
+                'id': homework_id,
+                'homework_name': f'homework_{homework_id}.zip',
+                'status': status,
+                'date_updated': format_date(moment),
+            }
+        return list(reversed(list(latest.values())))
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        self.requests_count += 1
+        now = self.clock.time()
+        token = headers['Authorization'].split(' ', 1)[1]
+        if self.rng.random() < self.error_rate:
+            return ScriptedResponse(HTTPStatus.INTERNAL_SERVER_ERROR, {})
+        self.answered[token] = now
+        return ScriptedResponse(HTTPStatus.OK, {
+            'homeworks': self.homeworks(token, params['from_date'], now),
+            'current_date': int(now),
+        })
+
+    def quiet_time(self, token):
+        """Сколько секунд ответ токену не изменится после последнего.
+
+        До следующего события сценария новых работ в ответе нет. При
+        случайных ошибках (error_rate) ответ непредсказуем - 0.
+        """
+        answered = self.answered.get(token)
+        if answered is None or self.error_rate:
+            return 0
+        times = self.times.get(token, [])
+        index = bisect.bisect_right(times, answered)
+        if index == len(times):
+            return float('inf')
+        return max(times[index] - self.clock.time(), 0)
+
+
+class ScriptedResponse:
+    """Ответ сценария с интерфейсом requests.Response."""
+
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self.headers = {}
+        self.data = data
+
+    def json(self):
+        return self.data
+
+    def iter_content(self, chunk_size=1):
+        yield json.dumps(self.data).encode()
+
+    def close(self):
+        pass
+
+
+class CountingBot:
+    """Бот Telegram, который только считает сообщения."""
+
+    def __init__(self):
+        self.messages_count = 0
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.messages_count += 1
+
+
+def run_simulation(tenants_count=1000, days=30, seed=0, policy='adaptive',
+                   concurrency=100, error_rate=0.0, start=1665471713,
+                   replay_all=False):
+    """Прогоняем опрос подписчиков в виртуальном времени и считаем отчёт.
+
+    Через poll_tenant проходят опросы, которые могут увидеть новое событие
+    сценария. Опросы, ответ на которые заведомо не изменился с прошлого,
+    только учитываются движком (PollingEngine.skip_quiet); replay_all -
+    выполнять и их.
+    """
+    rng = random.Random(seed)
+    duration = days * DAY
+    virtual_clock = clock.VirtualClock(start)
+    tenants = [Tenant(f'token-{index}', index, start)
+               for index in range(tenants_count)]
+    scripts = {tenant.practicum_token: generate_script(rng, start, duration)
+               for tenant in tenants}
+    practicum = ScriptedPracticum(scripts, virtual_clock, error_rate, rng)
+    bot = CountingBot()
+    engine = PollingEngine(
+        lambda tenant: homework.poll_tenant(bot, tenant),
+        tenants,
+        retry_time=homework.RETRY_TIME,
+        concurrency=concurrency,
+        policy=AdaptivePollPolicy(
+            base_interval=homework.RETRY_TIME,
+            reviewing_interval=homework.REVIEWING_RETRY_TIME,
+            max_interval=homework.MAX_RETRY_TIME,
+            rng=rng
+        ) if policy == 'adaptive' else None,
+        clock=virtual_clock,
+        executor=InlineExecutor(),
+        lag_interval=0
+    )
+
+    api_session = homework.api_session
+    homework.api_session = practicum
+    token = clock.current_clock.set(virtual_clock)
+    logging.disable(logging.CRITICAL)
+    started = time.perf_counter()
+    try:
+        engine.simulate(duration, quiet_time=None if replay_all else (
+            lambda group: practicum.quiet_time(group[0].practicum_token)
+        ))
+    finally:
+        logging.disable(logging.NOTSET)
+        clock.current_clock.reset(token)
+        homework.api_session = api_session
+    requests = practicum.requests_count + engine.quiet_polls
+    report = engine.stats.summary()
+    report.update({
+        'tenants': tenants_count,
+        'days': days,
+        'policy': policy,
+        'requests': requests,
+        'requests_per_tenant_day': round(requests / tenants_count / days, 1),
+        'replayed_requests': practicum.requests_count,
+        'transitions': sum(len(events) for events in scripts.values()),
+        'messages': bot.messages_count,
+        'wall_seconds': round(time.perf_counter() - started, 2),
+    })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--days', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--policy', choices=('adaptive', 'fixed'),
+                        default='adaptive')
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--replay-all', action='store_true',
+                        help='выполнять и опросы без новых событий')
+    args = parser.parse_args()
+    report = run_simulation(
+        tenants_count=args.tenants, days=args.days, seed=args.seed,
+        policy=args.policy, concurrency=args.concurrency,
+        error_rate=args.error_rate, replay_all=args.replay_all
+    )
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import threading
+
+from metrics import registry
+
+shared_calls = registry.counter(
+    'homework_bot_singleflight_shared_total',
+    'Вызовы, получившие результат чужого запроса вместо своего.'
+)
+
+
+class _Call:
+    """Выполняющийся вызов и его результат.
+
+    event создаётся первым ждущим: обычно вызов никто не ждёт.
+    """
+
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = None
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Объединение одновременных одинаковых вызовов.
+
+    Пока вызов с ключом key выполняется, остальные вызовы с тем же ключом
+    ждут его и получают тот же результат (или то же исключение).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        """Выполняем func или ждём уже идущий вызов с тем же ключом."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            elif call.event is None:
+                call.event = threading.Event()
+        if not leader:
+            shared_calls.inc()
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func()
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                event = call.event
+            if event is not None:
+                event.set()
+        return call.result
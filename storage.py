@@ -0,0 +1,81 @@
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    tenant TEXT PRIMARY KEY,
+    from_date INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS statuses (
+    tenant TEXT NOT NULL,
+    homework TEXT NOT NULL,
+    status TEXT NOT NULL,
+    PRIMARY KEY (tenant, homework)
+);
+"""
+
+
+class CheckpointStore:
+    """Хранилище состояния опроса в SQLite (режим WAL).
+
+    Для каждого подписчика сохраняется current_date из последнего ответа API
+    и последний отправленный статус каждой домашней работы.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(SCHEMA)
+
+    def load_checkpoint(self, tenant_key):
+        """current_date последнего успешного опроса или None."""
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT from_date FROM checkpoints WHERE tenant = ?',
+                (tenant_key,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def save_checkpoint(self, tenant_key, current_date):
+        """Запоминаем current_date из ответа API."""
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO checkpoints (tenant, from_date) '
+                'VALUES (?, ?)',
+                (tenant_key, current_date)
+            )
+
+    def load_statuses(self, tenant_key):
+        """Последние отправленные статусы работ по ключу работы."""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT homework, status FROM statuses WHERE tenant = ?',
+                (tenant_key,)
+            ).fetchall()
+        return dict(rows)
+
+    def save_status(self, tenant_key, homework_key, status):
+        """Запоминаем отправленный статус домашней работы."""
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO statuses (tenant, homework, status) '
+                'VALUES (?, ?, ?)',
+                (tenant_key, homework_key, status)
+            )
+
+    def restore(self, tenant):
+        """Восстанавливаем состояние подписчика после перезапуска."""
+        current_date = self.load_checkpoint(tenant.key)
+        if current_date is not None:
+            tenant.current_timestamp = current_date
+        tenant.statuses = self.load_statuses(tenant.key)
+
+    def close(self):
+        """Закрываем соединение с базой."""
+        with self._lock:
+            self._connection.close()
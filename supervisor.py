@@ -0,0 +1,91 @@
+import logging
+import multiprocessing
+import time
+from multiprocessing.connection import wait
+
+logger = logging.getLogger(__name__)
+
+
+class Supervisor:
+    """Запускает workers процессов target(shard, workers) и следит за ними.
+
+    Упавший процесс перезапускается. Если он проработал меньше
+    stable_time секунд, пауза перед перезапуском удваивается от
+    restart_delay до max_restart_delay, иначе сбрасывается.
+    """
+
+    def __init__(self, target, workers, restart_delay=1.0,
+                 max_restart_delay=60.0, stable_time=60.0, context=None):
+        self.target = target
+        self.workers = workers
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.stable_time = stable_time
+        self.context = context or multiprocessing.get_context('spawn')
+        self.processes = {}
+        self.started = {}
+        self.delays = {}
+        self.restarts = 0
+        self._restart_at = {}
+        self._stopping = False
+
+    def start_worker(self, shard):
+        process = self.context.Process(
+            target=self.target, args=(shard, self.workers),
+            name=f'worker-{shard}', daemon=False
+        )
+        process.start()
+        self.processes[shard] = process
+        self.started[shard] = time.monotonic()
+        logger.info('Запущен процесс %s (pid %s)', shard, process.pid)
+
+    def check_workers(self):
+        """Планируем перезапуск завершившихся процессов."""
+        now = time.monotonic()
+        for shard, process in list(self.processes.items()):
+            if process.is_alive() or shard in self._restart_at:
+                continue
+            process.join()
+            if now - self.started[shard] >= self.stable_time:
+                delay = self.restart_delay
+            else:
+                delay = min(self.delays.get(shard, self.restart_delay / 2) * 2,
+                            self.max_restart_delay)
+            self.delays[shard] = delay
+            self._restart_at[shard] = now + delay
+            logger.error('Процесс %s завершился с кодом %s, перезапуск '
+                         'через %.0f с', shard, process.exitcode, delay)
+        for shard, moment in list(self._restart_at.items()):
+            if moment <= now and not self._stopping:
+                del self._restart_at[shard]
+                self.restarts += 1
+                self.start_worker(shard)
+
+    def run(self, poll_interval=1.0):
+        """Запускаем процессы и перезапускаем упавшие до вызова stop()."""
+        logger.info('Запускаем процессов: %s', self.workers)
+        for shard in range(self.workers):
+            self.start_worker(shard)
+        try:
+            while not self._stopping:
+                sentinels = [process.sentinel
+                             for shard, process in self.processes.items()
+                             if shard not in self._restart_at]
+                if sentinels:
+                    wait(sentinels, timeout=poll_interval)
+                else:
+                    time.sleep(poll_interval)
+                self.check_workers()
+        finally:
+            self.terminate()
+
+    def stop(self):
+        """Просим цикл run завершиться (можно из обработчика сигнала)."""
+        self._stopping = True
+
+    def terminate(self, timeout=10):
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes.values():
+            process.join(timeout)
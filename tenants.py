@@ -0,0 +1,200 @@
+import contextvars
+import hashlib
+import json
+import sys
+import threading
+import zlib
+from collections.abc import Mapping
+
+current_tenant = contextvars.ContextVar('current_tenant', default=None)
+
+STATUS_NAMES = ['approved', 'reviewing', 'rejected', 'missing']
+STATUS_CODES = {status: code for code, status in enumerate(STATUS_NAMES)}
+# Кодов не больше, чем помещается в int8 столбец analytics.
+MAX_STATUS_CODES = 64
+OTHER_STATUS = -1
+_status_lock = threading.Lock()
+
+
+def status_code(status):
+    """Малое целое вместо строки статуса.
+
+    Новые статусы получают новый код, пока кодов меньше MAX_STATUS_CODES,
+    остальные - общий код OTHER_STATUS: API не может раздуть таблицу.
+    """
+    code = STATUS_CODES.get(status)
+    if code is None:
+        with _status_lock:
+            code = STATUS_CODES.get(status)
+            if code is None:
+                if len(STATUS_NAMES) >= MAX_STATUS_CODES:
+                    return OTHER_STATUS
+                code = STATUS_CODES[status] = len(STATUS_NAMES)
+                STATUS_NAMES.append(status)
+    return code
+
+
+def encode_status(status):
+    """Код статуса, а для статусов без кода - интернированная строка."""
+    code = status_code(status)
+    if code == OTHER_STATUS:
+        return sys.intern(str(status))
+    return code
+
+
+def decode_status(value):
+    return STATUS_NAMES[value] if isinstance(value, int) else value
+
+
+class StatusView(Mapping):
+    """Статусы работ {ключ работы: статус} поверх словаря кодов, без копии."""
+
+    __slots__ = ('_codes',)
+
+    def __init__(self, codes):
+        self._codes = codes
+
+    def __getitem__(self, key):
+        return decode_status(self._codes[key])
+
+    def __iter__(self):
+        return iter(self._codes)
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+def error_fingerprint(message):
+    """Отпечаток текста ошибки вместо самого сообщения.
+
+    Младшие 30 бит CRC32 помещаются в самый маленький объект int.
+    """
+    return zlib.crc32(str(message).encode()) & 0x3FFFFFFF
+
+
+class Tenant:
+    """Подписчик бота: токен Практикума, чат Telegram и состояние опроса.
+
+    Состояние хранится компактно: статусы работ - коды статусов с
+    интернированными ключами работ, последняя ошибка - отпечаток
+    error_fingerprint, а не текст. Единственную работу, как прежние
+    previous_homework и previous_status, храним прямо в слотах: status_key
+    и код в status_codes. Со второй работы status_codes - словарь {ключ
+    работы: код статуса}, обновляемый на месте, а status_key - None.
+    last_homeworks - список работ последнего полностью обработанного
+    ответа (общий с кэшем ответов, поэтому не копия). sinks -
+    дополнительные способы доставки уведомлений (notifiers.Notifier)
+    помимо чата chat_id.
+    """
+
+    __slots__ = ('practicum_token', 'chat_id', 'current_timestamp',
+                 'status_key', 'status_codes', 'idle_polls', 'error_hash',
+                 'last_homeworks', 'sinks')
+
+    def __init__(self, practicum_token, chat_id, current_timestamp=0):
+        self.practicum_token = practicum_token
+        self.chat_id = chat_id
+        self.current_timestamp = current_timestamp
+        self.status_key = None
+        self.status_codes = None
+        self.idle_polls = 0
+        self.error_hash = 0
+        self.last_homeworks = None
+        self.sinks = ()
+
+    @property
+    def statuses(self):
+        """Последние известные статусы работ: {ключ работы: статус}."""
+        codes = self.status_codes
+        if self.status_key is not None:
+            codes = {self.status_key: codes}
+        return StatusView({} if codes is None else codes)
+
+    @statuses.setter
+    def statuses(self, statuses):
+        self.status_key = None
+        self.status_codes = None
+        for key, status in statuses.items():
+            self.set_status(key, status)
+
+    def set_status(self, key, status):
+        """Запоминаем статус работы key."""
+        code = encode_status(status)
+        codes = self.status_codes
+        if isinstance(codes, dict):
+            if key not in codes:
+                key = sys.intern(str(key))
+            codes[key] = code
+        elif self.status_key is None:
+            self.status_key = sys.intern(str(key))
+            self.status_codes = code
+        elif self.status_key == key:
+            self.status_codes = code
+        else:
+            self.status_codes = {self.status_key: codes,
+                                 sys.intern(str(key)): code}
+            self.status_key = None
+
+    def remember_error(self, error):
+        """Запоминаем ошибку; True, если она отличается от предыдущей."""
+        fingerprint = error_fingerprint(error)
+        if fingerprint == self.error_hash:
+            return False
+        self.error_hash = fingerprint
+        return True
+
+    @property
+    def key(self):
+        """Ключ подписчика для хранилища, без токена в открытом виде."""
+        digest = hashlib.sha256(str(self.practicum_token).encode())
+        return f'{self.chat_id}:{digest.hexdigest()[:16]}'
+
+    @property
+    def headers(self):
+        """Заголовки авторизации для запроса к API Практикума."""
+        return {'Authorization': f'OAuth {self.practicum_token}'}
+
+    def __repr__(self):
+        return f'Tenant(chat_id={self.chat_id!r})'
+
+
+def get_current_tenant():
+    """Подписчик, для которого сейчас выполняется опрос."""
+    return current_tenant.get()
+
+
+def load_tenants(path, current_timestamp=0, make_sinks=None):
+    """Читаем подписчиков из JSON-файла.
+
+    Формат файла - список объектов с ключами practicum_token и chat_id.
+    make_sinks(record) - способы доставки подписчика из его записи.
+    """
+    with open(path, encoding='utf-8') as file:
+        records = json.load(file)
+    if not isinstance(records, list):
+        error_msg = (f'Файл подписчиков должен содержать список, '
+                     f'сейчас - {type(records)}')
+        raise TypeError(error_msg)
+    tenants = []
+    for record in records:
+        tenant = Tenant(record['practicum_token'], record['chat_id'],
+                        current_timestamp)
+        if make_sinks is not None:
+            tenant.sinks = tuple(make_sinks(record))
+        tenants.append(tenant)
+    return tenants
+
+
+def align_checkpoints(tenants):
+    """Ставим подписчикам одного токена общий, самый ранний from_date.
+
+    Ответ с более ранним from_date содержит все изменения более позднего,
+    а уже отправленные статусы отсеивает сравнение, поэтому подписчики
+    могут делить один запрос к API.
+    """
+    from_date = min(tenant.current_timestamp for tenant in tenants)
+    for tenant in tenants:
+        tenant.current_timestamp = from_date
@@ -0,0 +1,64 @@
+import pytest
+
+from archive import TRANSITION, ResponseArchive
+
+np = pytest.importorskip('numpy')
+import analytics  # noqa: E402
+
+HOUR = 3600
+
+
+def transition(archive, tenant, homework, status, moment, updated=None):
+    archive.append(tenant, TRANSITION, {
+        'homework': homework, 'homework_name': homework, 'status': status,
+        'date_updated': updated,
+    }, ts=moment)
+
+
+class TestAnalytics:
+
+    def test_turnaround_report_from_archive(self, tmp_path):
+        archive = ResponseArchive(str(tmp_path), block_records=4)
+        transition(archive, 'a', '1', 'reviewing', 0)
+        transition(archive, 'a', '1', 'rejected', 2 * HOUR)
+        transition(archive, 'a', '1', 'reviewing', 3 * HOUR)
+        transition(archive, 'a', '1', 'approved', 4 * HOUR)
+        transition(archive, 'b', '1', 'reviewing', 10 * HOUR,
+                   '1970-01-01T10:00:00Z')
+        transition(archive, 'b', '1', 'approved', 20 * HOUR,
+                   '1970-01-01T16:00:00Z')
+        transition(archive, 'b', '2', 'approved', 21 * HOUR)
+        columns = analytics.load_transitions(archive)
+        archive.close()
+        report = analytics.turnaround_report(columns, quantiles=(0.5, 1))
+        assert report['transitions'] == 7
+        assert report['reviews'] == 3, (
+            'Проверьте, что проверка - это reviewing и следующий за ним '
+            'вердикт той же работы'
+        )
+        assert report['turnaround'] == [2 * HOUR, 6 * HOUR], (
+            'Проверьте, что время проверки берётся из date_updated, '
+            'если оно есть'
+        )
+        assert report['rejection_rate'] == pytest.approx(1 / 3)
+        tenants = {item['tenant']: item for item in report['tenants']}
+        assert tenants['a']['reviews'] == 2
+        assert tenants['a']['turnaround'] == [HOUR, 2 * HOUR]
+        assert tenants['a']['rejection_rate'] == 0.5
+        assert tenants['b']['turnaround'] == [6 * HOUR, 6 * HOUR]
+        assert report['review_hours'][10] == 1
+        assert sum(report['verdict_hours']) == 3
+        assert 'Доля отказов: 33.3%' in analytics.format_report(report)
+
+    def test_group_quantiles_match_per_group_sort(self):
+        rng = np.random.default_rng(0)
+        groups = rng.integers(0, 50, 10000)
+        values = rng.exponential(HOUR, 10000)
+        keys, counts, table = analytics.group_quantiles(groups, values)
+        for key, count, row in zip(keys, counts, table):
+            expected = np.sort(values[groups == key])
+            assert count == len(expected)
+            assert row.tolist() == [
+                expected[int(quantile * (count - 1))]
+                for quantile in analytics.QUANTILES
+            ]
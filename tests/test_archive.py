@@ -0,0 +1,103 @@
+import asyncio
+import os
+import zlib
+
+from archive import RESPONSE, TRANSITION, ResponseArchive
+
+
+def fill(archive, tenants=5, records=200):
+    for moment in range(records):
+        for tenant in range(tenants):
+            archive.append(f'{tenant}:key', RESPONSE,
+                           {'current_date': moment}, ts=moment)
+
+
+class TestResponseArchive:
+
+    def test_query_by_tenant_and_time(self, tmp_path):
+        archive = ResponseArchive(str(tmp_path), segment_bytes=2048,
+                                  block_records=16)
+        fill(archive)
+        archive.append('3:key', TRANSITION, {'status': 'approved'}, ts=150.5)
+        assert len(archive.segments) > 1, (
+            'Проверьте, что архив делится на сегменты'
+        )
+        records = archive.query('3:key', since=100, until=150.5)
+        assert [record['ts'] for record in records] == (
+            list(range(100, 151)) + [150.5]
+        ), 'Проверьте выборку записей подписчика за интервал времени'
+        assert records[-1]['kind'] == TRANSITION
+        assert all(record['tenant'] == '3:key' for record in records)
+        archive.close()
+        assert not [name for name in os.listdir(tmp_path)
+                    if name.endswith('.seg')
+                    and not os.path.exists(tmp_path / (name[:-4] + '.idx'))]
+
+        reopened = ResponseArchive(str(tmp_path), readonly=True)
+        assert len(reopened.query('3:key')) == 201, (
+            'Проверьте, что архив читается после перезапуска'
+        )
+        assert reopened.query('нет:key') == []
+        reopened.close()
+
+    def test_segment_without_index_is_recovered(self, tmp_path):
+        archive = ResponseArchive(str(tmp_path), block_records=16)
+        fill(archive, tenants=2, records=40)
+        archive.flush()
+        reader = ResponseArchive(str(tmp_path), readonly=True)
+        assert len(reader.query('1:key', since=10, until=19)) == 10, (
+            'Проверьте, что незакрытый сегмент читается без индекса'
+        )
+        reader.close()
+
+        recovered = ResponseArchive(str(tmp_path))
+        assert len(recovered.query('0:key')) == 40, (
+            'Проверьте, что после сбоя индекс сегмента восстанавливается'
+        )
+        recovered.close()
+
+    def test_tail_reads_only_newest_blocks(self, tmp_path, monkeypatch):
+        archive = ResponseArchive(str(tmp_path), segment_bytes=2048,
+                                  block_records=16)
+        fill(archive)
+        for moment in (10.5, 190.5):
+            archive.append('3:key', TRANSITION, {'status': 'approved'},
+                           ts=moment)
+        fill(archive, records=1)
+        archive.flush()
+        archive.append('3:key', TRANSITION, {'status': 'rejected'}, ts=200)
+        decompressed = []
+        decompress = zlib.decompress
+        monkeypatch.setattr(zlib, 'decompress', lambda data: (
+            decompressed.append(data) or decompress(data)
+        ))
+        records = archive.tail('3:key', 2, kind=TRANSITION)
+        assert [record['ts'] for record in records] == [190.5, 200], (
+            'Проверьте, что tail возвращает последние записи вида kind'
+        )
+        tail_blocks = len(decompressed)
+        archive.query('3:key')
+        assert tail_blocks * 10 < len(decompressed) - tail_blocks, (
+            'Проверьте, что tail не распаковывает всю историю подписчика'
+        )
+        assert [record['ts'] for record in archive.tail('3:key', 3)] == [
+            198, 199, 200
+        ]
+        archive.close()
+
+    def test_run_flushes_partial_block(self, tmp_path):
+        archive = ResponseArchive(str(tmp_path), block_records=256)
+        archive.append('1:key', TRANSITION, {'status': 'approved'}, ts=1)
+
+        async def scenario():
+            task = asyncio.ensure_future(archive.run(interval=0.01))
+            await asyncio.sleep(0.1)
+            task.cancel()
+
+        asyncio.run(scenario())
+        reader = ResponseArchive(str(tmp_path), readonly=True)
+        assert len(reader.query('1:key')) == 1, (
+            'Проверьте, что неполный блок записывается по таймеру'
+        )
+        reader.close()
+        archive.close()
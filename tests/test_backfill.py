@@ -0,0 +1,63 @@
+import threading
+import time
+
+import homework
+from backfill import run_backfill
+from storage import CheckpointStore
+from tenants import Tenant
+
+
+class TestBackfill:
+
+    def test_backfill_seeds_store_without_notifications(self, monkeypatch,
+                                                        tmp_path):
+        calls = []
+        lock = threading.Lock()
+
+        def fake_get_api_answer(current_timestamp):
+            with lock:
+                calls.append(current_timestamp)
+            time.sleep(0.05)
+            return {
+                'homeworks': [
+                    {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'},
+                    {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+                    {'id': 1, 'homework_name': 'hw1', 'status': 'reviewing'},
+                ],
+                'current_date': 1650000000,
+            }
+
+        def fail_send(*args, **kwargs):
+            raise AssertionError('Загрузка истории не должна уведомлять')
+
+        monkeypatch.setattr(homework, 'get_api_answer', fake_get_api_answer)
+        monkeypatch.setattr(homework, 'notify', fail_send)
+        store = CheckpointStore(str(tmp_path / 'state.sqlite3'))
+        tenants = [Tenant(f'token-{index}', index) for index in range(20)]
+        started = time.perf_counter()
+        summary = run_backfill(tenants, since=0, concurrency=10, store=store)
+        elapsed = time.perf_counter() - started
+        assert summary['tenants'] == 20 and summary['failed'] == 0
+        assert summary['homeworks'] == 40
+        assert calls == [0] * 20, (
+            'Проверьте, что история запрашивается с from_date=since'
+        )
+        assert elapsed < 0.5, (
+            'Проверьте, что подписчики загружаются параллельно'
+        )
+        restored = Tenant('token-3', 3)
+        store.restore(restored)
+        store.close()
+        assert restored.current_timestamp == 1650000000
+        assert restored.statuses == {'2': 'reviewing', '1': 'approved'}, (
+            'Проверьте, что в хранилище записан последний статус каждой работы'
+        )
+
+    def test_failed_tenant_is_counted(self, monkeypatch):
+        def broken_get_api_answer(current_timestamp):
+            raise homework.exceptions.RequestExceptionError('нет связи')
+
+        monkeypatch.setattr(homework, 'get_api_answer', broken_get_api_answer)
+        summary = run_backfill([Tenant('token', 1)], concurrency=1)
+        assert summary['failed'] == 1
+        assert summary['homeworks'] == 0
@@ -1,7 +1,7 @@
+import json
 import os
 from http import HTTPStatus
 
-import requests
 import telegram
 import utils
 
@@ -44,6 +44,7 @@ class MockResponseGET:
         )
         self.random_timestamp = random_timestamp
         self.status_code = http_status
+        self.headers = {}
 
     def json(self):
         data = {
@@ -52,6 +53,14 @@ class MockResponseGET:
         }
         return data
 
+    def iter_content(self, chunk_size=1):
+        body = json.dumps(self.json()).encode()
+        for start in range(0, len(body), chunk_size):
+            yield body[start:start + chunk_size]
+
+    def close(self):
+        pass
+
 
 class MockTelegramBot:
 
@@ -186,9 +195,8 @@ class TestHomework:
                 current_timestamp=current_timestamp, **kwargs
             )
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
-
         import homework
+        monkeypatch.setattr(homework.api_session, 'get', mock_response_get)
 
         func_name = 'get_api_answer'
         utils.check_function(homework, func_name, 1)
@@ -232,9 +240,8 @@ class TestHomework:
             response.json = json_invalid
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_500_response_get)
-
         import homework
+        monkeypatch.setattr(homework.api_session, 'get', mock_500_response_get)
 
         func_name = 'get_api_answer'
         try:
@@ -315,9 +322,8 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
-
         import homework
+        monkeypatch.setattr(homework.api_session, 'get', mock_response_get)
 
         func_name = 'check_response'
         response = homework.get_api_answer(current_timestamp)
@@ -352,9 +358,8 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
-
         import homework
+        monkeypatch.setattr(homework.api_session, 'get', mock_response_get)
 
         func_name = 'parse_status'
         response = homework.get_api_answer(current_timestamp)
@@ -400,9 +405,8 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
-
         import homework
+        monkeypatch.setattr(homework.api_session, 'get', mock_response_get)
 
         func_name = 'parse_status'
         response = homework.get_api_answer(current_timestamp)
@@ -448,9 +452,8 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
-
         import homework
+        monkeypatch.setattr(homework.api_session, 'get', mock_response_get)
 
         func_name = 'parse_status'
         response = homework.get_api_answer(current_timestamp)
@@ -484,9 +487,8 @@ class TestHomework:
             response.json = json_invalid
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_no_homeworks_response_get)
-
         import homework
+        monkeypatch.setattr(homework.api_session, 'get', mock_no_homeworks_response_get)
 
         func_name = 'check_response'
         result = homework.get_api_answer(current_timestamp)
@@ -525,9 +527,8 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
-
         import homework
+        monkeypatch.setattr(homework.api_session, 'get', mock_response_get)
 
         func_name = 'check_response'
         response = homework.get_api_answer(current_timestamp)
@@ -565,9 +566,8 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
-
         import homework
+        monkeypatch.setattr(homework.api_session, 'get', mock_response_get)
 
         func_name = 'check_response'
         response = homework.get_api_answer(current_timestamp)
@@ -599,9 +599,8 @@ class TestHomework:
             response.json = json_invalid
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_empty_response_get)
-
         import homework
+        monkeypatch.setattr(homework.api_session, 'get', mock_empty_response_get)
 
         func_name = 'check_response'
         result = homework.get_api_answer(current_timestamp)
@@ -626,9 +625,8 @@ class TestHomework:
             )
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
-
         import homework
+        monkeypatch.setattr(homework.api_session, 'get', mock_response_get)
 
         func_name = 'check_response'
         try:
@@ -640,3 +638,265 @@ class TestHomework:
                 f'Убедитесь, что в функции `{func_name}` обрабатываете ситуацию, '
                 'когда API возвращает код, отличный от 200'
             )
+
+    def test_diff_homeworks(self):
+        import homework
+
+        homeworks = [
+            {'id': 3, 'homework_name': 'hw3', 'status': 'reviewing'},
+            {'id': 2, 'homework_name': 'hw2', 'status': 'approved'},
+            {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+        ]
+        statuses = {'2': 'reviewing', '1': 'approved'}
+        changed = homework.diff_homeworks(homeworks, statuses)
+        assert [hw['id'] for hw in changed] == [2, 3], (
+            'Убедитесь, что `diff_homeworks` возвращает все работы с '
+            'изменившимся статусом, от старых к новым'
+        )
+
+    def test_poll_tenant_notifies_every_transition(self, monkeypatch,
+                                                   random_timestamp,
+                                                   current_timestamp):
+        import homework
+        from tenants import Tenant
+
+        def mock_response_get(*args, **kwargs):
+            response = MockResponseGET(
+                *args, random_timestamp=random_timestamp,
+                current_timestamp=current_timestamp, **kwargs
+            )
+
+            def valid_response_json():
+                return {
+                    'homeworks': [
+                        {'id': 2, 'homework_name': 'hw2',
+                         'status': 'reviewing'},
+                        {'id': 1, 'homework_name': 'hw1',
+                         'status': 'approved'},
+                    ],
+                    'current_date': random_timestamp
+                }
+
+            response.json = valid_response_json
+            return response
+
+        monkeypatch.setattr(homework.api_session, 'get', mock_response_get)
+        sent = []
+
+        class RecordingBot(MockTelegramBot):
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                sent.append(text)
+
+        bot = RecordingBot(token='1234:abcdefg')
+        tenant = Tenant('sometoken', 12345, current_timestamp)
+        homework.poll_tenant(bot, tenant)
+        assert len(sent) == 2, (
+            'Убедитесь, что бот сообщает об изменении статуса каждой работы'
+        )
+        assert tenant.current_timestamp == random_timestamp, (
+            'Убедитесь, что следующий запрос использует current_date ответа'
+        )
+        tenant.current_timestamp = current_timestamp
+        homework.poll_tenant(bot, tenant)
+        assert len(sent) == 2, (
+            'Убедитесь, что бот не повторяет уведомления без изменений'
+        )
+
+    def test_poll_tenant_skips_unknown_status(self, monkeypatch,
+                                              random_timestamp,
+                                              current_timestamp):
+        import homework
+        from tenants import Tenant
+
+        def mock_response_get(*args, **kwargs):
+            response = MockResponseGET(
+                *args, random_timestamp=random_timestamp,
+                current_timestamp=current_timestamp, **kwargs
+            )
+            response.json = lambda: {
+                'homeworks': [
+                    {'id': 2, 'homework_name': 'hw2', 'status': 'pending'},
+                    {'id': 1, 'homework_name': 'hw1', 'status': 'reviewing'},
+                ],
+                'current_date': random_timestamp
+            }
+            return response
+
+        monkeypatch.setattr(homework.api_session, 'get', mock_response_get)
+        sent = []
+
+        class RecordingBot(MockTelegramBot):
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                sent.append(text)
+
+        tenant = Tenant('sometoken', 12345, current_timestamp)
+        homework.poll_tenant(RecordingBot(token='1234:abcdefg'), tenant)
+        assert len(sent) == 1 and 'hw1' in sent[0], (
+            'Убедитесь, что работа с неизвестным статусом не мешает '
+            'уведомить об остальных работах'
+        )
+        assert tenant.current_timestamp == random_timestamp, (
+            'Убедитесь, что from_date сдвигается и при неизвестном статусе'
+        )
+        assert tenant.statuses['2'] == 'pending', (
+            'Убедитесь, что статус пропущенной работы запоминается'
+        )
+
+    def test_poll_tenant_skips_unchanged_response(self, monkeypatch,
+                                                  random_timestamp,
+                                                  current_timestamp):
+        import homework
+        from response_decoder import ResponseCache
+        from tenants import Tenant
+
+        requests_headers = []
+
+        def mock_response_get(*args, **kwargs):
+            requests_headers.append(kwargs['headers'])
+            not_modified = 'If-None-Match' in kwargs['headers']
+            response = MockResponseGET(
+                *args, random_timestamp=random_timestamp,
+                current_timestamp=current_timestamp,
+                http_status=(HTTPStatus.NOT_MODIFIED if not_modified
+                             else HTTPStatus.OK),
+                **kwargs
+            )
+            if len(requests_headers) > 1:
+                response.headers = {'ETag': '"v1"'}
+            response.json = lambda: {
+                'homeworks': [{'id': 1, 'homework_name': 'hw1',
+                               'status': 'reviewing'}],
+                'current_date': random_timestamp
+            }
+            return response
+
+        diffs = []
+        diff_homeworks = homework.diff_homeworks
+
+        def counting_diff(homeworks, statuses):
+            diffs.append(homeworks)
+            return diff_homeworks(homeworks, statuses)
+
+        monkeypatch.setattr(homework, 'response_cache', ResponseCache())
+        monkeypatch.setattr(homework, 'diff_homeworks', counting_diff)
+        monkeypatch.setattr(homework.api_session, 'get', mock_response_get)
+        bot = MockTelegramBot(token='1234:abcdefg')
+        tenant = Tenant('sometoken', 12345, current_timestamp)
+        for _ in range(3):
+            tenant.current_timestamp = current_timestamp
+            homework.poll_tenant(bot, tenant)
+        assert len(diffs) == 1, (
+            'Убедитесь, что неизменившийся ответ не сравнивается со статусами'
+        )
+        assert 'If-None-Match' not in requests_headers[1]
+        assert requests_headers[2]['If-None-Match'] == '"v1"', (
+            'Убедитесь, что запрос отправляется с условными заголовками'
+        )
+        assert tenant.current_timestamp == current_timestamp, (
+            'Убедитесь, что после ответа 304 from_date не меняется'
+        )
+
+    def test_get_429_opens_circuit(self, monkeypatch, random_timestamp,
+                                   current_timestamp):
+        import homework
+        from circuit_breaker import CircuitBreaker
+
+        calls = []
+
+        def mock_429_response_get(*args, **kwargs):
+            calls.append(1)
+            response = MockResponseGET(
+                *args, random_timestamp=random_timestamp,
+                current_timestamp=current_timestamp,
+                http_status=HTTPStatus.TOO_MANY_REQUESTS, **kwargs
+            )
+            response.headers = {'Retry-After': '120'}
+            return response
+
+        monkeypatch.setattr(homework, 'api_breaker', CircuitBreaker())
+        monkeypatch.setattr(homework.api_session, 'get', mock_429_response_get)
+        for expected in (homework.exceptions.TheAnswerIsNot200Error,
+                         homework.exceptions.CircuitOpenError):
+            try:
+                homework.get_api_answer(current_timestamp)
+            except expected:
+                pass
+            else:
+                assert False, (
+                    'Убедитесь, что после ответа 429 с Retry-After запросы '
+                    'к API приостанавливаются'
+                )
+        assert len(calls) == 1, (
+            'Убедитесь, что при разомкнутом предохранителе запрос не выполняется'
+        )
+
+    def test_limiter_timeout_does_not_stick_breaker(self, monkeypatch,
+                                                   current_timestamp):
+        import homework
+        from circuit_breaker import OPEN, AdaptiveLimiter, CircuitBreaker
+
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, recovery_time=60,
+                                 clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 100
+        limiter = AdaptiveLimiter(initial=1)
+        limiter.acquire()
+        monkeypatch.setattr(homework, 'api_breaker', breaker)
+        monkeypatch.setattr(homework, 'api_limiter', limiter)
+        monkeypatch.setattr(homework, 'FETCH_TIMEOUT', 0.05)
+        try:
+            homework.get_api_answer(current_timestamp)
+        except homework.exceptions.DeadlineExceededError:
+            pass
+        else:
+            assert False, 'Ожидание предела должно завершиться по сроку'
+        assert breaker.state == OPEN and breaker.allow(), (
+            'Убедитесь, что сбой ожидания предела не оставляет пробный '
+            'запрос предохранителя без исхода'
+        )
+
+    def test_poll_tenant_deduplicates_errors(self, monkeypatch,
+                                             random_timestamp,
+                                             current_timestamp):
+        import homework
+        from circuit_breaker import CircuitBreaker
+        from error_dedup import ErrorWindow
+        from tenants import Tenant
+
+        statuses = iter([HTTPStatus.BAD_GATEWAY,
+                         HTTPStatus.SERVICE_UNAVAILABLE,
+                         HTTPStatus.GATEWAY_TIMEOUT])
+
+        def mock_5xx_response_get(*args, **kwargs):
+            return MockResponseGET(
+                *args, random_timestamp=random_timestamp,
+                current_timestamp=current_timestamp,
+                http_status=next(statuses), **kwargs
+            )
+
+        now = [0]
+        monkeypatch.setattr(homework, 'api_breaker', CircuitBreaker())
+        monkeypatch.setattr(homework, 'error_window',
+                            ErrorWindow(window=600, clock=lambda: now[0]))
+        monkeypatch.setattr(homework.api_session, 'get', mock_5xx_response_get)
+        sent = []
+
+        class RecordingBot(MockTelegramBot):
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                sent.append(text)
+
+        bot = RecordingBot(token='1234:abcdefg')
+        tenant = Tenant('sometoken', 12345, current_timestamp)
+        homework.poll_tenant(bot, tenant)
+        homework.poll_tenant(bot, tenant)
+        assert len(sent) == 1, (
+            'Убедитесь, что похожие сбои в пределах окна не отправляются '
+            'повторно'
+        )
+        now[0] = 600
+        homework.poll_tenant(bot, tenant)
+        assert len(sent) == 2
+        assert sent[-1].endswith('Ещё 1 таких сбоев за 10 мин.'), (
+            'Убедитесь, что после окна приходит сводка о скрытых сбоях'
+        )
@@ -0,0 +1,105 @@
+import threading
+import time
+
+from circuit_breaker import (CLOSED, HALF_OPEN, OPEN, AdaptiveLimiter,
+                             CircuitBreaker, parse_retry_after)
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold_and_probes(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=3, recovery_time=60,
+                                 clock=lambda: now[0])
+        for _ in range(3):
+            assert breaker.allow()
+            breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow(), (
+            'Проверьте, что разомкнутый предохранитель не пропускает запросы'
+        )
+        now[0] = 61
+        assert breaker.allow(), 'После паузы должен пройти пробный запрос'
+        assert breaker.state == HALF_OPEN
+        assert not breaker.allow(), 'Пробный запрос должен быть один'
+        breaker.record_success()
+        assert breaker.state == CLOSED
+        assert breaker.allow()
+
+    def test_probe_without_outcome_is_rearmed(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, recovery_time=60,
+                                 clock=lambda: now[0], probe_timeout=30)
+        breaker.record_failure()
+        now[0] = 60
+        assert breaker.allow() and breaker.state == HALF_OPEN
+        now[0] = 89
+        assert not breaker.allow()
+        now[0] = 90
+        assert breaker.allow(), (
+            'Проверьте, что пробный запрос без исхода не блокирует '
+            'предохранитель навсегда'
+        )
+        assert breaker.state == HALF_OPEN
+
+    def test_retry_after_opens_immediately(self):
+        now = [100.0]
+        breaker = CircuitBreaker(failure_threshold=5, recovery_time=60,
+                                 clock=lambda: now[0])
+        breaker.record_failure(retry_after=120)
+        assert not breaker.allow(), (
+            'Проверьте, что ответ с Retry-After сразу размыкает цепь'
+        )
+        now[0] = 219
+        assert not breaker.allow()
+        now[0] = 220
+        assert breaker.allow()
+
+    def test_parse_retry_after(self):
+        assert parse_retry_after('120', 0) == 120
+        assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT',
+                                 1445412470) == 10
+        assert parse_retry_after(None, 0) is None
+        assert parse_retry_after('soon', 0) is None
+
+
+class TestAdaptiveLimiter:
+
+    def test_aimd(self):
+        limiter = AdaptiveLimiter(initial=4, minimum=1, maximum=5)
+        limiter.on_overload()
+        assert limiter.limit == 2, 'Перегрузка должна уменьшать предел вдвое'
+        for _ in range(10):
+            limiter.on_success()
+        assert 2 < limiter.limit <= 5, (
+            'Успешные запросы должны понемногу увеличивать предел'
+        )
+
+    def test_blocks_above_limit(self):
+        limiter = AdaptiveLimiter(initial=1)
+        limiter.acquire()
+        entered = threading.Event()
+
+        def second():
+            with limiter:
+                entered.set()
+
+        thread = threading.Thread(target=second)
+        thread.start()
+        time.sleep(0.05)
+        assert not entered.is_set(), (
+            'Проверьте, что запрос сверх предела ждёт освобождения'
+        )
+        limiter.release()
+        thread.join(1)
+        assert entered.is_set()
+
+    def test_acquire_gives_up_after_timeout(self):
+        limiter = AdaptiveLimiter(initial=1)
+        assert limiter.acquire(timeout=0.05)
+        started = time.monotonic()
+        assert limiter.acquire(timeout=0.05) is False, (
+            'Проверьте, что ожидание места ограничено таймаутом'
+        )
+        assert time.monotonic() - started < 0.5
+        assert limiter.inflight == 1
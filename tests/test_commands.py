@@ -0,0 +1,119 @@
+from types import SimpleNamespace
+
+from archive import TRANSITION, ResponseArchive
+from commands import CommandHandler, StatusCache
+from homework import HOMEWORK_STATUSES, homework_key
+from tenants import Tenant
+
+
+def make_update(update_id, chat_id, text):
+    message = SimpleNamespace(chat_id=chat_id, text=text)
+    return SimpleNamespace(update_id=update_id, effective_message=message)
+
+
+class FakeBot:
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_updates(self, **kwargs):
+        self.calls += 1
+        return []
+
+
+class TestStatusCache:
+
+    def test_merges_responses_while_fresh(self):
+        cache = StatusCache(ttl=100, max_size=10)
+        cache.update('t', [{'id': 1, 'status': 'reviewing'}], homework_key,
+                     now=0)
+        cache.update('t', [{'id': 2, 'status': 'reviewing'},
+                           {'id': 1, 'status': 'approved'}],
+                     homework_key, now=50)
+        checked, homeworks = cache.get('t', now=60)
+        assert checked == 50
+        assert [(hw['id'], hw['status']) for hw in homeworks] == [
+            (1, 'approved'), (2, 'reviewing')
+        ], 'Проверьте, что новые статусы заменяют старые'
+        assert cache.get('t', now=150) is None, (
+            'Проверьте, что устаревшая запись не возвращается'
+        )
+        assert len(cache) == 0
+
+    def test_evicts_least_recent(self):
+        cache = StatusCache(ttl=100, max_size=2)
+        for moment, key in enumerate(('a', 'b', 'a', 'c')):
+            cache.update(key, [], homework_key, now=moment)
+        assert cache.get('b', now=5) is None, (
+            'Проверьте, что вытесняется давно не обновлявшаяся запись'
+        )
+        assert cache.get('a', now=5) is not None
+        assert cache.get('c', now=5) is not None
+
+
+class TestCommandHandler:
+
+    def make_handler(self, history=None):
+        tenant = Tenant('token', 123)
+        cache = StatusCache(ttl=100, max_size=10, clock=lambda: 10)
+        replies = []
+        handler = CommandHandler(
+            FakeBot(), [tenant], cache,
+            lambda chat_id, text: replies.append((chat_id, text)),
+            HOMEWORK_STATUSES, history=history
+        )
+        return handler, tenant, cache, replies
+
+    def test_status_answers_from_cache(self):
+        handler, tenant, cache, replies = self.make_handler()
+        handler.handle_updates([make_update(1, 123, '/status')])
+        assert 'Свежих данных нет' in replies[0][1]
+        cache.update(tenant.key, [{'id': 1, 'homework_name': 'hw1',
+                                   'status': 'approved'}], homework_key)
+        handler.handle_updates([make_update(2, 123, '/status@bot'),
+                                make_update(3, 999, '/status'),
+                                make_update(4, 123, 'привет')])
+        assert len(replies) == 2, (
+            'Проверьте, что бот отвечает только на команды своих чатов'
+        )
+        assert replies[1] == (
+            123, f'Проверено 01.01 00:00 UTC.\n'
+                 f'hw1: {HOMEWORK_STATUSES["approved"]}'
+        )
+        assert handler.offset == 5, (
+            'Проверьте, что offset сдвигается за последнее обновление'
+        )
+        assert handler.bot.calls == 0
+
+    def test_history_reads_archive(self, tmp_path):
+        history = ResponseArchive(str(tmp_path), clock=lambda: 0)
+        handler, tenant, cache, replies = self.make_handler(history)
+        for status in ('reviewing', 'rejected', 'reviewing', 'approved'):
+            history.append(tenant.key, TRANSITION, {
+                'homework': '1', 'homework_name': 'hw1', 'status': status,
+                'date_updated': '2022-04-10T12:00:00Z',
+            })
+        handler.handle_updates([make_update(1, 123, '/history 2')])
+        history.close()
+        assert replies[0][1].splitlines() == [
+            f'2022-04-10T12:00:00Z hw1: {HOMEWORK_STATUSES["approved"]}',
+            f'2022-04-10T12:00:00Z hw1: {HOMEWORK_STATUSES["reviewing"]}',
+        ], 'Проверьте, что /history показывает последние смены статуса'
+
+    def test_failed_update_does_not_stop_others(self):
+        handler, tenant, cache, replies = self.make_handler()
+
+        def reply(chat_id, text):
+            if not replies:
+                replies.append(None)
+                raise RuntimeError('сбой отправки')
+            replies.append((chat_id, text))
+
+        handler.reply = reply
+        handler.handle_updates([make_update(1, 123, '/status'),
+                                make_update(2, 123, '/status')])
+        assert len(replies) == 2 and replies[1][0] == 123, (
+            'Проверьте, что сбой ответа на одно обновление не мешает '
+            'остальным'
+        )
+        assert handler.offset == 3
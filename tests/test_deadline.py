@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+import pytest
+
+from clock import VirtualClock
+from deadline import (Deadline, check_deadline, current_deadline,
+                      get_deadline, stage_deadline)
+from engine import PollingEngine
+from exceptions import DeadlineExceededError
+from response_decoder import read_body
+from tenants import Tenant
+
+
+class SlowResponse:
+
+    def __init__(self, clock, chunks, delay):
+        self.clock = clock
+        self.chunks = chunks
+        self.delay = delay
+        self.headers = {}
+        self.closed = False
+
+    def iter_content(self, chunk_size=1):
+        for chunk in self.chunks:
+            self.clock.advance(self.delay)
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+class TestDeadline:
+
+    def test_stage_is_bounded_by_parent(self):
+        clock = VirtualClock()
+        parent = Deadline(10, clock.monotonic)
+        clock.advance(8)
+        stage = parent.stage(5)
+        assert stage.remaining() == pytest.approx(2), (
+            'Проверьте, что срок этапа не позже общего срока'
+        )
+        assert parent.stage(1).remaining() == pytest.approx(1), (
+            'Проверьте, что срок этапа не дольше его таймаута'
+        )
+
+    def test_clip_limits_socket_timeout(self):
+        clock = VirtualClock()
+        deadline = Deadline(3, clock.monotonic)
+        assert deadline.clip(30) == pytest.approx(3), (
+            'Проверьте, что таймаут урезается до оставшегося срока'
+        )
+        clock.advance(5)
+        assert deadline.clip(30) > 0, (
+            'Проверьте, что урезанный таймаут остаётся положительным'
+        )
+
+    def test_check_raises_after_expiry(self):
+        clock = VirtualClock()
+        deadline = Deadline(1, clock.monotonic)
+        deadline.check('fetch')
+        clock.advance(1)
+        with pytest.raises(DeadlineExceededError):
+            deadline.check('fetch')
+
+    def test_helpers_use_context_deadline(self):
+        clock = VirtualClock()
+        assert get_deadline() is None
+        check_deadline('parse_status')
+        token = current_deadline.set(Deadline(2, clock.monotonic))
+        try:
+            assert stage_deadline('send', 10).remaining() == pytest.approx(2)
+            clock.advance(3)
+            with pytest.raises(DeadlineExceededError):
+                check_deadline('parse_status')
+            with pytest.raises(DeadlineExceededError):
+                stage_deadline('send', 10)
+        finally:
+            current_deadline.reset(token)
+
+    def test_read_body_stops_at_deadline(self):
+        clock = VirtualClock()
+        body = json.dumps({'homeworks': []}).encode()
+        response = SlowResponse(clock, [body[:5], body[5:]], delay=2)
+        with pytest.raises(DeadlineExceededError):
+            read_body(response, deadline=Deadline(1, clock.monotonic))
+        assert response.closed, (
+            'Проверьте, что соединение закрывается по истечении срока'
+        )
+
+    def test_engine_sets_poll_deadline(self):
+        clock = VirtualClock()
+        seen = []
+
+        def poll_tenant(tenant):
+            seen.append(get_deadline().remaining())
+
+        engine = PollingEngine(poll_tenant, [Tenant('token', 1)],
+                               retry_time=0, clock=clock, deadline=30,
+                               lag_interval=0)
+        asyncio.run(engine.poll_round())
+        assert seen == [pytest.approx(30)], (
+            'Проверьте, что движок задаёт срок каждому циклу опроса'
+        )
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+import clock
+
+from engine import PollingEngine
+from tenants import Tenant, get_current_tenant
+
+
+class TestPollingEngine:
+
+    def test_poll_runs_in_tenant_context(self):
+        seen = []
+
+        def poll_tenant(tenant):
+            seen.append((tenant, get_current_tenant()))
+
+        tenants = [Tenant('token1', 1), Tenant('token2', 2)]
+        engine = PollingEngine(poll_tenant, tenants, retry_time=0,
+                               concurrency=1)
+
+        async def poll_all():
+            engine._semaphore = asyncio.Semaphore(engine.concurrency)
+            await asyncio.gather(*(engine.poll(t) for t in tenants))
+
+        asyncio.run(poll_all())
+        assert len(seen) == 2, (
+            'Проверьте, что движок опрашивает каждого подписчика'
+        )
+        for tenant, context_tenant in seen:
+            assert tenant is context_tenant, (
+                'Проверьте, что опрос выполняется в контексте подписчика'
+            )
+        assert get_current_tenant() is None, (
+            'Контекст подписчика не должен протекать в вызывающий код'
+        )
+
+    def test_simulate_runs_in_virtual_time(self):
+        virtual_clock = clock.VirtualClock(start=1000)
+        polls = []
+
+        def poll_tenant(tenant):
+            polls.append((get_current_tenant(), virtual_clock.monotonic()))
+            if tenant.chat_id == 2:
+                raise ValueError('сбой опроса')
+
+        tenants = [Tenant('token1', 1), Tenant('token2', 2)]
+        engine = PollingEngine(poll_tenant, tenants, retry_time=600,
+                               clock=virtual_clock)
+        engine.simulate(3600)
+        assert virtual_clock.monotonic() == 3600, (
+            'Проверьте, что simulate переводит часы на весь период'
+        )
+        for tenant in tenants:
+            moments = [moment for polled, moment in polls
+                       if polled is tenant]
+            assert len(moments) == 6, (
+                'Проверьте, что simulate опрашивает подписчика раз в '
+                'retry_time, несмотря на сбои опроса'
+            )
+        assert engine.stats.polls == 12
+
+    def test_tenant_headers(self):
+        tenant = Tenant('sometoken', 12345)
+        assert tenant.headers == {'Authorization': 'OAuth sometoken'}, (
+            'Проверьте заголовок авторизации подписчика'
+        )
+
+    def test_sigterm_stops_run(self):
+        engine = PollingEngine(lambda tenant: [], [Tenant('token', 1)],
+                               retry_time=60, lag_interval=0)
+        previous = signal.signal(signal.SIGTERM,
+                                 lambda *args: engine.stop())
+        timer = threading.Timer(
+            0.2, os.kill, (os.getpid(), signal.SIGTERM)
+        )
+        timer.start()
+        started = time.monotonic()
+        try:
+            with pytest.raises(asyncio.CancelledError):
+                clock.run(engine.run())
+        finally:
+            timer.cancel()
+            signal.signal(signal.SIGTERM, previous)
+        assert time.monotonic() - started < 5, (
+            'Проверьте, что SIGTERM завершает run штатно'
+        )
@@ -0,0 +1,90 @@
+import asyncio
+
+from error_dedup import ErrorWindow, error_signature, normalize_error
+from exceptions import RequestExceptionError, TheAnswerIsNot200Error
+
+
+class TestErrorDedup:
+
+    def test_volatile_details_share_signature(self):
+        first = TheAnswerIsNot200Error(
+            'Эндпоинт недоступен.\nСтатус ответа: 502.\n'
+            "Параметры запроса: {'params': {'from_date': 1650000000}}.\n"
+        )
+        second = TheAnswerIsNot200Error(
+            'Эндпоинт недоступен.\nСтатус ответа: 503.\n'
+            "Параметры запроса: {'params': {'from_date': 1650000600}}.\n"
+        )
+        assert error_signature(first) == error_signature(second), (
+            'Проверьте, что параметры запроса и точный код ответа '
+            'не влияют на отпечаток сбоя'
+        )
+        assert 'TheAnswerIsNot200Error' in normalize_error(first)
+        other = RequestExceptionError(str(first))
+        assert error_signature(other) != error_signature(first), (
+            'Проверьте, что класс исключения входит в отпечаток'
+        )
+
+    def test_window_notifies_once_and_summarizes(self):
+        window = ErrorWindow(window=600, max_size=10)
+        assert window.admit('сбой', now=0) == (True, 0)
+        assert window.admit('сбой', now=100) == (False, 0)
+        assert window.admit('сбой', now=599) == (False, 0)
+        notify, suppressed = window.admit('сбой', now=600)
+        assert (notify, suppressed) == (True, 2), (
+            'Проверьте, что после окна приходит уведомление '
+            'с числом скрытых повторов'
+        )
+        assert window.summary(suppressed) == '\nЕщё 2 таких сбоев за 10 мин.'
+        assert window.summary(0) == ''
+
+    def test_window_evicts_least_recent(self):
+        window = ErrorWindow(window=600, max_size=2)
+        window.admit('a', now=0)
+        window.admit('b', now=1)
+        window.admit('a', now=2)
+        window.admit('c', now=3)
+        assert len(window) == 2
+        assert window.admit('a', now=4) == (False, 0)
+        assert window.admit('b', now=5) == (True, 0), (
+            'Проверьте, что вытесняется давно не встречавшийся сбой'
+        )
+
+    def test_flush_reports_expired_windows(self):
+        window = ErrorWindow(window=600, max_size=10)
+        window.admit('a', now=0, detail='сбой a')
+        window.admit('a', now=100)
+        window.admit('b', now=50, detail='сбой b')
+        window.admit('c', now=500, detail='сбой c')
+        window.admit('c', now=550)
+        assert window.flush(now=599) == []
+        assert window.flush(now=650) == [('a', 1, 'сбой a')], (
+            'Проверьте, что flush сообщает о повторах в истёкших окнах'
+        )
+        assert len(window) == 1
+        assert window.admit('a', now=660) == (True, 0), (
+            'Проверьте, что сброшенные повторы не попадают в сводку ещё раз'
+        )
+
+    def test_run_flushes_periodically(self):
+        now = [0]
+        window = ErrorWindow(window=600, clock=lambda: now[0])
+        window.admit('a', detail='сбой')
+        window.admit('a')
+        reports = []
+
+        def report(key, suppressed, detail):
+            reports.append((key, suppressed, detail))
+            raise RuntimeError('сбой отправки')
+
+        async def scenario():
+            task = asyncio.ensure_future(window.run(report, interval=0.01))
+            await asyncio.sleep(0.03)
+            now[0] = 600
+            await asyncio.sleep(0.03)
+            task.cancel()
+
+        asyncio.run(scenario())
+        assert reports == [('a', 1, 'сбой')], (
+            'Проверьте, что run периодически отправляет сводки'
+        )
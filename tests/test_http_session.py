@@ -0,0 +1,85 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from http_session import PracticumSession
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{"homeworks": [], "current_date": 0}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPracticumSession:
+
+    def test_connections_are_reused(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = f'http://127.0.0.1:{server.server_port}/'
+        session = PracticumSession(pool_size=2)
+        try:
+            for _ in range(5):
+                response = session.get(url, params={'from_date': 0})
+                assert response.json()['current_date'] == 0
+            stats = session.stats()
+        finally:
+            session.close()
+            server.shutdown()
+            server.server_close()
+        assert stats['requests'] == 5, (
+            'Проверьте, что сессия считает выполненные запросы'
+        )
+        assert stats['new_connections'] == 1, (
+            'Проверьте, что сессия переиспользует keep-alive соединение'
+        )
+        assert stats['reused_connections'] == 4
+
+    def test_retries_fit_into_deadline(self):
+        import socket
+        import time
+
+        from deadline import Deadline
+
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(8)
+        accepted = []
+
+        def accept():
+            while True:
+                try:
+                    connection, _ = listener.accept()
+                except OSError:
+                    return
+                accepted.append(connection)
+
+        threading.Thread(target=accept, daemon=True).start()
+        url = f'http://127.0.0.1:{listener.getsockname()[1]}/'
+        session = PracticumSession(read_timeout=30, retries=2,
+                                   backoff_factor=0.05)
+        started = time.monotonic()
+        try:
+            with pytest.raises(requests.Timeout):
+                session.get(url, deadline=Deadline(0.5))
+            elapsed = time.monotonic() - started
+        finally:
+            session.close()
+            listener.close()
+            for connection in accepted:
+                connection.close()
+        assert elapsed < 1, (
+            'Проверьте, что повторы запроса укладываются в срок опроса'
+        )
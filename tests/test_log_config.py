@@ -0,0 +1,50 @@
+import json
+import logging
+
+from log_config import setup_logging
+from tenants import Tenant, current_tenant
+
+
+class TestSetupLogging:
+
+    def test_json_lines_with_tenant_context(self, tmp_path):
+        root = logging.getLogger()
+        saved_handlers, saved_level = list(root.handlers), root.level
+        path = tmp_path / 'main.log'
+        path.write_text('', encoding='utf-8')
+        listener = setup_logging(str(path))
+        token = current_tenant.set(Tenant('token', 12345))
+        try:
+            logging.getLogger('homework').info('Опрос %s', 'завершён')
+        finally:
+            current_tenant.reset(token)
+            listener.stop()
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            for handler in saved_handlers:
+                root.addHandler(handler)
+            root.setLevel(saved_level)
+        lines = path.read_text(encoding='utf-8').splitlines()
+        entry = json.loads(lines[-1])
+        assert entry['message'] == 'Опрос завершён', (
+            'Проверьте, что сообщение форматируется в записи журнала'
+        )
+        assert entry['tenant'] == 12345, (
+            'Проверьте, что в запись журнала попадает подписчик из контекста'
+        )
+
+    def test_log_file_is_appended(self, tmp_path):
+        path = tmp_path / 'main.log'
+        path.write_text('старая запись\n', encoding='utf-8')
+        root = logging.getLogger()
+        saved_handlers, saved_level = list(root.handlers), root.level
+        listener = setup_logging(str(path))
+        listener.stop()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in saved_handlers:
+            root.addHandler(handler)
+        root.setLevel(saved_level)
+        assert path.read_text(encoding='utf-8').startswith('старая запись'), (
+            'Проверьте, что журнал не затирается при перезапуске'
+        )
@@ -0,0 +1,55 @@
+import urllib.request
+
+import exceptions
+from metrics import (MetricsRegistry, format_labels, start_metrics_server,
+                     timed)
+import metrics
+
+
+class TestMetrics:
+
+    def test_timed_counts_latency_and_exceptions(self):
+        @timed('test_stage')
+        def failing():
+            raise exceptions.TheAnswerIsNot200Error('500')
+
+        before = metrics.stage_errors.value(
+            stage='test_stage', exception='TheAnswerIsNot200Error'
+        )
+        try:
+            failing()
+        except exceptions.TheAnswerIsNot200Error:
+            pass
+        assert metrics.stage_errors.value(
+            stage='test_stage', exception='TheAnswerIsNot200Error'
+        ) == before + 1, (
+            'Проверьте, что исключения считаются по классу и этапу'
+        )
+        assert metrics.stage_latency.count(stage='test_stage') >= 1, (
+            'Проверьте, что длительность этапа попадает в гистограмму'
+        )
+
+    def test_label_values_are_escaped(self):
+        assert format_labels((('path', 'C:\\tmp\n"x"'),)) == (
+            '{path="C:\\\\tmp\\n\\"x\\""}'
+        ), 'Проверьте экранирование \\, перевода строки и кавычки в метках'
+
+    def test_metrics_endpoint(self):
+        registry = MetricsRegistry()
+        registry.counter('test_total', 'Тестовый счётчик.').inc(kind='a')
+        registry.gauge('test_depth', 'Тестовая очередь.', lambda: 7)
+        histogram = registry.histogram('test_seconds', 'Тест.', (0.1, 1))
+        histogram.observe(0.5)
+        server = start_metrics_server(0, metrics_registry=registry)
+        try:
+            url = f'http://127.0.0.1:{server.server_port}/metrics'
+            with urllib.request.urlopen(url) as response:
+                body = response.read().decode('utf-8')
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert 'test_total{kind="a"} 1' in body
+        assert 'test_depth 7' in body
+        assert 'test_seconds_bucket{le="0.1"} 0' in body
+        assert 'test_seconds_bucket{le="1"} 1' in body
+        assert 'test_seconds_count 1' in body
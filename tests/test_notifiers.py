@@ -0,0 +1,316 @@
+import socket
+import threading
+import time
+from concurrent.futures import wait
+from email import message_from_bytes
+
+import pytest
+import telegram
+
+import exceptions
+from benchmarks.stub_servers import (WebhookStubHandler, start_server,
+                                     start_smtp_server)
+from notifiers import (Notifier, NotifierPool, SmtpNotifier, WebhookNotifier,
+                       notify_errors, notify_latency)
+from tenants import Tenant, current_tenant
+
+
+def start_answer_once_server():
+    """Keep-alive сервер, отвечающий только на первый POST.
+
+    Возвращает слушающий сокет и список принятых запросов.
+    """
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(2)
+    posts = []
+
+    def serve(connection):
+        with connection:
+            # Тело запроса без перевода строки: POST следующего запроса
+            # может оказаться в одной строке с ним.
+            for line in connection.makefile('rb'):
+                if b'POST /' not in line:
+                    continue
+                posts.append(line)
+                if len(posts) == 1:
+                    connection.sendall(b'HTTP/1.1 200 OK\r\n'
+                                       b'Content-Length: 0\r\n\r\n')
+
+    def accept():
+        while True:
+            try:
+                connection, _ = listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=serve, args=(connection,),
+                             daemon=True).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+    return listener, posts
+
+
+class RecordingNotifier(Notifier):
+
+    backend = 'recording'
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def send(self, message, event=None):
+        self.messages.append((message, event))
+
+
+class TestNotifiers:
+
+    def test_webhook_and_smtp_backends(self):
+        webhook = start_server(WebhookStubHandler, messages=[])
+        smtp = start_smtp_server()
+        try:
+            before = notify_latency.count(backend='smtp')
+            WebhookNotifier(webhook.url, timeout=5).deliver(
+                'Работа проверена', {'chat_id': 1, 'status': 'approved'}
+            )
+            SmtpNotifier('127.0.0.1', smtp.server_address[1],
+                         'bot@localhost', 'student@localhost',
+                         timeout=5).deliver('Работа проверена')
+        finally:
+            webhook.shutdown()
+            smtp.shutdown()
+        assert webhook.RequestHandlerClass.messages == [{
+            'chat_id': 1, 'status': 'approved', 'text': 'Работа проверена'
+        }], 'Проверьте, что вебхук получает текст и данные события'
+        email = message_from_bytes(smtp.messages[0])
+        assert email['To'] == 'student@localhost'
+        assert email.get_payload(decode=True).decode().strip() == (
+            'Работа проверена'
+        )
+        assert notify_latency.count(backend='smtp') == before + 1, (
+            'Проверьте, что длительность доставки учитывается по способу'
+        )
+
+    def test_slow_sink_does_not_delay_others(self):
+        slow = start_server(WebhookStubHandler, messages=[], latency=2)
+        smtp = start_smtp_server()
+        pool = NotifierPool(workers=4)
+        errors = notify_errors.value(backend='webhook')
+        try:
+            started = time.perf_counter()
+            futures = pool.fan_out([
+                WebhookNotifier(slow.url, timeout=0.5),
+                SmtpNotifier('127.0.0.1', smtp.server_address[1],
+                             'bot@localhost', 'student@localhost',
+                             timeout=5),
+            ], 'Работа проверена')
+            futures[1].result(timeout=5)
+            fast = time.perf_counter() - started
+            wait(futures, timeout=5)
+        finally:
+            pool.close()
+            slow.shutdown()
+            smtp.shutdown()
+        assert fast < 0.5, (
+            'Проверьте, что медленный получатель не задерживает остальных'
+        )
+        with pytest.raises(exceptions.NotifierError):
+            futures[0].result()
+        assert notify_errors.value(backend='webhook') == errors + 1
+
+    def test_sinks_follow_recorded_transitions(self, monkeypatch):
+        import homework
+
+        sent = []
+
+        class FlakyBot:
+            fail = True
+
+            def send_message(self, chat_id, text, **kwargs):
+                if self.fail:
+                    raise telegram.TelegramError('недоступен')
+                sent.append((chat_id, text))
+
+        pool = NotifierPool(workers=2)
+        monkeypatch.setattr(homework, 'notifier_pool', pool)
+        tenant = Tenant('token', 123)
+        tenant.sinks = (RecordingNotifier(), RecordingNotifier())
+        homeworks = [{'id': 1, 'homework_name': 'hw1', 'status': 'approved'}]
+        bot = FlakyBot()
+        token = current_tenant.set(tenant)
+        try:
+            with pytest.raises(exceptions.TelegramSendMessageError):
+                homework.notify_changes(bot, tenant, homeworks)
+            bot.fail = False
+            homework.notify_changes(bot, tenant, homeworks)
+        finally:
+            current_tenant.reset(token)
+            pool.close()
+        message = homework.parse_status(homeworks[0])
+        assert sent == [(123, message)]
+        for sink in tenant.sinks:
+            assert sink.messages == [(message, {
+                'chat_id': 123, 'homework': '1', 'status': 'approved'
+            })], (
+                'Проверьте, что способы доставки получают уведомление один '
+                'раз и только после записи перехода'
+            )
+
+    def test_error_messages_never_carry_token(self, monkeypatch):
+        import homework
+        import requests
+        from circuit_breaker import CircuitBreaker
+        from error_dedup import ErrorWindow
+
+        def failing_get(*args, **kwargs):
+            raise requests.ConnectionError('соединение сброшено')
+
+        sent = []
+
+        class RecordingBot:
+            def send_message(self, chat_id, text, **kwargs):
+                sent.append(text)
+
+        pool = NotifierPool(workers=2)
+        monkeypatch.setattr(homework, 'notifier_pool', pool)
+        monkeypatch.setattr(homework, 'api_breaker', CircuitBreaker())
+        monkeypatch.setattr(homework.api_session, 'get', failing_get)
+        monkeypatch.setattr(homework, 'error_window',
+                            ErrorWindow(clock=lambda: 0))
+        tenant = Tenant('SECRET-TOKEN', 123, 100)
+        sink = RecordingNotifier()
+        tenant.sinks = (sink,)
+        token = current_tenant.set(tenant)
+        try:
+            homework.poll_tenant(RecordingBot(), tenant)
+        finally:
+            current_tenant.reset(token)
+            pool.close()
+        assert sent and 'соединение сброшено' in sent[0]
+        assert not any('SECRET-TOKEN' in text for text in sent), (
+            'Проверьте, что токен не попадает в текст ошибки'
+        )
+        assert sink.messages == [], (
+            'Проверьте, что сообщения о сбоях не уходят в способы доставки'
+        )
+
+    def test_notifier_requires_send(self):
+        with pytest.raises(TypeError):
+            Notifier()
+
+    def test_build_sinks_from_record(self, monkeypatch):
+        import homework
+
+        monkeypatch.setattr(homework, 'SMTP_HOST', None)
+        sinks = homework.build_sinks({'webhook': 'http://localhost/hook',
+                                      'email': 'student@localhost'})
+        assert [sink.backend for sink in sinks] == ['webhook']
+        monkeypatch.setattr(homework, 'SMTP_HOST', 'localhost')
+        sinks = homework.build_sinks({'email': 'student@localhost'})
+        assert [sink.backend for sink in sinks] == ['smtp']
+
+    def test_dripping_webhook_is_cut_by_wall_clock(self):
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+
+        def drip():
+            connection, _ = listener.accept()
+            connection.recv(65536)
+            try:
+                for byte in b'HTTP/1.1 200 OK\r\nX-Slow: ' + b'x' * 50:
+                    connection.sendall(bytes([byte]))
+                    time.sleep(0.1)
+            except OSError:
+                pass
+            connection.close()
+
+        threading.Thread(target=drip, daemon=True).start()
+        url = f'http://127.0.0.1:{listener.getsockname()[1]}/hook'
+        started = time.perf_counter()
+        with pytest.raises(exceptions.NotifierTimeoutError):
+            WebhookNotifier(url, timeout=0.5).deliver('текст')
+        listener.close()
+        assert time.perf_counter() - started < 1.5, (
+            'Проверьте, что таймаут ограничивает доставку целиком'
+        )
+
+    def test_aborted_reused_connection_is_not_retried(self):
+        listener, posts = start_answer_once_server()
+        url = f'http://127.0.0.1:{listener.getsockname()[1]}/hook'
+        notifier = WebhookNotifier(url, timeout=0.5)
+        notifier.deliver('первое')
+        started = time.perf_counter()
+        with pytest.raises(exceptions.NotifierTimeoutError):
+            notifier.deliver('второе')
+        elapsed = time.perf_counter() - started
+        time.sleep(0.2)
+        listener.close()
+        assert elapsed < 1.5, (
+            'Проверьте, что таймаут ограничивает доставку по '
+            'переиспользованному соединению'
+        )
+        assert len(posts) == 2, (
+            'Проверьте, что прерванная доставка не повторяется '
+            'по новому соединению'
+        )
+
+    def test_timed_out_sinks_do_not_take_shared_workers(self):
+        release = threading.Event()
+
+        class HangingNotifier(RecordingNotifier):
+            backend = 'hanging'
+            abortable = True
+
+            def send(self, message, event=None):
+                release.wait(5)
+                raise OSError('прервано')
+
+            def abort(self):
+                release.set()
+
+        pool = NotifierPool(workers=1, slow_workers=1)
+        hanging = HangingNotifier()
+        hanging.timeout = 0.1
+        fast = RecordingNotifier()
+        try:
+            first = pool.fan_out([hanging], 'первое')[0]
+            with pytest.raises(exceptions.NotifierTimeoutError):
+                first.result(timeout=2)
+            release.clear()
+            futures = pool.fan_out([hanging, fast], 'второе')
+            futures[1].result(timeout=0.05)
+        finally:
+            release.set()
+            pool.close()
+        assert fast.messages == [('второе', None)], (
+            'Проверьте, что получатель с таймаутом обслуживается отдельно '
+            'и не задерживает остальных'
+        )
+
+    def test_sink_queue_is_bounded(self):
+        release = threading.Event()
+        started = threading.Event()
+
+        class BlockedNotifier(RecordingNotifier):
+            def send(self, message, event=None):
+                started.set()
+                release.wait(2)
+                super().send(message, event)
+
+        pool = NotifierPool(workers=1, max_pending=1)
+        sink = BlockedNotifier()
+        try:
+            futures = pool.fan_out([sink], '1')
+            started.wait(1)
+            futures += [pool.fan_out([sink], text)[0] for text in ('2', '3')]
+            with pytest.raises(exceptions.NotifierError):
+                futures[1].result(timeout=1)
+            release.set()
+            wait(futures, timeout=2)
+        finally:
+            release.set()
+            pool.close()
+        assert [text for text, _ in sink.messages] == ['1', '3'], (
+            'Проверьте, что переполненная очередь вытесняет старые '
+            'уведомления'
+        )
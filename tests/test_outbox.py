@@ -0,0 +1,215 @@
+import asyncio
+
+import exceptions
+from journal import NotificationJournal
+from outbox import TelegramOutbox, dead_letters, merge_messages
+from sharding import shard_tenants
+from tenants import Tenant
+
+
+class TestTelegramOutbox:
+
+    def run_outbox(self, outbox, submit, duration):
+        async def scenario():
+            task = asyncio.ensure_future(outbox.run())
+            await asyncio.sleep(0)
+            submit()
+            await asyncio.sleep(duration)
+            task.cancel()
+
+        asyncio.run(scenario())
+
+    def test_messages_to_one_chat_are_merged(self):
+        sent = []
+        outbox = TelegramOutbox(lambda chat, text: sent.append((chat, text)),
+                                merge_window=0.05, workers=2)
+
+        def submit():
+            outbox.submit(1, 'первое')
+            outbox.submit(1, 'второе')
+            outbox.submit(2, 'третье')
+
+        self.run_outbox(outbox, submit, 0.2)
+        assert sorted(sent) == [('1', 'первое\n\nвторое'), ('2', 'третье')], (
+            'Проверьте, что сообщения одному чату склеиваются'
+        )
+
+    def test_failed_send_is_retried(self):
+        attempts = []
+
+        def send(chat_id, text):
+            attempts.append(text)
+            if len(attempts) == 1:
+                raise exceptions.TelegramSendMessageError('timeout')
+
+        outbox = TelegramOutbox(send, chat_rate=100, merge_window=0,
+                                backoff=0.01, workers=1)
+        self.run_outbox(outbox, lambda: outbox.submit(1, 'текст'), 0.2)
+        assert attempts == ['текст', 'текст'], (
+            'Проверьте, что ошибка отправки повторяется из очереди'
+        )
+
+    def test_unexpected_error_keeps_worker_running(self):
+        sent = []
+
+        def send(chat_id, text):
+            if text == 'сбой':
+                raise OSError('connection reset')
+            sent.append(text)
+
+        outbox = TelegramOutbox(send, chat_rate=100, merge_window=0,
+                                workers=1)
+        outbox.submit(1, 'сбой')
+
+        def submit():
+            outbox.submit(2, 'после сбоя')
+
+        self.run_outbox(outbox, submit, 0.1)
+        assert sent == ['после сбоя'], (
+            'Проверьте, что неожиданная ошибка не останавливает отправку '
+            'и что сообщения до запуска не теряются'
+        )
+
+    def test_merge_respects_telegram_limit(self):
+        chunks = merge_messages([('a' * 3000, ('1', 'approved')),
+                                 ('b' * 3000, ('2', 'approved')),
+                                 ('c', None)])
+        assert [keys for _, keys in chunks] == [
+            [('1', 'approved')], [('2', 'approved')]
+        ]
+        assert all(len(text) <= 4096 for text, _ in chunks)
+
+    def test_undelivered_notifications_are_replayed(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        journal = NotificationJournal(path)
+
+        def failing_send(chat_id, text):
+            raise exceptions.TelegramSendMessageError('unavailable')
+
+        outbox = TelegramOutbox(failing_send, chat_rate=100, merge_window=0,
+                                max_retries=1, backoff=0, workers=1,
+                                journal=journal, replay_interval=0.05)
+        self.run_outbox(
+            outbox, lambda: outbox.submit(1, 'текст', ('hw1', 'approved')),
+            0.1
+        )
+        assert len(journal) == 1, (
+            'Проверьте, что недоставленное уведомление остаётся в журнале'
+        )
+        journal.close()
+
+        sent = []
+        journal = NotificationJournal(path)
+        outbox = TelegramOutbox(lambda chat, text: sent.append((chat, text)),
+                                chat_rate=100, merge_window=0, workers=1,
+                                journal=journal)
+        journal.add(1, 'hw1', 'approved', 'текст')
+        self.run_outbox(outbox, lambda: None, 0.1)
+        assert sent == [('1', 'текст')], (
+            'Проверьте, что после восстановления журнал отправляется '
+            'без повторов'
+        )
+        assert len(journal) == 0, (
+            'Проверьте, что доставленное уведомление удаляется из журнала'
+        )
+        journal.close()
+
+    def test_permanent_failures_are_dead_lettered(self, tmp_path):
+        journal = NotificationJournal(str(tmp_path / 'state.sqlite3'),
+                                      max_attempts=2)
+        attempts = []
+
+        def blocked_send(chat_id, text):
+            attempts.append(text)
+            raise exceptions.TelegramSendMessageError('bot was blocked')
+
+        outbox = TelegramOutbox(blocked_send, chat_rate=100, merge_window=0,
+                                max_retries=1, backoff=0, workers=1,
+                                journal=journal, replay_interval=0.02)
+        dead = dead_letters.value()
+        self.run_outbox(
+            outbox, lambda: outbox.submit(1, 'текст', ('hw1', 'approved')),
+            0.2
+        )
+        assert len(attempts) == 2, (
+            'Проверьте, что журнал перестаёт повторять уведомление '
+            'после max_attempts неудач'
+        )
+        assert len(journal) == 0 and journal.pending() == []
+        assert journal.dead_letters() == [
+            ('1', 'hw1', 'approved', 'текст', 2, 'bot was blocked')
+        ], 'Проверьте, что недоставляемая запись хранит последнюю ошибку'
+        assert dead_letters.value() == dead + 1
+        journal.close()
+
+    def test_replay_during_ack_does_not_resend(self):
+        import time
+
+        class SlowAckJournal:
+            def __init__(self):
+                self.rows = {}
+
+            def add(self, chat_id, homework, status, message):
+                self.rows[(str(chat_id), homework, status)] = message
+
+            def pending(self):
+                return [key + (message,) for key, message
+                        in list(self.rows.items())]
+
+            def ack(self, chat_id, keys):
+                time.sleep(0.1)
+                for key in keys:
+                    self.rows.pop((chat_id,) + tuple(key), None)
+
+        sent = []
+        journal = SlowAckJournal()
+        outbox = TelegramOutbox(lambda chat, text: sent.append(text),
+                                chat_rate=100, merge_window=0, workers=1,
+                                journal=journal, replay_interval=0.02)
+        self.run_outbox(
+            outbox, lambda: outbox.submit(1, 'текст', ('hw1', 'approved')),
+            0.3
+        )
+        assert sent == ['текст'], (
+            'Проверьте, что повтор журнала не отправляет сообщение, '
+            'подтверждение которого ещё записывается'
+        )
+
+    def test_journal_shards_do_not_share_records(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        first = NotificationJournal(path, shard=0)
+        second = NotificationJournal(path, shard=1)
+        third = NotificationJournal(path, shard=2)
+        first.add(1, 'hw1', 'approved', 'первый')
+        third.add(3, 'hw3', 'approved', 'третий')
+        assert [row[0] for row in first.pending()] == ['1']
+        assert second.pending() == [], (
+            'Проверьте, что процесс не повторяет чужие уведомления'
+        )
+        first.reassign(2)
+        assert [row[0] for row in first.pending()] == ['1', '3'], (
+            'Проверьте, что записи лишних процессов передаются оставшимся'
+        )
+        for journal in (first, second, third):
+            journal.close()
+
+    def test_reassign_follows_hash_ring(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        tenants = [Tenant(f'token-{index}', index) for index in range(20)]
+        journal = NotificationJournal(path)
+        for tenant in tenants:
+            journal.add(tenant.chat_id, 'hw', 'approved', 'текст')
+        journal.add(99, 'hw', 'approved', 'без подписчика')
+        journal.reassign(3, tenants)
+        for shard in range(3):
+            owned = NotificationJournal(path, shard=shard)
+            expected = {str(tenant.chat_id)
+                        for tenant in shard_tenants(tenants, shard, 3)}
+            if shard == 0:
+                expected.add('99')
+            assert {row[0] for row in owned.pending()} == expected, (
+                'Проверьте, что записи достаются процессу, которому '
+                'HashRing отдаёт токен подписчика'
+            )
+            owned.close()
+        journal.close()
@@ -0,0 +1,127 @@
+import json
+
+import pytest
+
+import response_decoder
+from exceptions import ResponseTooLargeError
+from response_decoder import (ResponseCache, body_digest, decode_response,
+                              excerpt, prune_response)
+
+
+class FakeResponse:
+
+    def __init__(self, data, headers=None):
+        self.body = json.dumps(data).encode()
+        self.headers = headers or {}
+        self.closed = False
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+class TestResponseDecoder:
+
+    def test_decode_keeps_needed_fields(self):
+        data = {
+            'homeworks': [{'id': 1, 'homework_name': 'hw1',
+                           'status': 'approved', 'reviewer_comment': 'x' * 100,
+                           'date_updated': '2022-04-10T12:00:00Z',
+                           'lesson_name': 'Спринт 1'}],
+            'current_date': 1650000000,
+            'extra': list(range(100)),
+        }
+        assert decode_response(FakeResponse(data)) == {
+            'homeworks': [{'id': 1, 'homework_name': 'hw1',
+                           'status': 'approved',
+                           'date_updated': '2022-04-10T12:00:00Z'}],
+            'current_date': 1650000000,
+        }, 'Проверьте, что из ответа остаются только нужные боту поля'
+
+    def test_unexpected_shapes_are_kept(self):
+        assert prune_response([1, 2]) == [1, 2]
+        assert prune_response({'homeworks': 'нет'}) == {'homeworks': 'нет'}
+        assert prune_response({'current_date': 1}) == {'current_date': 1}
+
+    def test_json_backend_fallback(self, monkeypatch):
+        monkeypatch.setattr(response_decoder, 'orjson', None)
+        data = {'homeworks': [], 'current_date': 1}
+        assert decode_response(FakeResponse(data)) == data
+        with pytest.raises(ValueError):
+            response_decoder.loads(b'{not json')
+
+    def test_body_size_is_limited(self):
+        data = {'homeworks': [{'homework_name': 'x' * 1000}]}
+        response = FakeResponse(data)
+        with pytest.raises(ResponseTooLargeError) as error:
+            decode_response(response, max_bytes=100)
+        assert response.closed
+        assert len(str(error.value)) < 300, (
+            'Проверьте, что сообщение об ошибке содержит только начало ответа'
+        )
+        response = FakeResponse({}, headers={'Content-Length': '5000'})
+        with pytest.raises(ResponseTooLargeError):
+            decode_response(response, max_bytes=100)
+
+    def test_excerpt(self):
+        assert excerpt('коротко') == 'коротко'
+        assert excerpt('x' * 250, limit=10) == 'x' * 10 + '... (ещё 240 симв.)'
+        assert excerpt({'homeworks': []}) == "{'homeworks': []}"
+        payload = {'homeworks': [{'id': index, 'status': 'x' * 1000}
+                                 for index in range(100000)]}
+        text = excerpt(payload, limit=50)
+        assert len(text) <= 53 and text.startswith("{'homeworks': [{"), (
+            'Проверьте, что excerpt не выводит большой ответ целиком'
+        )
+
+
+class TestResponseCache:
+
+    def test_digest_ignores_current_date(self):
+        first = body_digest(b'{"homeworks": [], "current_date": 1}')
+        second = body_digest(b'{"homeworks": [], "current_date": 2}')
+        assert first[0] == second[0], (
+            'Проверьте, что current_date не входит в отпечаток тела'
+        )
+        assert (first[1], second[1]) == (1, 2)
+        changed = body_digest(b'{"homeworks": [1], "current_date": 2}')
+        assert changed[0] != first[0]
+        assert body_digest(b'{"homeworks": []}') == (None, None)
+
+    def test_unchanged_body_reuses_parsed_homeworks(self):
+        cache = ResponseCache(max_size=10)
+        homeworks = [{'id': 1, 'status': 'approved'}]
+        first = cache.decode(FakeResponse(
+            {'homeworks': homeworks, 'current_date': 1}
+        ), key='token')
+        second = cache.decode(FakeResponse(
+            {'homeworks': homeworks, 'current_date': 2}
+        ), key='token')
+        assert second == {'homeworks': homeworks, 'current_date': 2}
+        assert second['homeworks'] is first['homeworks'], (
+            'Проверьте, что неизменившееся тело не разбирается заново'
+        )
+        third = cache.decode(FakeResponse(
+            {'homeworks': [], 'current_date': 3}
+        ), key='token')
+        assert third['homeworks'] == []
+
+    def test_conditional_requests(self):
+        cache = ResponseCache(max_size=10)
+        assert cache.conditional_headers('token') == {}
+        homeworks = [{'id': 1, 'status': 'reviewing'}]
+        first = cache.decode(FakeResponse(
+            {'homeworks': homeworks, 'current_date': 1},
+            headers={'ETag': '"v1"',
+                     'Last-Modified': 'Sun, 10 Apr 2022 12:00:00 GMT'}
+        ), key='token')
+        assert cache.conditional_headers('token') == {
+            'If-None-Match': '"v1"',
+            'If-Modified-Since': 'Sun, 10 Apr 2022 12:00:00 GMT',
+        }, 'Проверьте, что валидаторы ответа превращаются в условные заголовки'
+        restored = cache.not_modified('token', 5)
+        assert restored == {'homeworks': homeworks, 'current_date': 5}
+        assert restored['homeworks'] is first['homeworks']
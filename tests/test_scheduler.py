@@ -0,0 +1,86 @@
+import asyncio
+import random
+
+from scheduler import AdaptivePollPolicy, PollStats, RequestBudget
+from tenants import Tenant
+
+
+class TestAdaptivePollPolicy:
+
+    def make_policy(self):
+        return AdaptivePollPolicy(base_interval=600, reviewing_interval=60,
+                                  max_interval=3600, jitter=0,
+                                  rng=random.Random(0))
+
+    def test_reviewing_is_polled_often(self):
+        tenant = Tenant('token', 1)
+        tenant.statuses = {'1': 'reviewing'}
+        delay = self.make_policy().next_delay(tenant, changed=False)
+        assert delay == 60, (
+            'Проверьте, что работа на ревью опрашивается чаще'
+        )
+
+    def test_approved_backs_off_exponentially(self):
+        policy = self.make_policy()
+        tenant = Tenant('token', 1)
+        tenant.statuses = {'1': 'approved'}
+        delays = [policy.next_delay(tenant, changed=False) for _ in range(4)]
+        assert delays == [1200, 2400, 3600, 3600], (
+            'Проверьте экспоненциальный рост интервала до max_interval'
+        )
+        assert policy.next_delay(tenant, changed=True) == 600, (
+            'Проверьте, что изменение статуса сбрасывает интервал'
+        )
+
+    def test_idle_delays_match_next_delay(self):
+        policy = self.make_policy()
+        tenant = Tenant('token', 1)
+        tenant.statuses = {'1': 'approved'}
+        delays = policy.idle_delays(tenant)
+        assert [next(delays) for _ in range(4)] == [1200, 2400, 3600, 3600], (
+            'Проверьте, что idle_delays повторяет next_delay без изменений'
+        )
+        assert tenant.idle_polls == 4
+
+    def test_rejected_does_not_pin_base_interval(self):
+        policy = self.make_policy()
+        tenant = Tenant('token', 1)
+        tenant.statuses = {'1': 'rejected', '2': 'approved'}
+        delays = [policy.next_delay(tenant, changed=False) for _ in range(3)]
+        assert delays == [1200, 2400, 3600], (
+            'Проверьте, что старая возвращённая работа не мешает '
+            'увеличивать интервал'
+        )
+
+
+class TestRequestBudget:
+
+    def test_budget_limits_rate(self):
+        now = [0.0]
+        budget = RequestBudget(rate=2, burst=2, clock=lambda: now[0])
+
+        async def take(count):
+            for _ in range(count):
+                await budget.acquire()
+
+        asyncio.run(take(2))
+        assert budget.tokens < 1, (
+            'Проверьте, что бюджет расходуется на каждый запрос'
+        )
+        now[0] = 0.5
+        asyncio.run(take(1))
+        assert budget.tokens < 1
+
+
+class TestPollStats:
+
+    def test_latency_from_date_updated(self):
+        stats = PollStats(clock=lambda: 1581604897.0)
+        stats.record([{'date_updated': '2020-02-13T14:40:57Z'}])
+        stats.record([])
+        summary = stats.summary()
+        assert summary['polls'] == 2
+        assert summary['notifications'] == 1
+        assert summary['latency_mean'] == 40.0, (
+            'Проверьте расчёт задержки уведомления по date_updated'
+        )
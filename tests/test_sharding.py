@@ -0,0 +1,46 @@
+from collections import Counter
+
+from sharding import HashRing, shard_tenants
+from tenants import Tenant
+
+
+class TestHashRing:
+
+    def test_keys_spread_evenly(self):
+        ring = HashRing(range(4))
+        counts = Counter(ring.node(f'token-{index}') for index in range(20000))
+        assert set(counts) == {0, 1, 2, 3}
+        assert max(counts.values()) < 1.3 * min(counts.values()), (
+            'Проверьте, что подписчики распределяются по процессам равномерно'
+        )
+
+    def test_only_new_node_keys_move(self):
+        keys = [f'token-{index}' for index in range(20000)]
+        before = HashRing(range(4))
+        after = HashRing(range(5))
+        moved = [key for key in keys if before.node(key) != after.node(key)]
+        assert all(after.node(key) == 4 for key in moved), (
+            'Проверьте, что при добавлении процесса подписчики переезжают '
+            'только на него'
+        )
+        assert len(moved) < len(keys) * 0.3
+
+    def test_shard_tenants_keeps_token_together(self):
+        tenants = [Tenant(f'token-{index % 50}', index)
+                   for index in range(200)]
+        shards = [shard_tenants(tenants, shard, 3) for shard in range(3)]
+        assert sorted(tenant.chat_id for shard in shards
+                      for tenant in shard) == list(range(200))
+        for shard in shards:
+            tokens = {tenant.practicum_token for tenant in shard}
+            assert all(tenant.practicum_token in tokens
+                       for tenant in shard)
+        owners = {}
+        for index, shard in enumerate(shards):
+            for tenant in shard:
+                assert owners.setdefault(tenant.practicum_token,
+                                         index) == index, (
+                    'Проверьте, что подписчики одного токена опрашиваются '
+                    'одним процессом'
+                )
+        assert shard_tenants(tenants, 0, 1) == tenants
@@ -0,0 +1,44 @@
+import asyncio
+
+import clock
+from simulation import run_simulation
+
+
+class TestVirtualClock:
+
+    def test_sleep_does_not_wait(self):
+        virtual_clock = clock.VirtualClock(start=1000)
+
+        async def sleep_for_a_day():
+            await asyncio.sleep(24 * 60 * 60)
+            return virtual_clock.time()
+
+        assert clock.run(sleep_for_a_day(), virtual_clock) == 87400, (
+            'Проверьте, что виртуальные часы переводятся на время ожидания'
+        )
+
+
+class TestSimulation:
+
+    def test_month_of_polling(self):
+        report = run_simulation(tenants_count=5, days=30, policy='fixed')
+        assert report['requests'] >= 5 * 30 * 144, (
+            'Проверьте, что опрос с RETRY_TIME идёт весь период симуляции'
+        )
+        assert report['notifications'] > 0
+        assert report['latency_max'] <= 600, (
+            'При опросе раз в RETRY_TIME задержка не должна его превышать'
+        )
+
+    def test_quiet_polls_do_not_change_report(self):
+        replayed = run_simulation(tenants_count=5, days=5, policy='fixed',
+                                  replay_all=True)
+        report = run_simulation(tenants_count=5, days=5, policy='fixed')
+        assert report['replayed_requests'] < replayed['replayed_requests'], (
+            'Проверьте, что опросы без новых событий не выполняются'
+        )
+        for key in ('polls', 'requests', 'notifications', 'latency_mean',
+                    'latency_max'):
+            assert report[key] == replayed[key], (
+                'Проверьте, что пропуск опросов без событий не меняет отчёт'
+            )
@@ -0,0 +1,57 @@
+import threading
+import time
+
+from singleflight import SingleFlight
+from tenants import Tenant, align_checkpoints
+
+
+class TestSingleFlight:
+
+    def test_concurrent_calls_share_one_request(self):
+        flight = SingleFlight()
+        calls = []
+        results = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.1)
+            return {'current_date': 1}
+
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(flight.do(('token', 0), fetch))
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(calls) == 1, (
+            'Проверьте, что одновременные вызовы делят один запрос'
+        )
+        assert len(results) == 5
+        assert all(result is results[0] for result in results)
+
+    def test_error_is_shared_and_key_released(self):
+        flight = SingleFlight()
+
+        def failing():
+            raise KeyError('homeworks')
+
+        try:
+            flight.do('key', failing)
+        except KeyError:
+            pass
+        else:
+            assert False, 'Ошибка вызова должна передаваться вызывающему'
+        assert flight.do('key', lambda: 42) == 42, (
+            'Проверьте, что после завершения вызова ключ освобождается'
+        )
+
+    def test_align_checkpoints(self):
+        tenants = [Tenant('token', 1, 300), Tenant('token', 2, 100)]
+        align_checkpoints(tenants)
+        assert [t.current_timestamp for t in tenants] == [100, 100], (
+            'Проверьте, что подписчики токена получают общий from_date'
+        )
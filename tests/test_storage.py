@@ -0,0 +1,40 @@
+from storage import CheckpointStore
+from tenants import Tenant
+
+
+class TestCheckpointStore:
+
+    def test_restore_after_restart(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        tenant = Tenant('sometoken', 12345, current_timestamp=100)
+        store = CheckpointStore(path)
+        store.save_status(tenant.key, 'hw1', 'reviewing')
+        store.save_status(tenant.key, 'hw2', 'approved')
+        store.save_checkpoint(tenant.key, 500)
+        store.close()
+
+        restored = Tenant('sometoken', 12345, current_timestamp=100)
+        store = CheckpointStore(path)
+        store.restore(restored)
+        journal_mode = store._connection.execute(
+            'PRAGMA journal_mode').fetchone()[0]
+        store.close()
+
+        assert journal_mode == 'wal', (
+            'Проверьте, что хранилище работает в режиме WAL'
+        )
+        assert restored.current_timestamp == 500, (
+            'Проверьте, что после перезапуска from_date берётся '
+            'из сохранённого current_date'
+        )
+        assert restored.statuses == {'hw1': 'reviewing', 'hw2': 'approved'}, (
+            'Проверьте, что восстанавливаются статусы всех работ'
+        )
+
+    def test_unknown_tenant_keeps_defaults(self, tmp_path):
+        store = CheckpointStore(str(tmp_path / 'state.sqlite3'))
+        tenant = Tenant('sometoken', 12345, current_timestamp=100)
+        store.restore(tenant)
+        store.close()
+        assert tenant.current_timestamp == 100
+        assert tenant.statuses == {}
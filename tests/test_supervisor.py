@@ -0,0 +1,45 @@
+import multiprocessing
+import os
+import threading
+import time
+
+from supervisor import Supervisor
+
+
+def crash_once(shard, shards, directory):
+    marker = os.path.join(directory, f'started-{shard}')
+    with open(marker, 'a') as file:
+        file.write('.')
+    with open(marker) as file:
+        starts = len(file.read())
+    if starts == 1:
+        os._exit(1)
+    time.sleep(30)
+
+
+class TestSupervisor:
+
+    def test_crashed_worker_is_restarted(self, tmp_path):
+        directory = str(tmp_path)
+        supervisor = Supervisor(
+            lambda shard, shards: crash_once(shard, shards, directory),
+            workers=2, restart_delay=0.1, max_restart_delay=0.2,
+            context=multiprocessing.get_context('fork')
+        )
+        thread = threading.Thread(target=supervisor.run,
+                                  kwargs={'poll_interval': 0.05})
+        thread.start()
+        try:
+            deadline = time.monotonic() + 10
+            while supervisor.restarts < 2 and time.monotonic() < deadline:
+                time.sleep(0.05)
+        finally:
+            supervisor.stop()
+            thread.join(15)
+        assert supervisor.restarts == 2, (
+            'Проверьте, что упавшие процессы перезапускаются'
+        )
+        assert not any(process.is_alive()
+                       for process in supervisor.processes.values()), (
+            'Проверьте, что после stop() процессы завершаются'
+        )
@@ -0,0 +1,63 @@
+import tenants
+from tenants import (OTHER_STATUS, STATUS_NAMES, Tenant, error_fingerprint,
+                     status_code)
+
+
+class TestTenantState:
+
+    def test_single_status_is_stored_inline(self):
+        tenant = Tenant('token', 1)
+        assert tenant.statuses == {}
+        tenant.set_status('hw1', 'reviewing')
+        tenant.set_status('hw1', 'approved')
+        assert tenant.statuses == {'hw1': 'approved'}, (
+            'Проверьте, что set_status обновляет статус единственной работы'
+        )
+        assert (tenant.status_key, tenant.status_codes) == (
+            'hw1', status_code('approved')
+        ), 'Проверьте, что единственная работа хранится без словаря'
+
+    def test_statuses_are_stored_as_codes(self):
+        tenant = Tenant('token', 1)
+        tenant.set_status('hw1', 'reviewing')
+        tenant.set_status('hw2', 'approved')
+        tenant.set_status('hw1', 'rejected')
+        assert tenant.statuses == {'hw1': 'rejected', 'hw2': 'approved'}, (
+            'Проверьте, что set_status обновляет статус работы'
+        )
+        assert tenant.status_key is None
+        assert tenant.status_codes == {
+            'hw1': status_code('rejected'), 'hw2': status_code('approved')
+        }, 'Проверьте, что статусы хранятся кодами, а не строками'
+        assert not hasattr(tenant, '__dict__'), (
+            'Проверьте, что у Tenant объявлены __slots__'
+        )
+
+    def test_statuses_setter_and_unknown_status(self):
+        tenant = Tenant('token', 1)
+        tenant.statuses = {'hw1': 'approved', 'hw2': 'on_hold'}
+        assert tenant.statuses == {'hw1': 'approved', 'hw2': 'on_hold'}
+        assert STATUS_NAMES[status_code('on_hold')] == 'on_hold', (
+            'Проверьте, что новый статус получает собственный код'
+        )
+
+    def test_status_codes_are_bounded(self, monkeypatch):
+        monkeypatch.setattr(tenants, 'MAX_STATUS_CODES', len(STATUS_NAMES))
+        assert status_code('никогда_не_было') == OTHER_STATUS, (
+            'Проверьте, что число кодов статусов ограничено'
+        )
+        assert 'никогда_не_было' not in STATUS_NAMES
+        tenant = Tenant('token', 1)
+        tenant.set_status('hw1', 'никогда_не_было')
+        assert tenant.statuses == {'hw1': 'никогда_не_было'}, (
+            'Проверьте, что статус без кода хранится строкой'
+        )
+
+    def test_remember_error_compares_fingerprints(self):
+        tenant = Tenant('token', 1)
+        assert tenant.remember_error('Эндпоинт недоступен')
+        assert not tenant.remember_error('Эндпоинт недоступен'), (
+            'Проверьте, что повторная ошибка не считается новой'
+        )
+        assert tenant.remember_error(KeyError('homeworks'))
+        assert tenant.error_hash == error_fingerprint(KeyError('homeworks'))
@@ -0,0 +1,75 @@
+import random
+
+from timing_wheel import HierarchicalTimingWheel
+
+
+class TestHierarchicalTimingWheel:
+
+    def test_timers_fire_on_their_tick(self):
+        wheel = HierarchicalTimingWheel(tick=1, wheel_size=8, levels=3)
+        for moment in (1, 5, 9, 70, 400):
+            wheel.schedule(moment, moment)
+        fired = {}
+        for now in range(1, 600):
+            for item in wheel.advance(now):
+                fired[item] = now
+        assert fired == {1: 1, 5: 5, 9: 9, 70: 70, 400: 400}, (
+            'Проверьте, что таймеры срабатывают на тике своего срока, '
+            'в том числе после спуска с верхних уровней'
+        )
+        assert len(wheel) == 0
+
+    def test_cancelled_timer_does_not_fire(self):
+        wheel = HierarchicalTimingWheel(tick=1, wheel_size=8, levels=3)
+        handle = wheel.schedule(100, 'отменён')
+        wheel.schedule(100, 'остался')
+        wheel.cancel(handle)
+        wheel.cancel(handle)
+        assert len(wheel) == 1
+        assert wheel.advance(200) == ['остался'], (
+            'Проверьте, что отменённый таймер не срабатывает'
+        )
+
+    def test_random_deadlines_match_reference(self):
+        rng = random.Random(7)
+        wheel = HierarchicalTimingWheel(tick=0.5, wheel_size=8, levels=3,
+                                        start=1000.3)
+        deadlines = {index: 1000.3 + rng.uniform(0, 300)
+                     for index in range(500)}
+        for index, moment in deadlines.items():
+            wheel.schedule(moment, index)
+        now = 1000.3
+        while len(wheel):
+            next_expiry = wheel.next_expiry()
+            assert next_expiry > now - 0.5
+            now = max(now + rng.uniform(0, 3), next_expiry)
+            for index in wheel.advance(now):
+                assert deadlines[index] <= now < deadlines[index] + 3.5, (
+                    'Проверьте, что таймер срабатывает не раньше срока '
+                    'и не позже ближайшего продвижения колеса'
+                )
+                del deadlines[index]
+        assert not deadlines
+
+    def test_next_expiry_skips_to_first_timer(self):
+        wheel = HierarchicalTimingWheel(tick=1, wheel_size=8, levels=3)
+        assert wheel.next_expiry() is None
+        wheel.schedule(5, 'a')
+        assert wheel.next_expiry() == 5
+        assert wheel.advance(4) == []
+        assert wheel.advance(5) == ['a']
+
+    def test_next_expiry_sees_earlier_cascade(self):
+        wheel = HierarchicalTimingWheel(tick=1, wheel_size=8, levels=3)
+        wheel.schedule(70, 'верхний уровень')
+        assert wheel.advance(40) == []
+        wheel.schedule(100, 'средний уровень')
+        fired = {}
+        while len(wheel):
+            now = wheel.next_expiry()
+            for item in wheel.advance(now):
+                fired[item] = now
+        assert fired == {'верхний уровень': 70, 'средний уровень': 100}, (
+            'Проверьте, что next_expiry учитывает спуск с верхнего уровня, '
+            'который наступает раньше ячейки среднего уровня'
+        )
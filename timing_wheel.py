@@ -0,0 +1,137 @@
+class TimerHandle:
+    """Таймер в колесе: срок (в тиках), полезная нагрузка и ячейка."""
+
+    __slots__ = ('deadline', 'item', 'bucket', 'level')
+
+    def __init__(self, deadline, item):
+        self.deadline = deadline
+        self.item = item
+        self.bucket = None
+        self.level = 0
+
+
+class HierarchicalTimingWheel:
+    """Иерархическое колесо таймеров.
+
+    Уровень 0 состоит из wheel_size ячеек по одному тику, каждый следующий
+    уровень - из ячеек в wheel_size раз длиннее. Добавление и отмена
+    таймера - O(1), за тик срабатывают все таймеры его ячейки сразу, а
+    таймеры верхних уровней спускаются ниже, когда до них доходит время.
+    Сроки дальше последнего уровня ставятся в его самую дальнюю ячейку.
+    """
+
+    def __init__(self, tick=1.0, wheel_size=64, levels=4, start=0.0):
+        self.tick = tick
+        self.wheel_size = wheel_size
+        self.levels = levels
+        self.current = int(start // tick)
+        self.wheels = [[set() for _ in range(wheel_size)]
+                       for _ in range(levels)]
+        self.spans = [wheel_size ** level for level in range(levels + 1)]
+        self.count = 0
+        self.level_counts = [0] * levels
+
+    def __len__(self):
+        return self.count
+
+    def to_tick(self, moment):
+        """Номер тика, на котором срабатывает таймер со сроком moment."""
+        return -int(-moment // self.tick)
+
+    def _place(self, handle):
+        delta = max(handle.deadline - self.current, 1)
+        for level in range(self.levels):
+            if delta < self.spans[level + 1]:
+                index = ((handle.deadline // self.spans[level])
+                         % self.wheel_size)
+                break
+        else:
+            level = self.levels - 1
+            index = ((self.current // self.spans[level] - 1)
+                     % self.wheel_size)
+        bucket = self.wheels[level][index]
+        bucket.add(handle)
+        handle.bucket = bucket
+        handle.level = level
+        self.level_counts[level] += 1
+
+    def schedule(self, moment, item):
+        """Ставим таймер на момент moment; возвращает его TimerHandle."""
+        handle = TimerHandle(max(self.to_tick(moment), self.current + 1), item)
+        self._place(handle)
+        self.count += 1
+        return handle
+
+    def cancel(self, handle):
+        """Отменяем таймер."""
+        if handle.bucket is not None:
+            handle.bucket.discard(handle)
+            handle.bucket = None
+            self.level_counts[handle.level] -= 1
+            self.count -= 1
+
+    def _cascade(self):
+        for level in range(1, self.levels):
+            if self.current % self.spans[level]:
+                break
+            index = (self.current // self.spans[level]) % self.wheel_size
+            bucket = self.wheels[level][index]
+            self.wheels[level][index] = set()
+            self.level_counts[level] -= len(bucket)
+            for handle in bucket:
+                self._place(handle)
+
+    def advance(self, moment):
+        """Переводим колесо на момент moment и возвращаем сработавшие."""
+        target = int(moment // self.tick)
+        expired = []
+        while self.current < target:
+            if not self.level_counts[0]:
+                size = self.wheel_size
+                boundary = (self.current // size + 1) * size
+                if boundary > self.current + 1:
+                    self.current = min(target, boundary - 1)
+                    continue
+            self.current += 1
+            # Спуск возможен только на границе ячейки уровня 1.
+            if not self.current % self.wheel_size:
+                self._cascade()
+            index = self.current % self.wheel_size
+            bucket = self.wheels[0][index]
+            if not bucket:
+                continue
+            due = [handle for handle in bucket
+                   if handle.deadline <= self.current]
+            for handle in due:
+                bucket.discard(handle)
+                handle.bucket = None
+                expired.append(handle.item)
+            self.count -= len(due)
+            self.level_counts[0] -= len(due)
+        return expired
+
+    def next_expiry(self):
+        """Ближайший момент, когда колесу есть что делать, или None.
+
+        Это самый ранний из сроков первой непустой ячейки уровня 0 и
+        моментов спуска первых непустых ячеек верхних уровней - не позже
+        реального срабатывания. Спуск верхнего уровня может наступить
+        раньше срока ячейки нижнего, поэтому смотрим все уровни.
+        """
+        if not self.count:
+            return None
+        earliest = None
+        for level in range(self.levels):
+            if not self.level_counts[level]:
+                continue
+            span = self.spans[level]
+            slot = self.current // span
+            for offset in range(1, self.wheel_size + 1):
+                if self.wheels[level][(slot + offset) % self.wheel_size]:
+                    moment = (slot + offset) * span
+                    if earliest is None or moment < earliest:
+                        earliest = moment
+                    break
+        if earliest is None:
+            earliest = self.current + 1
+        return earliest * self.tick